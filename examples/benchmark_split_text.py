@@ -0,0 +1,86 @@
+"""
+Open Notebook - split_text Benchmark
+
+Compares the token-offset splitter behind split_text with the previous
+implementation, LangChain's RecursiveCharacterTextSplitter measuring every
+piece with token_count, on a text file or a generated document.
+
+Usage:
+    python examples/benchmark_split_text.py [path/to/document.txt] [--size 500]
+"""
+
+import argparse
+import random
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from open_notebook.utils import split_text, token_count
+from open_notebook.utils.text_splitter import DEFAULT_SEPARATORS
+
+
+def legacy_split_text(txt: str, chunk_size: int = 500):
+    """split_text as it was before the token-offset splitter."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=int(chunk_size * 0.15),
+        length_function=token_count,
+        separators=DEFAULT_SEPARATORS,
+    )
+    return splitter.split_text(txt)
+
+
+def generate_document(pages: int, seed: int = 0) -> str:
+    """Build a document of roughly `pages` pages of prose-like text."""
+    rng = random.Random(seed)
+    words = (
+        "the model context source notebook research paper results method data "
+        "analysis embedding vector search token chunk insight summary question"
+    ).split()
+    paragraphs = []
+    for _ in range(pages * 6):
+        sentences = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(6, 24))).capitalize()
+            for _ in range(rng.randint(2, 7))
+        ]
+        paragraphs.append(". ".join(sentences) + ".")
+    return "\n\n".join(paragraphs)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="Text file to split")
+    parser.add_argument("--size", type=int, default=500, help="Chunk size in tokens")
+    parser.add_argument("--pages", type=int, default=500, help="Generated pages")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = generate_document(args.pages)
+
+    # Load the encoding before timing either implementation
+    token_count("warm up")
+    print(f"Document: {len(text):,} characters, {token_count(text):,} tokens")
+
+    new_chunks, new_seconds = timed(split_text, text, args.size)
+    old_chunks, old_seconds = timed(legacy_split_text, text, args.size)
+
+    identical = len(set(new_chunks) & set(old_chunks))
+    print(f"Legacy splitter:       {old_seconds:8.2f}s  {len(old_chunks):6} chunks")
+    print(f"Token-offset splitter: {new_seconds:8.2f}s  {len(new_chunks):6} chunks")
+    print(f"Speed-up:              {old_seconds / max(new_seconds, 1e-9):8.1f}x")
+    print(f"Identical chunks:      {identical / max(len(old_chunks), 1):8.1%}")
+    sizes = [token_count(chunk) for chunk in new_chunks]
+    print(f"Largest new chunk:     {max(sizes, default=0):8} tokens")
+
+
+if __name__ == "__main__":
+    main()
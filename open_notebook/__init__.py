@@ -103,11 +103,9 @@ async def list_notebooks(archived: bool = False) -> list[Notebook]:
         >>> for nb in notebooks:
         ...     print(f"{nb.name}: {nb.source_count} sources")
     """
-    notebooks = await Notebook.get_all()
-    if archived:
-        return notebooks
-    else:
-        return [nb for nb in notebooks if not nb.archived]
+    # Filter archived notebooks in the database instead of loading them all
+    where = None if archived else "archived != true"
+    return [nb async for nb in Notebook.iter_all(where=where)]
 
 
 # Add convenience functions to exports
@@ -13,6 +13,8 @@ from typing import Optional
 
 import click
 
+from open_notebook.database.repository import run_and_close_db
+
 
 @click.group()
 @click.version_option(version="2.0.0-alpha")
@@ -40,7 +42,7 @@ def create_notebook(name: str, description: str):
         click.echo(f"✓ Created notebook: {nb.name}")
         click.echo(f"  ID: {nb.id}")
 
-    asyncio.run(_create())
+    asyncio.run(run_and_close_db(_create()))
 
 
 @notebooks.command("list")
@@ -49,24 +51,27 @@ def list_notebooks_cmd(archived: bool):
     """List all notebooks"""
 
     async def _list():
-        from open_notebook import list_notebooks, Notebook
+        from open_notebook import Notebook
 
-        notebooks = await Notebook.get_all()
-        if not notebooks:
+        where = None if archived else "archived != true"
+        total = await Notebook.count(where=where)
+        if not total:
             click.echo("No notebooks found.")
             return
 
-        click.echo(f"\nFound {len(notebooks)} notebook(s):\n")
-        for nb in notebooks:
-            if archived or not nb.archived:
-                archive_flag = " [ARCHIVED]" if nb.archived else ""
-                click.echo(f"  • {nb.name}{archive_flag}")
-                click.echo(f"    ID: {nb.id}")
-                if nb.description:
-                    click.echo(f"    Description: {nb.description}")
-                click.echo()
+        click.echo(f"\nFound {total} notebook(s):\n")
+        # Stream notebooks page by page instead of loading them all at once
+        async for nb in Notebook.iter_all(
+            where=where, fields=["name", "description", "archived"]
+        ):
+            archive_flag = " [ARCHIVED]" if nb.archived else ""
+            click.echo(f"  • {nb.name}{archive_flag}")
+            click.echo(f"    ID: {nb.id}")
+            if nb.description:
+                click.echo(f"    Description: {nb.description}")
+            click.echo()
 
-    asyncio.run(_list())
+    asyncio.run(run_and_close_db(_list()))
 
 
 @notebooks.command("archive")
@@ -82,7 +87,7 @@ def archive_notebook(notebook_id: str):
         await nb.save()
         click.echo(f"✓ Archived notebook: {nb.name}")
 
-    asyncio.run(_archive())
+    asyncio.run(run_and_close_db(_archive()))
 
 
 @cli.group()
@@ -139,7 +144,7 @@ def add_source(notebook_id: str, url: Optional[str], file: Optional[str], text:
         click.echo(f"  Source ID: {source.id}")
         click.echo(f"  Title: {source.title}")
 
-    asyncio.run(_add())
+    asyncio.run(run_and_close_db(_add()))
 
 
 @sources.command("list")
@@ -150,8 +155,8 @@ def list_sources(notebook_id: str):
     async def _list():
         from open_notebook import Notebook
 
-        nb = await Notebook.get(notebook_id)
-        sources = await nb.get_sources()
+        nb = await Notebook.get(notebook_id, fields=["name"])
+        sources = await nb.get_sources(fields=["title", "asset"])
 
         if not sources:
             click.echo(f"No sources found in notebook: {nb.name}")
@@ -165,7 +170,39 @@ def list_sources(notebook_id: str):
                 click.echo(f"    URL: {source.asset.url}")
             click.echo()
 
-    asyncio.run(_list())
+    asyncio.run(run_and_close_db(_list()))
+
+
+@sources.command("vectorize")
+@click.argument("source_id")
+@click.option(
+    "--mode",
+    type=click.Choice(["inline", "queued"]),
+    default="inline",
+    help="Embed in this process or submit a background job",
+)
+def vectorize_source(source_id: str, mode: str):
+    """Embed a source for vector search"""
+
+    async def _vectorize():
+        from open_notebook import Source
+
+        source = await Source.get(source_id)
+        result = await source.vectorize(mode=mode)
+
+        if mode == "queued":
+            click.echo(f"✓ Submitted vectorization job: {result}")
+            return
+        click.echo(
+            f"✓ Embedded {result.embedded} of {result.chunks} chunks "
+            f"in {result.seconds:.1f}s ({result.removed} removed)"
+        )
+        click.echo(
+            f"  {result.chunks_per_second:.1f} chunks/s, "
+            f"{result.tokens_per_second:.0f} tokens/s"
+        )
+
+    asyncio.run(run_and_close_db(_vectorize()))
 
 
 @cli.command()
@@ -203,7 +240,7 @@ def chat(notebook_id: str, question: str, model: Optional[str]):
 
         click.echo(f"\n🤖 Answer:\n{ai_message.content}\n")
 
-    asyncio.run(_chat())
+    asyncio.run(run_and_close_db(_chat()))
 
 
 # Podcast command commented out - requires more complex setup
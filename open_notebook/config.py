@@ -15,3 +15,9 @@ os.makedirs(UPLOADS_FOLDER, exist_ok=True)
 # TIKTOKEN CACHE FOLDER
 TIKTOKEN_CACHE_DIR = f"{DATA_FOLDER}/tiktoken-cache"
 os.makedirs(TIKTOKEN_CACHE_DIR, exist_ok=True)
+
+# EMBEDDING CACHE FILE
+EMBEDDING_CACHE_FILE = f"{sqlite_folder}/embedding-cache.sqlite"
+
+# LOCAL VECTOR INDEX FOLDER
+LOCAL_VECTOR_INDEX_DIR = f"{DATA_FOLDER}/vector-index"
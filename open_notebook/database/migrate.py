@@ -1,6 +1,7 @@
 import asyncio
 
 from .async_migrate import AsyncMigrationManager
+from .repository import run_and_close_db
 
 
 class MigrationManager:
@@ -14,13 +15,15 @@ class MigrationManager:
 
     def get_current_version(self) -> int:
         """Get current database version (sync wrapper)."""
-        return asyncio.run(self._async_manager.get_current_version())
+        return asyncio.run(
+            run_and_close_db(self._async_manager.get_current_version())
+        )
 
     @property
     def needs_migration(self) -> bool:
         """Check if migration is needed (sync wrapper)."""
-        return asyncio.run(self._async_manager.needs_migration())
+        return asyncio.run(run_and_close_db(self._async_manager.needs_migration()))
 
     def run_migration_up(self):
         """Run migrations (sync wrapper)."""
-        asyncio.run(self._async_manager.run_migration_up())
+        asyncio.run(run_and_close_db(self._async_manager.run_migration_up()))
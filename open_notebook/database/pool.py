@@ -0,0 +1,233 @@
+"""
+Async connection pool for SurrealDB.
+
+Opening a SurrealDB websocket requires a connect, signin and use handshake,
+which is usually more expensive than the query that follows. The pool keeps
+authenticated connections alive between calls and hands them out to the
+repository helpers.
+
+asyncio primitives and websocket connections are bound to the event loop that
+created them, so each running loop owns its own pool (see `get_pool`).
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+from loguru import logger
+
+ConnectionFactory = Callable[[], Awaitable[Any]]
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+@dataclass
+class PoolConfig:
+    """Sizing and lifetime settings for a connection pool."""
+
+    max_size: int = 10
+    idle_timeout: float = 300.0  # Close connections idle for longer than this
+    health_check_interval: float = 30.0  # Ping connections idle for longer than this
+    acquire_timeout: float = 30.0  # Max seconds to wait for a free slot
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Build the configuration from SURREAL_POOL_* environment variables."""
+        return cls(
+            max_size=max(1, int(_env_float("SURREAL_POOL_MAX_SIZE", cls.max_size))),
+            idle_timeout=_env_float("SURREAL_POOL_IDLE_TIMEOUT", cls.idle_timeout),
+            health_check_interval=_env_float(
+                "SURREAL_POOL_HEALTH_CHECK_INTERVAL", cls.health_check_interval
+            ),
+            acquire_timeout=_env_float(
+                "SURREAL_POOL_ACQUIRE_TIMEOUT", cls.acquire_timeout
+            ),
+        )
+
+
+@dataclass
+class _IdleConnection:
+    connection: Any
+    released_at: float
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived connections owned by a single event loop.
+
+    At most `max_size` connections are checked out at once; further callers
+    wait for a free slot. Idle connections are health-checked before reuse and
+    closed once they have been idle for longer than `idle_timeout`.
+    """
+
+    def __init__(
+        self, connect: ConnectionFactory, config: Optional[PoolConfig] = None
+    ) -> None:
+        self._connect = connect
+        self.config = config or PoolConfig()
+        self._idle: Deque[_IdleConnection] = deque()
+        self._slots = asyncio.Semaphore(self.config.max_size)
+        self._in_use = 0
+        self._closed = False
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters describing the pool state."""
+        return {
+            "max_size": self.config.max_size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "created": self._created,
+            "reused": self._reused,
+            "discarded": self._discarded,
+        }
+
+    async def acquire(self) -> Any:
+        """Check out a healthy connection, opening a new one if none is idle."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            await asyncio.wait_for(
+                self._slots.acquire(), timeout=self.config.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                f"Timed out waiting for a database connection "
+                f"(pool max size {self.config.max_size})"
+            )
+
+        try:
+            connection = await self._take_idle()
+            if connection is None:
+                connection = await self._connect()
+                self._created += 1
+            else:
+                self._reused += 1
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._in_use += 1
+        return connection
+
+    async def release(self, connection: Any, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it when `discard` is set."""
+        self._in_use -= 1
+        try:
+            if discard or self._closed:
+                self._discarded += 1
+                await self._close_connection(connection)
+            else:
+                self._idle.append(_IdleConnection(connection, time.monotonic()))
+                await self._evict_expired()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """
+        Context manager that checks a connection out and back in.
+
+        RuntimeError is how the repository reports query-level failures, which
+        leave the connection usable. Any other exception may have left the
+        websocket in an unknown state, so the connection is discarded.
+        """
+        connection = await self.acquire()
+        discard = False
+        try:
+            yield connection
+        except RuntimeError:
+            raise
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            await self.release(connection, discard=discard)
+
+    async def close(self) -> None:
+        """Close every idle connection and refuse further checkouts."""
+        self._closed = True
+        while self._idle:
+            await self._close_connection(self._idle.popleft().connection)
+
+    async def _take_idle(self) -> Optional[Any]:
+        # Most recently released connections are reused first so that older
+        # ones age out through idle eviction when load drops.
+        now = time.monotonic()
+        while self._idle:
+            idle = self._idle.pop()
+            idle_for = now - idle.released_at
+            if idle_for > self.config.idle_timeout:
+                self._discarded += 1
+                await self._close_connection(idle.connection)
+                continue
+            if idle_for > self.config.health_check_interval and not await self._ping(
+                idle.connection
+            ):
+                self._discarded += 1
+                await self._close_connection(idle.connection)
+                continue
+            return idle.connection
+        return None
+
+    async def _evict_expired(self) -> None:
+        now = time.monotonic()
+        while self._idle and now - self._idle[0].released_at > self.config.idle_timeout:
+            self._discarded += 1
+            await self._close_connection(self._idle.popleft().connection)
+
+    async def _ping(self, connection: Any) -> bool:
+        try:
+            await asyncio.wait_for(connection.query("RETURN true;"), timeout=5)
+            return True
+        except Exception as e:
+            logger.debug(f"Discarding unhealthy database connection: {e}")
+            return False
+
+    async def _close_connection(self, connection: Any) -> None:
+        try:
+            await connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing database connection: {e}")
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ConnectionPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_pool(connect: ConnectionFactory) -> ConnectionPool:
+    """Return the pool owned by the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool.closed:
+        pool = ConnectionPool(connect, PoolConfig.from_env())
+        _pools[loop] = pool
+    return pool
+
+
+async def close_pool() -> None:
+    """Close the pool owned by the running event loop, if any."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
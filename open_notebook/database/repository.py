@@ -1,12 +1,32 @@
 import os
+import re
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, TypeVar, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from loguru import logger
 from surrealdb import AsyncSurreal, RecordID  # type: ignore
 
+from .pool import close_pool, get_pool
+
 T = TypeVar("T", Dict[str, Any], List[Dict[str, Any]])
+R = TypeVar("R")
+
+BatchStatement = Union[str, Tuple[str, Optional[Dict[str, Any]]]]
+
+# Matches SurrealQL parameters such as $id or $source_id
+_PARAM_PATTERN = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
 
 
 def get_database_url():
@@ -44,22 +64,48 @@ def ensure_record_id(value: Union[str, RecordID]) -> RecordID:
     return RecordID.parse(value)
 
 
-@asynccontextmanager
-async def db_connection():
+async def _open_connection():
+    """Open and authenticate a new SurrealDB connection."""
     db = AsyncSurreal(get_database_url())
-    await db.signin(
-        {
-            "username": os.environ.get("SURREAL_USER"),
-            "password": get_database_password(),
-        }
-    )
-    await db.use(
-        os.environ.get("SURREAL_NAMESPACE"), os.environ.get("SURREAL_DATABASE")
-    )
     try:
+        await db.signin(
+            {
+                "username": os.environ.get("SURREAL_USER"),
+                "password": get_database_password(),
+            }
+        )
+        await db.use(
+            os.environ.get("SURREAL_NAMESPACE"), os.environ.get("SURREAL_DATABASE")
+        )
+    except BaseException:
+        await db.close()
+        raise
+    return db
+
+
+@asynccontextmanager
+async def db_connection():
+    """Borrow a pooled connection owned by the running event loop."""
+    async with get_pool(_open_connection).connection() as db:
         yield db
+
+
+async def close_db_connections() -> None:
+    """Close the connection pool of the running event loop."""
+    await close_pool()
+
+
+async def run_and_close_db(coro: Awaitable[R]) -> R:
+    """
+    Await `coro`, then close the pooled connections of the running event loop.
+
+    Wrap coroutines run on short-lived loops (asyncio.run, run_until_complete)
+    with this so their connections don't outlive the loop.
+    """
+    try:
+        return await coro
     finally:
-        await db.close()
+        await close_db_connections()
 
 
 async def repo_query(
@@ -82,6 +128,122 @@ async def repo_query(
             raise
 
 
+def _namespace_statement(
+    index: int, query_str: str, vars: Optional[Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any]]:
+    """Prefix a statement's parameters so they don't collide inside a batch."""
+    query_str = query_str.strip().rstrip(";").strip()
+    if not vars:
+        return query_str, {}
+    prefix = f"b{index}_"
+
+    def rename(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        return f"${prefix}{name}" if name in vars else match.group(0)
+
+    return (
+        _PARAM_PATTERN.sub(rename, query_str),
+        {f"{prefix}{key}": value for key, value in vars.items()},
+    )
+
+
+async def repo_batch(
+    statements: Sequence[BatchStatement], transaction: bool = False
+) -> List[List[Dict[str, Any]]]:
+    """
+    Execute several SurrealQL statements in a single round trip.
+
+    Each entry is either a query string or a (query, vars) tuple and must hold
+    exactly one statement. Parameters are namespaced per statement, so every
+    statement can use its own $id. Results are returned in statement order.
+    With transaction=True the statements run inside BEGIN/COMMIT and either
+    all of them apply or none do.
+    """
+    if not statements:
+        return []
+
+    parts: List[str] = []
+    params: Dict[str, Any] = {}
+    for index, statement in enumerate(statements):
+        query_str, vars = (
+            (statement, None) if isinstance(statement, str) else statement
+        )
+        namespaced_query, namespaced_vars = _namespace_statement(
+            index, query_str, vars
+        )
+        parts.append(namespaced_query)
+        params.update(namespaced_vars)
+
+    if transaction:
+        parts = ["BEGIN TRANSACTION", *parts, "COMMIT TRANSACTION"]
+    query_str = ";\n".join(parts) + ";"
+
+    async with db_connection() as connection:
+        try:
+            response = await connection.query_raw(query_str, params)
+            if response.get("error"):
+                raise RuntimeError(str(response["error"]))
+            statement_results = response.get("result") or []
+            # Transaction control statements are not reported by every server
+            # version; drop them so results line up with the input
+            if len(statement_results) == len(statements) + 2:
+                statement_results = statement_results[1:-1]
+            if len(statement_results) != len(statements):
+                raise RuntimeError(
+                    f"Expected {len(statements)} batch results, "
+                    f"got {len(statement_results)}"
+                )
+
+            results: List[List[Dict[str, Any]]] = []
+            for statement_result in statement_results:
+                if statement_result.get("status") == "ERR":
+                    raise RuntimeError(str(statement_result.get("result")))
+                result = parse_record_ids(statement_result.get("result"))
+                if result is None:
+                    result = []
+                elif not isinstance(result, list):
+                    result = [result]
+                results.append(result)
+            return results
+        except RuntimeError as e:
+            logger.error(str(e))
+            raise
+        except Exception as e:
+            logger.exception(e)
+            raise
+
+
+class QueryBatch:
+    """
+    Collects statements and sends them together through repo_batch.
+
+    Example:
+        batch = QueryBatch()
+        source_idx = batch.add("SELECT * FROM $id", {"id": source_id})
+        insights_idx = batch.add(
+            "SELECT * FROM source_insight WHERE source=$id", {"id": source_id}
+        )
+        results = await batch.execute()
+        source_rows, insight_rows = results[source_idx], results[insights_idx]
+    """
+
+    def __init__(self, transaction: bool = False) -> None:
+        self.transaction = transaction
+        self.statements: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def add(self, query_str: str, vars: Optional[Dict[str, Any]] = None) -> int:
+        """Queue a statement and return the index of its result."""
+        self.statements.append((query_str, vars))
+        return len(self.statements) - 1
+
+    async def execute(self) -> List[List[Dict[str, Any]]]:
+        """Send every queued statement in one round trip."""
+        return await repo_batch(self.statements, transaction=self.transaction)
+
+
 async def repo_create(table: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new record in the specified table"""
     # Remove 'id' attribute if it exists in data
@@ -151,6 +313,34 @@ async def repo_update(
         raise RuntimeError(f"Failed to update record: {str(e)}")
 
 
+async def repo_update_many(
+    updates: Sequence[Tuple[Union[str, RecordID], Dict[str, Any]]],
+) -> List[List[Dict[str, Any]]]:
+    """
+    Update several records in one transaction.
+
+    Takes (record_id, data) pairs and returns the updated rows for each pair,
+    in order. Either every update applies or none does.
+    """
+    now = datetime.now(timezone.utc)
+    statements: List[BatchStatement] = []
+    for record_id, data in updates:
+        data.pop("id", None)
+        if "created" in data and isinstance(data["created"], str):
+            data["created"] = datetime.fromisoformat(data["created"])
+        data["updated"] = now
+        statements.append(
+            (
+                "UPDATE $id MERGE $data",
+                {"id": ensure_record_id(record_id), "data": data},
+            )
+        )
+    try:
+        return await repo_batch(statements, transaction=True)
+    except Exception as e:
+        raise RuntimeError(f"Failed to update records: {str(e)}")
+
+
 async def repo_delete(record_id: Union[str, RecordID]):
     """Delete a record by record id"""
 
@@ -162,6 +352,30 @@ async def repo_delete(record_id: Union[str, RecordID]):
         raise RuntimeError(f"Failed to delete record: {str(e)}")
 
 
+async def repo_live(table: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield change notifications for a table from a LIVE SELECT.
+
+    Live queries are bound to the connection that started them, so this opens
+    a dedicated connection instead of borrowing one from the pool. The query
+    is killed and the connection closed when the iteration stops.
+    """
+    db = await _open_connection()
+    query_uuid = None
+    try:
+        query_uuid = await db.live(table)
+        notifications = await db.subscribe_live(query_uuid)
+        async for notification in notifications:
+            yield parse_record_ids(notification)
+    finally:
+        if query_uuid is not None:
+            try:
+                await db.kill(query_uuid)
+            except Exception as e:
+                logger.debug(f"Error killing live query on {table}: {e}")
+        await db.close()
+
+
 async def repo_insert(
     table: str, data: List[Dict[str, Any]], ignore_duplicates: bool = False
 ) -> List[Dict[str, Any]]:
@@ -1,36 +1,146 @@
-from datetime import datetime
-from typing import Any, ClassVar, Dict, List, Optional, Type, TypeVar, Union, cast
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from loguru import logger
-from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    PrivateAttr,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
 
 from open_notebook.database.repository import (
     ensure_record_id,
     repo_create,
     repo_delete,
+    repo_insert,
     repo_query,
     repo_relate,
     repo_update,
+    repo_update_many,
     repo_upsert,
 )
+from open_notebook.domain.search_cache import bump_corpus_version
 from open_notebook.exceptions import (
+    ConfigurationError,
     DatabaseOperationError,
+    FieldNotLoadedError,
     InvalidInputError,
     NotFoundError,
 )
 
 T = TypeVar("T", bound="ObjectModel")
 
+# Field names accepted in projections (fields= / omit=)
+_FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# table_name -> ObjectModel subclass, filled in as subclasses are defined
+_table_registry: Dict[str, Type["ObjectModel"]] = {}
+
+
+def _register_model(table_name: str, model_class: Type["ObjectModel"]) -> None:
+    """Register a model class as the owner of a table."""
+    existing = _table_registry.get(table_name)
+    if (
+        existing is not None
+        and existing is not model_class
+        and (existing.__module__, existing.__qualname__)
+        != (model_class.__module__, model_class.__qualname__)
+    ):
+        # Re-defining the same class (e.g. on module reload) replaces it, but
+        # two different classes can't own the same table
+        raise ConfigurationError(
+            f"Table '{table_name}' is already registered to "
+            f"{existing.__module__}.{existing.__qualname__}, cannot register "
+            f"{model_class.__module__}.{model_class.__qualname__}"
+        )
+    _table_registry[table_name] = model_class
+
 
 class ObjectModel(BaseModel):
     id: Optional[str] = None
     table_name: ClassVar[str] = ""
     nullable_fields: ClassVar[set[str]] = set()  # Fields that can be saved as None
+    searchable: ClassVar[bool] = False  # Writes invalidate cached search results
     created: Optional[datetime] = None
     updated: Optional[datetime] = None
+    # Model fields fetched by a projected load; None means fully loaded
+    _loaded_fields: Optional[Set[str]] = PrivateAttr(default=None)
+    # Change tracking, enabled once the object is loaded from or saved to
+    # the database
+    _track_changes: bool = PrivateAttr(default=False)
+    _dirty_fields: Set[str] = PrivateAttr(default_factory=set)
+    # sha256 of the embedding content the stored embedding was computed from,
+    # saved next to it as embedding_hash
+    _embedding_hash: Optional[str] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in self.__class__.model_fields:
+            if self._loaded_fields is not None:
+                # An assigned field is known, even if the load left it out
+                self._loaded_fields.add(name)
+            if self._track_changes:
+                self._dirty_fields.add(name)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached when normal lookup fails; projected loads leave the
+        # fields they skipped unset
+        if name in self.__class__.model_fields:
+            raise FieldNotLoadedError(
+                f"{self.__class__.__name__}.{name} was not loaded; use "
+                f"load_fields({name!r}) or fetch_field({name!r}) to fetch it"
+            )
+        return super().__getattr__(name)
+
+    @property
+    def dirty_fields(self) -> Set[str]:
+        """Fields assigned since the object was loaded or last saved."""
+        return set(self._dirty_fields)
+
+    def mark_dirty(self, *fields: str) -> None:
+        """
+        Flag fields as changed.
+
+        Assignments are tracked automatically; use this after mutating a
+        field in place, e.g. `source.topics.append("ai")`.
+        """
+        unknown = [name for name in fields if name not in self.__class__.model_fields]
+        if unknown:
+            raise InvalidInputError(f"Unknown fields: {', '.join(unknown)}")
+        self._dirty_fields.update(fields)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Only classes that declare their own table are registered; subclasses
+        # inheriting a table_name keep resolving to the declaring class
+        table_name = cls.__dict__.get("table_name")
+        if table_name:
+            _register_model(table_name, cls)
 
     @classmethod
-    async def get_all(cls: Type[T], order_by=None) -> List[T]:
+    async def get_all(
+        cls: Type[T],
+        order_by=None,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List[T]:
         try:
             # If called from a specific subclass, use its table_name
             if cls.table_name:
@@ -41,16 +151,18 @@ class ObjectModel(BaseModel):
                 raise InvalidInputError(
                     "get_all() must be called from a specific model class"
                 )
+            projection = cls._projection(fields, omit)
+            loaded = cls._loaded_field_names(fields, omit)
             if order_by:
-                query = f"SELECT * FROM {table_name} ORDER BY {order_by}"
+                query = f"SELECT {projection} FROM {table_name} ORDER BY {order_by}"
             else:
-                query = f"SELECT * FROM {table_name}"
+                query = f"SELECT {projection} FROM {table_name}"
 
             result = await repo_query(query)
             objects = []
             for obj in result:
                 try:
-                    objects.append(target_class(**obj))
+                    objects.append(target_class._from_row(obj, loaded))
                 except Exception as e:
                     logger.critical(f"Error creating object: {str(e)}")
 
@@ -61,7 +173,112 @@ class ObjectModel(BaseModel):
             raise DatabaseOperationError(e)
 
     @classmethod
-    async def get(cls: Type[T], id: str) -> T:
+    async def iter_all(
+        cls: Type[T],
+        batch_size: int = 100,
+        order_by: Optional[str] = None,
+        where: Optional[str] = None,
+        vars: Optional[Dict[str, Any]] = None,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[T]:
+        """
+        Stream every record of the table, fetching `batch_size` rows per query.
+
+        Without `order_by` pages are read with a keyset cursor on id, so
+        records added or removed while iterating don't shift later pages.
+        SurrealDB still scans the table up to the cursor for each page, so
+        deep pages are not cheaper than with START. With `order_by` pages use
+        START/LIMIT. `where` is a SurrealQL condition; its parameters go in
+        `vars`. `fields` / `omit` project the rows as in `get`.
+
+        Example:
+            async for source in Source.iter_all(batch_size=500):
+                ...
+        """
+        if not cls.table_name:
+            raise InvalidInputError(
+                "iter_all() must be called from a specific model class"
+            )
+        if batch_size < 1:
+            raise InvalidInputError("batch_size must be a positive integer")
+
+        projection = cls._projection(fields, omit)
+        loaded = cls._loaded_field_names(fields, omit)
+        params: Dict[str, Any] = dict(vars or {})
+        params["limit"] = batch_size
+        cursor: Optional[str] = None
+        offset = 0
+        while True:
+            conditions = [f"({where})"] if where else []
+            if order_by:
+                query = (
+                    f"SELECT {projection} FROM {cls.table_name}"
+                    f"{' WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+                    f" ORDER BY {order_by} LIMIT $limit START $start"
+                )
+                params["start"] = offset
+            else:
+                if cursor is not None:
+                    conditions.append("id > $cursor")
+                    params["cursor"] = ensure_record_id(cursor)
+                query = (
+                    f"SELECT {projection} FROM {cls.table_name}"
+                    f"{' WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+                    f" ORDER BY id LIMIT $limit"
+                )
+
+            try:
+                rows = await repo_query(query, params)
+            except Exception as e:
+                logger.error(f"Error iterating {cls.table_name}: {str(e)}")
+                logger.exception(e)
+                raise DatabaseOperationError(e)
+
+            for row in rows:
+                try:
+                    yield cls._from_row(row, loaded)
+                except Exception as e:
+                    logger.critical(f"Error creating object: {str(e)}")
+
+            if len(rows) < batch_size:
+                return
+            offset += len(rows)
+            cursor = str(rows[-1]["id"])
+
+    @classmethod
+    async def count(
+        cls, where: Optional[str] = None, vars: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Count the records of the table (optionally filtered) without loading them."""
+        if not cls.table_name:
+            raise InvalidInputError("count() must be called from a specific model class")
+        query = f"SELECT count() AS total FROM {cls.table_name}"
+        if where:
+            query += f" WHERE {where}"
+        query += " GROUP ALL"
+        try:
+            result = await repo_query(query, vars)
+            return result[0]["total"] if result else 0
+        except Exception as e:
+            logger.error(f"Error counting {cls.table_name}: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError(e)
+
+    @classmethod
+    async def get(
+        cls: Type[T],
+        id: str,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> T:
+        """
+        Fetch a record by id.
+
+        `fields` loads only the listed fields (plus id) and `omit` loads all
+        but the listed ones. Projected loads return a partial model whose
+        missing fields can be fetched later with `load_fields`.
+        """
         if not id:
             raise InvalidInputError("ID cannot be empty")
         try:
@@ -78,9 +295,14 @@ class ObjectModel(BaseModel):
                     raise InvalidInputError(f"No class found for table {table_name}")
                 target_class = cast(Type[T], found_class)
 
-            result = await repo_query("SELECT * FROM $id", {"id": ensure_record_id(id)})
+            result = await repo_query(
+                f"SELECT {target_class._projection(fields, omit)} FROM $id",
+                {"id": ensure_record_id(id)},
+            )
             if result:
-                return target_class(**result[0])
+                return target_class._from_row(
+                    result[0], target_class._loaded_field_names(fields, omit)
+                )
             else:
                 raise NotFoundError(f"{table_name} with id {id} not found")
         except Exception as e:
@@ -88,21 +310,242 @@ class ObjectModel(BaseModel):
             logger.exception(e)
             raise NotFoundError(f"Object with id {id} not found - {str(e)}")
 
+    @classmethod
+    async def get_many(
+        cls: Type[T],
+        ids: List[str],
+        raise_on_missing: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List[T]:
+        """
+        Fetch several records in a single round trip.
+
+        Results keep the order of `ids` and each row is built as the class that
+        owns its table. Ids that don't exist are logged and skipped, or raise
+        NotFoundError listing all of them when `raise_on_missing` is set.
+        `fields` / `omit` project the rows as in `get`.
+        """
+        record_ids = [cls._normalize_id(id) for id in ids if id]
+        if not record_ids:
+            return []
+        try:
+            unique_ids = list(dict.fromkeys(record_ids))
+            rows = await repo_query(
+                f"SELECT {cls._projection(fields, omit)} FROM $ids",
+                {"ids": [ensure_record_id(record_id) for record_id in unique_ids]},
+            )
+        except Exception as e:
+            logger.error(f"Error fetching {len(record_ids)} records: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError(e)
+        return cls._objects_from_rows(
+            record_ids, rows, raise_on_missing, fields=fields, omit=omit
+        )
+
+    @classmethod
+    def _normalize_id(cls, id: str) -> str:
+        """Return the id as `table:key`, prefixing this class's table if needed."""
+        if ":" not in id and cls.table_name:
+            id = f"{cls.table_name}:{id}"
+        return str(ensure_record_id(id))
+
+    @classmethod
+    def _objects_from_rows(
+        cls: Type[T],
+        ids: List[str],
+        rows: List[Dict[str, Any]],
+        raise_on_missing: bool = False,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List[T]:
+        """Build objects for `ids` from fetched rows, keeping the order of `ids`."""
+        rows_by_id = {
+            cls._normalize_id(str(row["id"])): row for row in rows if row and row.get("id")
+        }
+        objects: List[T] = []
+        missing: List[str] = []
+        for record_id in ids:
+            row = rows_by_id.get(record_id)
+            if row is None:
+                missing.append(record_id)
+                continue
+            objects.append(cls._object_from_row(row, fields=fields, omit=omit))
+
+        if missing:
+            message = f"Records not found: {', '.join(missing)}"
+            if raise_on_missing:
+                raise NotFoundError(message)
+            logger.warning(message)
+        return objects
+
+    @classmethod
+    def _object_from_row(
+        cls: Type[T],
+        row: Dict[str, Any],
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> T:
+        """Build a row as the class that owns the table in its id."""
+        table_name = str(row["id"]).split(":")[0]
+        target_class: Type[ObjectModel] = cls
+        if cls.table_name != table_name:
+            found_class = cls._get_class_by_table_name(table_name)
+            if not found_class:
+                raise InvalidInputError(f"No class found for table {table_name}")
+            target_class = found_class
+        return cast(
+            T,
+            target_class._from_row(
+                row, target_class._loaded_field_names(fields, omit)
+            ),
+        )
+
+    @classmethod
+    def _projection(
+        cls,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+        alias: Optional[str] = None,
+        always: Sequence[str] = ("id",),
+    ) -> str:
+        """
+        Build the SurrealQL projection for a load.
+
+        `alias` prefixes every field (e.g. "source" for fetched relations) and
+        `always` lists fields selected whenever `fields` is given.
+        """
+        if fields and omit:
+            raise InvalidInputError("Use either fields or omit, not both")
+        for name in [*(fields or []), *(omit or [])]:
+            if not _FIELD_NAME_PATTERN.match(name):
+                raise InvalidInputError(f"Invalid field name: {name!r}")
+
+        prefix = f"{alias}." if alias else ""
+        if fields:
+            selected = dict.fromkeys([*always, *fields])
+            return ", ".join(f"{prefix}{name}" for name in selected)
+        if omit:
+            return "* OMIT " + ", ".join(f"{prefix}{name}" for name in omit)
+        return "*"
+
+    @classmethod
+    def _loaded_field_names(
+        cls,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+        always: Sequence[str] = ("id",),
+    ) -> Optional[Set[str]]:
+        """Return the model fields a projection loads, or None if it loads all."""
+        all_fields = set(cls.model_fields)
+        if fields:
+            loaded = {*always, *fields} & all_fields
+        elif omit:
+            loaded = all_fields - set(omit)
+        else:
+            return None
+        return None if loaded >= all_fields else loaded
+
+    @classmethod
+    def _from_row(
+        cls: Type[T], row: Dict[str, Any], loaded: Optional[Set[str]] = None
+    ) -> T:
+        """
+        Build an object from a database row.
+
+        Fully loaded rows are validated as a whole. Projected rows may lack
+        required fields, so each loaded field is validated on its own and the
+        object is marked partial. Fields left out stay unset: reading one
+        raises FieldNotLoadedError until it is fetched with `load_fields`.
+        """
+        if loaded is None:
+            obj = cls(**row)
+        else:
+            obj = cls.model_construct()
+            for name in cls.model_fields:
+                if name not in loaded:
+                    obj.__dict__.pop(name, None)
+            for key, value in row.items():
+                if key in cls.model_fields:
+                    cls.__pydantic_validator__.validate_assignment(obj, key, value)
+            obj._loaded_fields = set(loaded)
+        obj._track_changes = True
+        # Rows embedded before the hash was stored have none, so their
+        # embedding is recomputed on the next save
+        obj._embedding_hash = row.get("embedding_hash")
+        return obj
+
+    @property
+    def is_partial(self) -> bool:
+        """True when the object was loaded with a projection."""
+        return self._loaded_fields is not None
+
+    @property
+    def missing_fields(self) -> Set[str]:
+        """Model fields left out by a projected load."""
+        if self._loaded_fields is None:
+            return set()
+        return set(self.__class__.model_fields) - self._loaded_fields
+
+    async def load_fields(self, *fields: str) -> None:
+        """
+        Fetch fields left out by a projected load.
+
+        Without arguments every missing field is loaded. Fields that are
+        already loaded are not fetched again.
+        """
+        if self._loaded_fields is None:
+            return
+        unknown = [name for name in fields if name not in self.__class__.model_fields]
+        if unknown:
+            raise InvalidInputError(f"Unknown fields: {', '.join(unknown)}")
+        wanted = (set(fields) if fields else self.missing_fields) - self._loaded_fields
+        if not wanted:
+            return
+        if self.id is None:
+            raise InvalidInputError("Cannot load fields of an object without an ID")
+
+        try:
+            result = await repo_query(
+                f"SELECT {', '.join(sorted(wanted))} FROM $id",
+                {"id": ensure_record_id(self.id)},
+            )
+        except Exception as e:
+            logger.error(f"Error loading fields for {self.id}: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError(e)
+        if not result:
+            raise NotFoundError(f"Object with id {self.id} not found")
+
+        for name in wanted:
+            if name in result[0]:
+                self.__class__.__pydantic_validator__.validate_assignment(
+                    self, name, result[0][name]
+                )
+        loaded = self._loaded_fields | wanted
+        self._loaded_fields = (
+            None if loaded >= set(self.__class__.model_fields) else loaded
+        )
+
+    async def fetch_field(self, name: str) -> Any:
+        """Return a field value, loading it first if a projection left it out."""
+        await self.load_fields(name)
+        return getattr(self, name)
+
     @classmethod
     def _get_class_by_table_name(cls, table_name: str) -> Optional[Type["ObjectModel"]]:
         """Find the appropriate subclass based on table_name."""
+        return _table_registry.get(table_name)
 
-        def get_all_subclasses(c: Type["ObjectModel"]) -> List[Type["ObjectModel"]]:
-            all_subclasses: List[Type["ObjectModel"]] = []
-            for subclass in c.__subclasses__():
-                all_subclasses.append(subclass)
-                all_subclasses.extend(get_all_subclasses(subclass))
-            return all_subclasses
+    @staticmethod
+    def model_for_table(table_name: str) -> Optional[Type["ObjectModel"]]:
+        """Return the model class registered for a table, if any."""
+        return _table_registry.get(table_name)
 
-        for subclass in get_all_subclasses(ObjectModel):
-            if hasattr(subclass, "table_name") and subclass.table_name == table_name:
-                return subclass
-        return None
+    @staticmethod
+    def registered_models() -> Dict[str, Type["ObjectModel"]]:
+        """Return a copy of the table_name -> model class registry."""
+        return dict(_table_registry)
 
     def needs_embedding(self) -> bool:
         return False
@@ -110,38 +553,66 @@ class ObjectModel(BaseModel):
     def get_embedding_content(self) -> Optional[str]:
         return None
 
+    def _loaded_embedding_content(self) -> Optional[str]:
+        """The embedding content, or None when a projected load left it out."""
+        try:
+            return self.get_embedding_content()
+        except FieldNotLoadedError:
+            return None
+
+    def _embedding_content_hash(self) -> Optional[str]:
+        """Hash of the current embedding content, or None if there is none."""
+        content = self._loaded_embedding_content()
+        if not content:
+            return None
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def embedding_is_current(self) -> bool:
+        """True when the stored embedding was computed from the current content."""
+        content_hash = self._embedding_content_hash()
+        return content_hash is not None and content_hash == self._embedding_hash
+
     async def save(self) -> None:
+        """
+        Create the record, or update it if it has an id.
+
+        Objects loaded from the database track which fields were assigned
+        since loading; updating them only validates and sends those fields,
+        and is skipped entirely when nothing changed. Objects built in memory
+        with an id are written in full.
+        """
         from open_notebook.domain.models import model_manager
 
+        delta = self.id is not None and self._track_changes
+        if delta and not self._dirty_fields:
+            logger.debug(f"Skipping save of {self.id}: no changes")
+            return
+
         try:
-            self.model_validate(self.model_dump(), strict=True)
-            data = self._prepare_save_data()
-            data["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            data = self._save_data(delta)
 
+            embedding_hash = self._embedding_hash
             if self.needs_embedding():
-                embedding_content = self.get_embedding_content()
+                embedding_content = self._loaded_embedding_content()
                 if embedding_content:
-                    EMBEDDING_MODEL = await model_manager.get_embedding_model()
-                    if not EMBEDDING_MODEL:
+                    embedder = await model_manager.get_embedding_batcher()
+                    if not embedder:
                         logger.warning(
                             "No embedding model found. Content will not be searchable."
                         )
                     data["embedding"] = (
-                        (await EMBEDDING_MODEL.aembed([embedding_content]))[0]
-                        if EMBEDDING_MODEL
-                        else []
+                        await embedder.embed(embedding_content) if embedder else []
                     )
+                    embedding_hash = (
+                        self._embedding_content_hash() if data["embedding"] else None
+                    )
+                    data["embedding_hash"] = embedding_hash
 
             repo_result: Union[List[Dict[str, Any]], Dict[str, Any]]
             if self.id is None:
                 data["created"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 repo_result = await repo_create(self.__class__.table_name, data)
             else:
-                data["created"] = (
-                    self.created.strftime("%Y-%m-%d %H:%M:%S")
-                    if isinstance(self.created, datetime)
-                    else self.created
-                )
                 logger.debug(f"Updating record with id {self.id}")
                 repo_result = await repo_update(
                     self.__class__.table_name, self.id, data
@@ -149,12 +620,9 @@ class ObjectModel(BaseModel):
             # Update the current instance with the result
             # repo_result is a list of dictionaries
             result_list: List[Dict[str, Any]] = repo_result if isinstance(repo_result, list) else [repo_result]
-            for key, value in result_list[0].items():
-                if hasattr(self, key):
-                    if isinstance(getattr(self, key), BaseModel):
-                        setattr(self, key, type(getattr(self, key))(**value))
-                    else:
-                        setattr(self, key, value)
+            self._apply_saved_row(result_list[0], embedding_hash)
+            if self.__class__.searchable:
+                await bump_corpus_version()
 
         except ValidationError as e:
             logger.error(f"Validation failed: {e}")
@@ -166,8 +634,177 @@ class ObjectModel(BaseModel):
             logger.error(f"Error saving record: {e}")
             raise DatabaseOperationError(e)
 
-    def _prepare_save_data(self) -> Dict[str, Any]:
-        data = self.model_dump()
+    @classmethod
+    async def save_many(
+        cls, models: Sequence["ObjectModel"], embedding_batch_size: int = 64
+    ) -> None:
+        """
+        Save a collection of objects with a handful of round trips.
+
+        Embeddings are computed with one `aembed` call per
+        `embedding_batch_size` texts not already cached, new objects are
+        created with one insert per table and existing ones are updated in
+        a single transaction. Generated ids are written back onto the new
+        objects. Objects loaded from the database without changes are
+        skipped, as in `save`.
+
+        Overrides of `save` are not called; subclasses that need to react
+        to a write should override `_apply_saved_row`, which runs for every
+        object saved either way.
+        """
+        from open_notebook.domain.models import model_manager
+
+        pending: List[ObjectModel] = []
+        deltas: List[bool] = []
+        for model in models:
+            delta = model.id is not None and model._track_changes
+            if delta and not model._dirty_fields:
+                continue
+            pending.append(model)
+            deltas.append(delta)
+        if not pending:
+            return
+
+        try:
+            payloads = [
+                model._save_data(delta) for model, delta in zip(pending, deltas)
+            ]
+            embedding_hashes = [model._embedding_hash for model in pending]
+
+            to_embed: List[int] = []
+            texts: List[str] = []
+            for index, model in enumerate(pending):
+                if model.needs_embedding():
+                    content = model._loaded_embedding_content()
+                    if content:
+                        to_embed.append(index)
+                        texts.append(content)
+            if to_embed:
+                embedder = await model_manager.get_embedding_batcher()
+                if not embedder:
+                    logger.warning(
+                        "No embedding model found. Content will not be searchable."
+                    )
+                vectors = (
+                    await embedder.embed_many(texts, batch_size=embedding_batch_size)
+                    if embedder
+                    else [[] for _ in texts]
+                )
+                for index, vector in zip(to_embed, vectors):
+                    payloads[index]["embedding"] = vector
+                    embedding_hashes[index] = (
+                        pending[index]._embedding_content_hash() if vector else None
+                    )
+                    payloads[index]["embedding_hash"] = embedding_hashes[index]
+
+            creates: Dict[str, List[int]] = {}
+            updates: List[int] = []
+            for index, model in enumerate(pending):
+                if model.id is None:
+                    creates.setdefault(model.__class__.table_name, []).append(index)
+                else:
+                    updates.append(index)
+
+            for table, indexes in creates.items():
+                now = datetime.now(timezone.utc)
+                rows = []
+                for index in indexes:
+                    data = payloads[index]
+                    data.pop("id", None)
+                    data["created"] = now
+                    data["updated"] = now
+                    rows.append(data)
+                logger.debug(f"Creating {len(rows)} {table} records")
+                created = await repo_insert(table, rows)
+                if len(created) != len(indexes):
+                    raise DatabaseOperationError(
+                        f"Expected {len(indexes)} created {table} records, "
+                        f"got {len(created)}"
+                    )
+                for index, row in zip(indexes, created):
+                    pending[index]._apply_saved_row(row, embedding_hashes[index])
+
+            if updates:
+                logger.debug(f"Updating {len(updates)} records")
+                updated = await repo_update_many(
+                    [(pending[index].id, payloads[index]) for index in updates]
+                )
+                for index, rows in zip(updates, updated):
+                    if rows:
+                        pending[index]._apply_saved_row(
+                            rows[0], embedding_hashes[index]
+                        )
+            if any(model.__class__.searchable for model in pending):
+                await bump_corpus_version()
+
+        except ValidationError as e:
+            logger.error(f"Validation failed: {e}")
+            raise
+        except (RuntimeError, DatabaseOperationError):
+            raise
+        except Exception as e:
+            logger.error(f"Error saving records: {e}")
+            raise DatabaseOperationError(e)
+
+    def _save_data(self, delta: bool) -> Dict[str, Any]:
+        """
+        Validate the object and return the data `save` writes.
+
+        With `delta` only the dirty fields are validated and written.
+        """
+        if delta:
+            for name in sorted(self._dirty_fields):
+                self.__class__.__pydantic_validator__.validate_assignment(
+                    self, name, getattr(self, name), strict=True
+                )
+            data = self._prepare_save_data(fields=self._dirty_fields)
+        else:
+            if not self.is_partial:
+                self.model_validate(self.model_dump(), strict=True)
+            data = self._prepare_save_data()
+            if self.id is not None:
+                data["created"] = (
+                    self.created.strftime("%Y-%m-%d %H:%M:%S")
+                    if isinstance(self.created, datetime)
+                    else self.created
+                )
+        data["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return data
+
+    def _apply_saved_row(
+        self, row: Dict[str, Any], embedding_hash: Optional[str]
+    ) -> None:
+        """Copy the stored record back onto the object and reset tracking."""
+        for key, value in row.items():
+            if self._loaded_fields is not None and key in self.__class__.model_fields:
+                # The database returns the whole record, filling in
+                # fields a projected load left out
+                self.__class__.__pydantic_validator__.validate_assignment(
+                    self, key, value
+                )
+                self._loaded_fields.add(key)
+            elif hasattr(self, key):
+                if isinstance(getattr(self, key), BaseModel):
+                    setattr(self, key, type(getattr(self, key))(**value))
+                else:
+                    setattr(self, key, value)
+        if self._loaded_fields is not None and self._loaded_fields >= set(
+            self.__class__.model_fields
+        ):
+            self._loaded_fields = None
+        self._dirty_fields.clear()
+        self._track_changes = True
+        self._embedding_hash = embedding_hash
+
+    def _prepare_save_data(self, fields: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Dump the fields to write. `fields` limits the dump to those fields.
+
+        Partial objects only write the fields they loaded, so fields left out
+        by a projection keep their stored values.
+        """
+        include = fields if fields is not None else self._loaded_fields
+        data = self.model_dump(include=include)
         return {
             key: value
             for key, value in data.items()
@@ -179,7 +816,10 @@ class ObjectModel(BaseModel):
             raise InvalidInputError("Cannot delete object without an ID")
         try:
             logger.debug(f"Deleting record with id {self.id}")
-            return await repo_delete(self.id)
+            deleted = await repo_delete(self.id)
+            if self.__class__.searchable:
+                await bump_corpus_version()
+            return deleted
         except Exception as e:
             logger.error(
                 f"Error deleting {self.__class__.table_name} with id {self.id}: {str(e)}"
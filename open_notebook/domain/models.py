@@ -1,4 +1,20 @@
-from typing import ClassVar, Dict, Optional, Union
+import asyncio
+import os
+import time
+import weakref
+from dataclasses import dataclass
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from esperanto import (
     AIFactory,
@@ -7,10 +23,13 @@ from esperanto import (
     SpeechToTextModel,
     TextToSpeechModel,
 )
+from langchain_core.language_models.chat_models import BaseChatModel
 from loguru import logger
 
-from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.database.repository import ensure_record_id, repo_live, repo_query
 from open_notebook.domain.base import ObjectModel, RecordModel
+from open_notebook.utils.cache import LRUCache
+from open_notebook.utils.embedding_cache import EmbeddingCache, get_embedding_cache
 
 ModelType = Union[LanguageModel, EmbeddingModel, SpeechToTextModel, TextToSpeechModel]
 
@@ -28,6 +47,22 @@ class Model(ObjectModel):
         )
         return [Model(**model) for model in models]
 
+    def _apply_saved_row(
+        self, row: Dict[str, Any], embedding_hash: Optional[str]
+    ) -> None:
+        model_id = self.id
+        super()._apply_saved_row(row, embedding_hash)
+        # Provisioned instances were built from the old row; this runs for
+        # save() and save_many() alike
+        model_manager.invalidate(model_id or self.id)
+
+    async def delete(self) -> bool:
+        try:
+            return await super().delete()
+        finally:
+            if self.id:
+                model_manager.invalidate(self.id)
+
 
 class DefaultModels(RecordModel):
     record_id: ClassVar[str] = "open_notebook:default_models"
@@ -40,9 +75,28 @@ class DefaultModels(RecordModel):
     default_embedding_model: Optional[str] = None
     default_tools_model: Optional[str] = None
 
+    # Process-wide cache of the defaults record. Reads are served from it
+    # until the TTL expires or update()/patch() writes new defaults.
+    _cache_ttl: ClassVar[float] = float(os.getenv("DEFAULT_MODELS_CACHE_TTL", "60"))
+    _cached_data: ClassVar[Optional[Dict[str, Any]]] = None
+    _cached_at: ClassVar[float] = 0.0
+
+    @classmethod
+    async def get_instance(cls, refresh: bool = False) -> "DefaultModels":
+        """
+        Return the default models, served from the process-wide cache.
+
+        Each call returns a new instance, so callers can't change the cached
+        values by mutating it. Pass refresh=True to read from the database.
+        """
+        data = None if refresh else cls._get_cached_data()
+        if data is None:
+            data = await cls._fetch_data()
+            cls._set_cached_data(data)
+        return cls._from_data(data)
+
     @classmethod
-    async def get_instance(cls) -> "DefaultModels":
-        """Always fetch fresh defaults from database (override parent caching behavior)"""
+    async def _fetch_data(cls) -> Dict[str, Any]:
         result = await repo_query(
             "SELECT * FROM ONLY $record_id",
             {"record_id": ensure_record_id(cls.record_id)},
@@ -50,34 +104,363 @@ class DefaultModels(RecordModel):
 
         if result:
             if isinstance(result, list) and len(result) > 0:
-                data = result[0]
+                return result[0]
             elif isinstance(result, dict):
-                data = result
-            else:
-                data = {}
-        else:
-            data = {}
+                return result
+        return {}
 
+    @classmethod
+    def _from_data(cls, data: Dict[str, Any]) -> "DefaultModels":
         # Create new instance with fresh data (bypass singleton cache)
         instance = object.__new__(cls)
         object.__setattr__(instance, "__dict__", {})
         super(RecordModel, instance).__init__(**data)
         return instance
 
+    @classmethod
+    def _get_cached_data(cls) -> Optional[Dict[str, Any]]:
+        if cls._cached_data is None or cls._cache_ttl <= 0:
+            return None
+        if time.monotonic() - cls._cached_at > cls._cache_ttl:
+            return None
+        return cls._cached_data
+
+    @classmethod
+    def _set_cached_data(cls, data: Dict[str, Any]) -> None:
+        cls._cached_data = dict(data)
+        cls._cached_at = time.monotonic()
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop the cached defaults so the next read goes to the database."""
+        cls._cached_data = None
+
+    async def update(self):
+        try:
+            return await super().update()
+        finally:
+            # patch() goes through update() as well
+            self.__class__.invalidate_cache()
+
+    @classmethod
+    async def watch(cls) -> None:
+        """
+        Invalidate the cache whenever the defaults record changes.
+
+        Runs a LIVE SELECT until cancelled, so changes made by other processes
+        are picked up before the TTL expires. Start it as a background task:
+            asyncio.create_task(DefaultModels.watch())
+        """
+        table = cls.record_id.split(":", 1)[0]
+        record_id = str(ensure_record_id(cls.record_id))
+        try:
+            async for notification in repo_live(table):
+                changed_id = (
+                    notification.get("id") if isinstance(notification, dict) else None
+                )
+                if (
+                    changed_id is None
+                    or str(ensure_record_id(changed_id)) == record_id
+                ):
+                    logger.debug("Default models changed, invalidating cache")
+                    cls.invalidate_cache()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Stopped watching default models: {e}")
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn model kwargs into a hashable cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(_freeze(v)) for v in value))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+@dataclass
+class _ProvisionedModel:
+    model: ModelType
+    langchain: Optional[BaseChatModel] = None
+
+
+_ModelCache = LRUCache[Tuple[str, Hashable], _ProvisionedModel]
+
+
+# Settings that don't change the vectors a model returns
+_KEY_IGNORED_CONFIG = {"api_key", "model_name", "timeout", "max_retries"}
+
+
+def _embedding_model_key(model: EmbeddingModel) -> str:
+    """
+    Identify an embedding model by provider, model name and configuration.
+
+    Settings such as `dimensions` or `base_url` can change the vectors a
+    model returns, so they are part of the key.
+    """
+    provider = getattr(model, "provider", None) or type(model).__name__
+    get_model_name = getattr(model, "get_model_name", None)
+    model_name = (
+        get_model_name() if callable(get_model_name) else None
+    ) or getattr(model, "model_name", None)
+    config = {
+        key: value
+        for key, value in (getattr(model, "_config", None) or {}).items()
+        if key not in _KEY_IGNORED_CONFIG and value is not None
+    }
+    base_url = getattr(model, "base_url", None)
+    if base_url:
+        config["base_url"] = base_url
+    if not config:
+        return f"{provider}/{model_name}"
+    return f"{provider}/{model_name}?{_freeze(config)!r}"
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into batched `aembed` calls.
+
+    Texts submitted through `embed` are queued for up to `max_wait` seconds,
+    or until `max_batch_size` texts are waiting, and then embedded with a
+    single request. Duplicate texts in a batch are embedded once. Batchers
+    are bound to the event loop they are used on.
+
+    With a `cache`, texts this model has embedded before are answered from it
+    and new vectors are added to it.
+    """
+
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
+        self.model = model
+        self.cache = cache
+        self.cache_key = _embedding_model_key(model)
+        self.max_batch_size = max(
+            1, max_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        )
+        self.max_wait = (
+            max_wait
+            if max_wait is not None
+            else float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "10")) / 1000
+        )
+        self._pending: List[Tuple[str, "asyncio.Future[List[float]]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.requests = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed one text, sharing the request with concurrent callers."""
+        if self.cache is not None:
+            cached = (await self.cache.aget_many(self.cache_key, [text]))[0]
+            if cached is not None:
+                return cached
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[List[float]]" = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def embed_many(
+        self, texts: Sequence[str], batch_size: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        Embed several texts, sending up to `batch_size` texts per request.
+
+        Cached and duplicate texts are not sent.
+        """
+        results: List[Optional[List[float]]] = (
+            await self.cache.aget_many(self.cache_key, texts)
+            if self.cache is not None
+            else [None] * len(texts)
+        )
+        missing = list(
+            dict.fromkeys(
+                text for text, vector in zip(texts, results) if vector is None
+            )
+        )
+        size = max(1, batch_size or self.max_batch_size)
+        embedded: Dict[str, List[float]] = {}
+        for start in range(0, len(missing), size):
+            chunk = missing[start : start + size]
+            embedded.update(zip(chunk, await self._aembed(chunk)))
+        return [
+            vector if vector is not None else embedded[text]
+            for text, vector in zip(texts, results)
+        ]
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        vectors = await self.model.aembed(texts)
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        if self.cache is not None:
+            await self.cache.aput_many(self.cache_key, texts, vectors)
+        return vectors
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self, batch: List[Tuple[str, "asyncio.Future[List[float]]"]]
+    ) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = await self._aembed(texts)
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+_BatcherCache = LRUCache[int, EmbeddingBatcher]
+
 
 class ModelManager:
-    def __init__(self):
-        pass  # No caching needed
+    """
+    Resolves model ids into provisioned model instances.
+
+    Instances are cached in an LRU keyed on (model_id, kwargs) and reused until
+    the Model row is saved or deleted in this process, or for MODEL_CACHE_TTL
+    seconds, so edits made by another process are picked up. Provider clients
+    can be bound to the event loop that created them, so each running loop
+    keeps its own cache of instances; the Model rows they are built from are
+    cached process-wide, so code that runs each call on a fresh loop still
+    skips the lookup.
+    """
+
+    def __init__(
+        self,
+        max_cached_models: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        self.max_cached_models = max_cached_models or int(
+            os.getenv("MODEL_CACHE_SIZE", "32")
+        )
+        self.cache_ttl = (
+            cache_ttl
+            if cache_ttl is not None
+            else float(os.getenv("MODEL_CACHE_TTL", "300"))
+        )
+        self._rows: LRUCache[str, Model] = LRUCache(
+            self.max_cached_models, ttl=self.cache_ttl
+        )
+        self._caches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ModelCache]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Keyed on id() of the embedding model; the batcher keeps it alive
+        self._batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _BatcherCache]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _loop_cache(self, caches: "weakref.WeakKeyDictionary") -> LRUCache:
+        loop = asyncio.get_running_loop()
+        cache = caches.get(loop)
+        if cache is None:
+            # Clients cached for a closed loop can never be used again
+            for stale in [other for other in caches if other.is_closed()]:
+                caches.pop(stale, None)
+            cache = LRUCache(self.max_cached_models, ttl=self.cache_ttl)
+            caches[loop] = cache
+        return cache
+
+    def _cache(self) -> "_ModelCache":
+        return self._loop_cache(self._caches)
+
+    def _batcher_for(self, model: EmbeddingModel) -> EmbeddingBatcher:
+        batchers: _BatcherCache = self._loop_cache(self._batchers)
+        batcher = batchers.get(id(model))
+        if batcher is None or batcher.model is not model:
+            batcher = EmbeddingBatcher(model, cache=get_embedding_cache())
+            batchers.set(id(model), batcher)
+        return batcher
+
+    def invalidate(self, model_id: Optional[str] = None) -> None:
+        """Drop cached instances of `model_id`, or of every model."""
+        if model_id is None:
+            self._rows.clear()
+        else:
+            self._rows.pop(str(model_id))
+        for cache in list(self._caches.values()):
+            if model_id is None:
+                cache.clear()
+            else:
+                cache.remove_where(lambda key: key[0] == str(model_id))
 
     async def get_model(self, model_id: str, **kwargs) -> Optional[ModelType]:
-        """Get a model by ID. Esperanto will cache the actual model instance."""
+        """Get a model by ID, reusing a cached instance when one exists."""
+        provisioned = await self._get_provisioned(model_id, kwargs)
+        return provisioned.model if provisioned else None
+
+    async def get_langchain_model(
+        self, model_id: str, **kwargs
+    ) -> Optional[BaseChatModel]:
+        """Get the LangChain wrapper of a language model, built once per instance."""
+        provisioned = await self._get_provisioned(model_id, kwargs)
+        if provisioned is None:
+            return None
+        assert isinstance(provisioned.model, LanguageModel), (
+            f"Model is not a LanguageModel: {provisioned.model}"
+        )
+        if provisioned.langchain is None:
+            provisioned.langchain = provisioned.model.to_langchain()
+        return provisioned.langchain
+
+    async def _get_provisioned(
+        self, model_id: str, kwargs: Dict[str, Any]
+    ) -> Optional[_ProvisionedModel]:
         if not model_id:
             return None
+        cache = self._cache()
+        key = (str(model_id), _freeze(kwargs))
+        provisioned = cache.get(key)
+        if provisioned is None:
+            model = await self._create_model(model_id, **kwargs)
+            if model is None:
+                return None
+            provisioned = _ProvisionedModel(model)
+            cache.set(key, provisioned)
+        return provisioned
 
-        try:
-            model: Model = await Model.get(model_id)
-        except Exception:
-            raise ValueError(f"Model with ID {model_id} not found")
+    async def _get_row(self, model_id: str) -> Model:
+        model = self._rows.get(str(model_id))
+        if model is None:
+            try:
+                model = await Model.get(model_id)
+            except Exception:
+                raise ValueError(f"Model with ID {model_id} not found")
+            self._rows.set(str(model_id), model)
+        return model
+
+    async def _create_model(self, model_id: str, **kwargs) -> Optional[ModelType]:
+        model = await self._get_row(model_id)
 
         if not model.type or model.type not in [
             "language",
@@ -158,6 +541,15 @@ class ModelManager:
         )
         return model
 
+    async def get_embedding_batcher(self, **kwargs) -> Optional[EmbeddingBatcher]:
+        """
+        Get the batcher of the default embedding model.
+
+        Concurrent callers embedding one text each share a single request.
+        """
+        model = await self.get_embedding_model(**kwargs)
+        return self._batcher_for(model) if model is not None else None
+
     async def get_default_model(self, model_type: str, **kwargs) -> Optional[ModelType]:
         """
         Get the default model for a specific type.
@@ -166,6 +558,14 @@ class ModelManager:
             model_type: The type of model to retrieve (e.g., 'chat', 'embedding', etc.)
             **kwargs: Additional arguments to pass to the model constructor
         """
+        model_id = await self.get_default_model_id(model_type)
+        if not model_id:
+            return None
+
+        return await self.get_model(model_id, **kwargs)
+
+    async def get_default_model_id(self, model_type: str) -> Optional[str]:
+        """Resolve the id of the default model for a specific type."""
         defaults = await self.get_defaults()
         model_id = None
 
@@ -189,10 +589,7 @@ class ModelManager:
         elif model_type == "large_context":
             model_id = defaults.large_context_model
 
-        if not model_id:
-            return None
-
-        return await self.get_model(model_id, **kwargs)
+        return model_id
 
 
 model_manager = ModelManager()
@@ -1,14 +1,48 @@
 import asyncio
-from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple, Union
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from loguru import logger
 from pydantic import BaseModel, Field, field_validator
 from surreal_commands import submit_command
 from surrealdb import RecordID
 
-from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.database.repository import (
+    QueryBatch,
+    ensure_record_id,
+    repo_query,
+)
 from open_notebook.domain.base import ObjectModel
 from open_notebook.domain.models import model_manager
+from open_notebook.domain.search_cache import (
+    bump_corpus_version,
+    cache_results,
+    get_cached_results,
+    search_cache_key,
+)
+from open_notebook.domain.search_index import (
+    get_local_index,
+    index_record,
+    local_index_enabled,
+    mark_source_stale,
+    search_local_index,
+    unindex_parent,
+    unindex_records,
+)
+from open_notebook.domain.vectorization import (
+    VectorizationStats,
+    vectorize_source_inline,
+)
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
 from open_notebook.utils import split_text
 
@@ -26,35 +60,121 @@ class Notebook(ObjectModel):
             raise InvalidInputError("Notebook name cannot be empty")
         return v
 
-    async def get_sources(self) -> List["Source"]:
+    async def get_sources(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List["Source"]:
+        """
+        Fetch the notebook's sources, most recently updated first.
+
+        By default `full_text` is left out. `fields` / `omit` choose another
+        projection; sources loaded this way are partial (see ObjectModel.get).
+        """
+        if fields is None and omit is None:
+            omit = ["full_text"]
+        always = ("id", "updated")
         try:
+            projection = Source._projection(fields, omit, alias="source", always=always)
             srcs = await repo_query(
-                """
-                select * omit source.full_text from (
+                f"""
+                select {projection} from (
                 select in as source from reference where out=$id
                 fetch source
             ) order by source.updated desc
             """,
                 {"id": ensure_record_id(self.id)},
             )
-            return [Source(**src["source"]) for src in srcs] if srcs else []
+            loaded = Source._loaded_field_names(fields, omit, always=always)
+            return [Source._from_row(src["source"], loaded) for src in srcs] if srcs else []
         except Exception as e:
             logger.error(f"Error fetching sources for notebook {self.id}: {str(e)}")
             logger.exception(e)
             raise DatabaseOperationError(e)
 
-    async def get_notes(self) -> List["Note"]:
+    async def get_sources_with_insights(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List[Tuple["Source", List["SourceInsight"]]]:
+        """
+        Fetch the notebook's sources and all of their insights in one round trip.
+
+        Sources are ordered and projected as in get_sources.
+        """
+        if fields is None and omit is None:
+            omit = ["full_text"]
+        always = ("id", "updated")
         try:
-            srcs = await repo_query(
+            projection = Source._projection(fields, omit, alias="source", always=always)
+            batch = QueryBatch()
+            sources_idx = batch.add(
+                f"""
+                select {projection} from (
+                select in as source from reference where out=$id
+                fetch source
+            ) order by source.updated desc
+            """,
+                {"id": ensure_record_id(self.id)},
+            )
+            insights_idx = batch.add(
                 """
-            select * omit note.content, note.embedding from (
+                SELECT * FROM source_insight
+                WHERE source IN (SELECT VALUE in FROM reference WHERE out=$id)
+                """,
+                {"id": ensure_record_id(self.id)},
+            )
+            results = await batch.execute()
+        except Exception as e:
+            logger.error(f"Error fetching sources for notebook {self.id}: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError(e)
+
+        insights_by_source: Dict[str, List[SourceInsight]] = {}
+        for row in results[insights_idx]:
+            if row.get("source"):
+                insights_by_source.setdefault(
+                    Source._normalize_id(str(row["source"])), []
+                ).append(SourceInsight(**row))
+        loaded = Source._loaded_field_names(fields, omit, always=always)
+        fetched: List[Tuple[Source, List[SourceInsight]]] = []
+        for row in results[sources_idx]:
+            source_id = Source._normalize_id(str(row["source"]["id"]))
+            fetched.append(
+                (
+                    Source._from_row(row["source"], loaded),
+                    insights_by_source.get(source_id, []),
+                )
+            )
+        return fetched
+
+    async def get_notes(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List["Note"]:
+        """
+        Fetch the notebook's notes, most recently updated first.
+
+        By default `content` and `embedding` are left out. `fields` / `omit`
+        choose another projection; notes loaded this way are partial.
+        """
+        if fields is None and omit is None:
+            omit = ["content", "embedding"]
+        always = ("id", "updated")
+        try:
+            projection = Note._projection(fields, omit, alias="note", always=always)
+            srcs = await repo_query(
+                f"""
+            select {projection} from (
                 select in as note from artifact where out=$id
                 fetch note
             ) order by note.updated desc
             """,
                 {"id": ensure_record_id(self.id)},
             )
-            return [Note(**src["note"]) for src in srcs] if srcs else []
+            loaded = Note._loaded_field_names(fields, omit, always=always)
+            return [Note._from_row(src["note"], loaded) for src in srcs] if srcs else []
         except Exception as e:
             logger.error(f"Error fetching notes for notebook {self.id}: {str(e)}")
             logger.exception(e)
@@ -93,6 +213,7 @@ class Asset(BaseModel):
 
 class SourceEmbedding(ObjectModel):
     table_name: ClassVar[str] = "source_embedding"
+    searchable: ClassVar[bool] = True
     content: str
 
     async def get_source(self) -> "Source":
@@ -112,6 +233,7 @@ class SourceEmbedding(ObjectModel):
 
 class SourceInsight(ObjectModel):
     table_name: ClassVar[str] = "source_insight"
+    searchable: ClassVar[bool] = True
     insight_type: str
     content: str
 
@@ -129,6 +251,11 @@ class SourceInsight(ObjectModel):
             logger.exception(e)
             raise DatabaseOperationError(e)
 
+    async def delete(self) -> bool:
+        deleted = await super().delete()
+        unindex_records([self.id])
+        return deleted
+
     async def save_as_note(self, notebook_id: Optional[str] = None) -> Any:
         source = await self.get_source()
         note = Note(
@@ -143,6 +270,7 @@ class SourceInsight(ObjectModel):
 
 class Source(ObjectModel):
     table_name: ClassVar[str] = "source"
+    searchable: ClassVar[bool] = True
     asset: Optional[Asset] = None
     title: Optional[str] = None
     topics: Optional[List[str]] = Field(default_factory=list)
@@ -213,20 +341,80 @@ class Source(ObjectModel):
             logger.warning(f"Failed to get command progress for {self.command}: {e}")
             return None
 
+    @classmethod
+    async def get_with_insights(
+        cls,
+        source_ids: List[str],
+        fields: Optional[Sequence[str]] = None,
+        omit: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[Optional["Source"], List[SourceInsight]]]:
+        """
+        Fetch several sources together with their insights in one round trip.
+
+        Returns one (source, insights) pair per input id, in input order.
+        The source is None when the id does not exist. `fields` / `omit`
+        project the sources as in ObjectModel.get.
+        """
+        record_ids = [cls._normalize_id(source_id) for source_id in source_ids]
+        if not record_ids:
+            return []
+        try:
+            ids = [ensure_record_id(record_id) for record_id in dict.fromkeys(record_ids)]
+            batch = QueryBatch()
+            sources_idx = batch.add(
+                f"SELECT {cls._projection(fields, omit)} FROM $ids", {"ids": ids}
+            )
+            insights_idx = batch.add(
+                "SELECT * FROM source_insight WHERE source IN $ids", {"ids": ids}
+            )
+            results = await batch.execute()
+        except Exception as e:
+            logger.error(f"Error fetching sources with insights: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError(e)
+
+        sources_by_id = {
+            cls._normalize_id(str(row["id"])): row
+            for row in results[sources_idx]
+            if row.get("id")
+        }
+        insights_by_source: Dict[str, List[SourceInsight]] = {}
+        for row in results[insights_idx]:
+            if not row.get("source"):
+                continue
+            insights_by_source.setdefault(
+                cls._normalize_id(str(row["source"])), []
+            ).append(SourceInsight(**row))
+
+        loaded = cls._loaded_field_names(fields, omit)
+        fetched: List[Tuple[Optional[Source], List[SourceInsight]]] = []
+        for record_id in record_ids:
+            row = sources_by_id.get(record_id)
+            fetched.append(
+                (
+                    cls._from_row(row, loaded) if row else None,
+                    insights_by_source.get(record_id, []) if row else [],
+                )
+            )
+        return fetched
+
     async def get_context(
-        self, context_size: Literal["short", "long"] = "short"
+        self,
+        context_size: Literal["short", "long"] = "short",
+        insights: Optional[List[SourceInsight]] = None,
     ) -> Dict[str, Any]:
-        insights_list = await self.get_insights()
-        insights = [insight.model_dump() for insight in insights_list]
+        """Build the source context. Pass `insights` to skip fetching them."""
+        insights_list = insights if insights is not None else await self.get_insights()
+        insights_dump = [insight.model_dump() for insight in insights_list]
         if context_size == "long":
             return dict(
                 id=self.id,
                 title=self.title,
-                insights=insights,
+                insights=insights_dump,
                 full_text=self.full_text,
             )
         else:
-            return dict(id=self.id, title=self.title, insights=insights)
+            return dict(id=self.id, title=self.title, insights=insights_dump)
 
     async def get_embedded_chunks(self) -> int:
         try:
@@ -263,21 +451,35 @@ class Source(ObjectModel):
             raise InvalidInputError("Notebook ID must be provided")
         return await self.relate("reference", notebook_id)
 
-    async def vectorize(self) -> str:
+    async def vectorize(
+        self, mode: Literal["queued", "inline"] = "queued"
+    ) -> Union[str, VectorizationStats]:
         """
-        Submit vectorization as a background job using the vectorize_source command.
+        Vectorize the source, by default as a background job using the
+        vectorize_source command.
 
         This method now leverages the job-based architecture to prevent HTTP connection
         pool exhaustion when processing large documents. The actual chunk processing
         happens in the background worker pool, with natural concurrency control.
 
+        With mode="inline" the chunks are embedded and stored in this process
+        instead, with bounded concurrency, which avoids waiting on the queue in
+        batch and CLI use.
+
         Returns:
             str: The command/job ID that can be used to track progress via the commands API
+            VectorizationStats: With mode="inline", the chunk count and throughput
 
         Raises:
+            InvalidInputError: If mode is unknown
             ValueError: If source has no text to vectorize
             DatabaseOperationError: If job submission fails
         """
+        if mode not in ("queued", "inline"):
+            raise InvalidInputError(f"Unknown vectorization mode: {mode}")
+        if mode == "inline":
+            return await vectorize_source_inline(self)
+
         logger.info(f"Submitting vectorization job for source {self.id}")
 
         try:
@@ -297,6 +499,11 @@ class Source(ObjectModel):
             )
 
             command_id_str = str(command_id)
+            # Results cached before the job would outlive it; none are cached
+            # while it is pending
+            await bump_corpus_version(job=command_id_str)
+            # The worker writes the chunks; searches pick them up as they land
+            mark_source_stale(self.id, command_id_str)
             logger.info(
                 f"Vectorization job submitted for source {self.id}: "
                 f"command_id={command_id_str}"
@@ -310,17 +517,16 @@ class Source(ObjectModel):
             raise DatabaseOperationError(e)
 
     async def add_insight(self, insight_type: str, content: str) -> Any:
-        EMBEDDING_MODEL = await model_manager.get_embedding_model()
-        if not EMBEDDING_MODEL:
+        embedder = await model_manager.get_embedding_batcher()
+        if not embedder:
             logger.warning("No embedding model found. Insight will not be searchable.")
 
         if not insight_type or not content:
             raise InvalidInputError("Insight type and content must be provided")
         try:
-            embedding = (
-                (await EMBEDDING_MODEL.aembed([content]))[0] if EMBEDDING_MODEL else []
-            )
-            return await repo_query(
+            # Insights generated in parallel share one embedding request
+            embedding = await embedder.embed(content) if embedder else []
+            result = await repo_query(
                 """
                 CREATE source_insight CONTENT {
                         "source": $source_id,
@@ -335,13 +541,30 @@ class Source(ObjectModel):
                     "embedding": embedding,
                 },
             )
+            await bump_corpus_version()
+            for row in result:
+                index_record(
+                    "source_insight",
+                    {
+                        **row,
+                        "parent_id": row.get("source") or self.id,
+                        "title": f"{insight_type} - {self.title or ''}",
+                    },
+                )
+            return result
         except Exception as e:
             logger.error(f"Error adding insight to source {self.id}: {str(e)}")
             raise  # DatabaseOperationError(e)
 
-    def _prepare_save_data(self) -> dict:
+    async def delete(self) -> bool:
+        deleted = await super().delete()
+        # Chunks and insights of the source go with it
+        unindex_parent(self.id)
+        return deleted
+
+    def _prepare_save_data(self, fields: Optional[Set[str]] = None) -> dict:
         """Override to ensure command field is always RecordID format for database"""
-        data = super()._prepare_save_data()
+        data = super()._prepare_save_data(fields)
 
         # Ensure command field is RecordID format if not None
         if data.get("command") is not None:
@@ -352,6 +575,7 @@ class Source(ObjectModel):
 
 class Note(ObjectModel):
     table_name: ClassVar[str] = "note"
+    searchable: ClassVar[bool] = True
     title: Optional[str] = None
     note_type: Optional[Literal["human", "ai"]] = None
     content: Optional[str] = None
@@ -381,11 +605,23 @@ class Note(ObjectModel):
             )
 
     def needs_embedding(self) -> bool:
-        return True
+        # Only re-embed when the content differs from what was last embedded
+        return not self.embedding_is_current()
 
     def get_embedding_content(self) -> Optional[str]:
         return self.content
 
+    def _apply_saved_row(
+        self, row: Dict[str, Any], embedding_hash: Optional[str]
+    ) -> None:
+        super()._apply_saved_row(row, embedding_hash)
+        index_record("note", row)
+
+    async def delete(self) -> bool:
+        deleted = await super().delete()
+        unindex_records([self.id])
+        return deleted
+
 
 class ChatSession(ObjectModel):
     table_name: ClassVar[str] = "chat_session"
@@ -409,6 +645,10 @@ async def text_search(
 ):
     if not keyword:
         raise InvalidInputError("Search keyword cannot be empty")
+    cache_key = await search_cache_key("text", keyword, (results, source, note))
+    cached = get_cached_results(cache_key)
+    if cached is not None:
+        return cached
     try:
         search_results = await repo_query(
             """
@@ -417,6 +657,7 @@ async def text_search(
             """,
             {"keyword": keyword, "results": results, "source": source, "note": note},
         )
+        cache_results(cache_key, search_results)
         return search_results
     except Exception as e:
         logger.error(f"Error performing text search: {str(e)}")
@@ -430,14 +671,38 @@ async def vector_search(
     source: bool = True,
     note: bool = True,
     minimum_score=0.2,
+    embedding: Optional[List[float]] = None,
 ):
+    """
+    Search sources and notes by semantic similarity to `keyword`.
+
+    Pass `embedding` when the keyword has already been embedded, for
+    example together with related terms, to skip embedding it again.
+    """
     if not keyword:
         raise InvalidInputError("Search keyword cannot be empty")
+    # A hit skips both embedding the keyword and scanning the corpus
+    cache_key = await search_cache_key(
+        "vector", keyword, (results, source, note, minimum_score)
+    )
+    cached = get_cached_results(cache_key)
+    if cached is not None:
+        return cached
     try:
-        EMBEDDING_MODEL = await model_manager.get_embedding_model()
-        if EMBEDDING_MODEL is None:
-            raise ValueError("EMBEDDING_MODEL is not configured")
-        embed = (await EMBEDDING_MODEL.aembed([keyword]))[0]
+        if embedding:
+            embed = embedding
+        else:
+            embedder = await model_manager.get_embedding_batcher()
+            if embedder is None:
+                raise ValueError("EMBEDDING_MODEL is not configured")
+            embed = await embedder.embed(keyword)
+        if local_index_enabled():
+            index = await get_local_index()
+            search_results = await search_local_index(
+                index, embed, results, source, note, minimum_score
+            )
+            cache_results(cache_key, search_results)
+            return search_results
         search_results = await repo_query(
             """
             SELECT * FROM fn::vector_search($embed, $results, $source, $note, $minimum_score);
@@ -450,8 +715,71 @@ async def vector_search(
                 "minimum_score": minimum_score,
             },
         )
+        cache_results(cache_key, search_results)
         return search_results
     except Exception as e:
         logger.error(f"Error performing vector search: {str(e)}")
         logger.exception(e)
         raise DatabaseOperationError(e)
+
+
+async def hybrid_search(
+    keyword: str,
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    minimum_score=0.2,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    rrf_k: int = 60,
+    embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run text and vector search concurrently and merge them by rank.
+
+    Results are combined with weighted reciprocal-rank fusion: an item ranked
+    r-th (from 1) in a list scores weight / (rrf_k + r), summed over both
+    lists. Items are deduplicated by parent source or note, keeping the
+    fields of the best-ranked hit and every matched snippet. If one search
+    fails, the results of the other are returned. `minimum_score` and
+    `embedding` are passed on to `vector_search`; full-text relevance is on
+    another scale, so text hits are not filtered by score.
+    """
+    if not keyword:
+        raise InvalidInputError("Search keyword cannot be empty")
+    text_results, vector_results = await asyncio.gather(
+        text_search(keyword, results, source, note),
+        vector_search(keyword, results, source, note, minimum_score, embedding),
+        return_exceptions=True,
+    )
+    if isinstance(text_results, BaseException) and isinstance(
+        vector_results, BaseException
+    ):
+        raise text_results
+    ranked_lists = []
+    for name, weight, ranked in (
+        ("text", text_weight, text_results),
+        ("vector", vector_weight, vector_results),
+    ):
+        if isinstance(ranked, BaseException):
+            logger.warning(f"Hybrid search continuing without {name} results")
+            continue
+        ranked_lists.append((weight, ranked or []))
+
+    fused: Dict[str, Dict[str, Any]] = {}
+    for weight, ranked in ranked_lists:
+        for rank, item in enumerate(ranked, start=1):
+            key = str(item.get("parent_id") or item.get("id"))
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**item, "matches": [], "score": 0.0}
+            else:
+                for field, value in item.items():
+                    entry.setdefault(field, value)
+            entry["score"] += weight / (rrf_k + rank)
+            for match in item.get("matches") or []:
+                if match not in entry["matches"]:
+                    entry["matches"].append(match)
+
+    # Ties keep text results first, then vector results, in their own order
+    return sorted(fused.values(), key=lambda entry: -entry["score"])[:results]
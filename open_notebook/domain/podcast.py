@@ -1,4 +1,4 @@
-from typing import Any, ClassVar, Dict, List, Optional, Union
+from typing import Any, ClassVar, Dict, List, Optional, Set, Union
 
 from pydantic import Field, field_validator
 from surrealdb import RecordID
@@ -137,9 +137,9 @@ class PodcastEpisode(ObjectModel):
             return ensure_record_id(value)
         return value
 
-    def _prepare_save_data(self) -> dict:
+    def _prepare_save_data(self, fields: Optional[Set[str]] = None) -> dict:
         """Override to ensure command field is always RecordID format for database"""
-        data = super()._prepare_save_data()
+        data = super()._prepare_save_data(fields)
         
         # Ensure command field is RecordID format if not None
         if data.get("command") is not None:
@@ -0,0 +1,152 @@
+"""
+Cache of text and vector search results.
+
+Entries are keyed by the normalized search term, the search parameters and
+the corpus version, a counter stored in the database. Saving or deleting
+sources, insights, notes or embeddings bumps it, in whichever process the
+write happens, which retires every cached result at once. The version is
+read before each search together with the jobs queued to write embeddings,
+which the same record lists: while one of them is queued or running,
+results are not cached, and since the worker doesn't bump the version when
+it finishes, the first search to see a job finished bumps it instead.
+Entries also expire after SEARCH_CACHE_TTL seconds to bound memory.
+"""
+
+import copy
+import os
+from typing import Any, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.utils.cache import LRUCache
+
+_VERSION_RECORD = "open_notebook:search_corpus"
+
+_FINISHED_STATUSES = ("completed", "failed", "canceled")
+
+_cache: Optional[LRUCache[Tuple[Hashable, ...], List[Any]]] = None
+
+
+def search_cache_enabled() -> bool:
+    return os.getenv("SEARCH_CACHE_ENABLED", "true").lower() not in (
+        "false",
+        "0",
+        "no",
+    )
+
+
+def _get_cache() -> LRUCache[Tuple[Hashable, ...], List[Any]]:
+    global _cache
+    if _cache is None:
+        _cache = LRUCache(
+            int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", "300")),
+        )
+    return _cache
+
+
+async def corpus_version() -> Optional[int]:
+    """
+    Return the corpus version, or None when results must not be cached.
+
+    That is the case while a job registered with bump_corpus_version is
+    pending, or when the version can't be read. The statuses of the jobs
+    are read through the record's links, so no search scans the command
+    table.
+    """
+    try:
+        rows = await repo_query(
+            f"SELECT version, jobs, jobs.status AS statuses FROM {_VERSION_RECORD}"
+        )
+        row = rows[0] if rows else {}
+        jobs = row.get("jobs") or []
+        statuses = row.get("statuses") or []
+        # A job whose command was deleted has no status left
+        done = [
+            job
+            for job, status in zip(jobs, statuses)
+            if status is None or status in _FINISHED_STATUSES
+        ]
+        if done:
+            await repo_query(
+                f"UPDATE {_VERSION_RECORD} SET version += 1, "
+                "jobs = array::complement(jobs, $done) RETURN NONE",
+                {"done": [ensure_record_id(job) for job in done]},
+            )
+            clear_search_cache()
+            return None
+    except Exception as e:
+        logger.warning(f"Failed to read the search corpus version: {e}")
+        return None
+    if jobs:
+        return None
+    return int(row.get("version") or 0)
+
+
+async def bump_corpus_version(job: Optional[str] = None) -> None:
+    """
+    Mark every cached search result as stale, in every process.
+
+    Pass the id of a queued command that writes to the corpus as job;
+    nothing is cached until it finishes. Does nothing when the cache is
+    disabled; processes sharing a database are expected to share the
+    setting.
+    """
+    if not search_cache_enabled():
+        return
+    try:
+        if job:
+            await repo_query(
+                f"UPSERT {_VERSION_RECORD} SET version = (version OR 0) + 1, "
+                "jobs = array::union(jobs OR [], [$job]) RETURN NONE",
+                {"job": ensure_record_id(job)},
+            )
+        else:
+            await repo_query(
+                f"UPSERT {_VERSION_RECORD} SET version = (version OR 0) + 1 "
+                "RETURN NONE"
+            )
+    except Exception as e:
+        logger.warning(f"Failed to bump the search corpus version: {e}")
+    # Entries of this process are retired either way
+    clear_search_cache()
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(term.split()).casefold()
+
+
+async def search_cache_key(
+    kind: str, term: str, params: Tuple[Hashable, ...]
+) -> Optional[Tuple[Hashable, ...]]:
+    """
+    Build the cache key of a search, or None when it must not be cached.
+
+    Take the key before running the search, so results computed while the
+    corpus changed are stored under the old version and never served.
+    """
+    if not search_cache_enabled():
+        return None
+    version = await corpus_version()
+    if version is None:
+        return None
+    return (kind, normalize_term(term), params, version)
+
+
+def get_cached_results(key: Optional[Tuple[Hashable, ...]]) -> Optional[List[Any]]:
+    """Return a copy of the cached results, or None on a miss."""
+    if key is None or not search_cache_enabled():
+        return None
+    results = _get_cache().get(key)
+    return copy.deepcopy(results) if results is not None else None
+
+
+def cache_results(key: Optional[Tuple[Hashable, ...]], results: List[Any]) -> None:
+    if key is not None and search_cache_enabled():
+        _get_cache().set(key, copy.deepcopy(results))
+
+
+def clear_search_cache() -> None:
+    if _cache is not None:
+        _cache.clear()
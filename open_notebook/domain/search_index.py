@@ -0,0 +1,430 @@
+"""
+Local vector index kept in sync with the embeddings stored in SurrealDB.
+
+With LOCAL_VECTOR_INDEX=true, `vector_search` answers from an in-process
+index built from `source_embedding`, `source_insight` and `note` instead of
+calling `fn::vector_search`. The index only holds record ids and vectors;
+titles and content of the best hits are read from the database per search.
+It is persisted under DATA_FOLDER and memory-mapped on load, updated when
+notes and insights are saved or deleted in this process, and rebuilt from
+the database in the background once it is older than
+LOCAL_VECTOR_INDEX_MAX_AGE seconds. Searches keep using the old index until
+the new one is ready. Sources queued for vectorization are marked stale;
+until their job finishes, each search first re-reads their chunks, so
+chunks written by the background worker are found right away.
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from open_notebook.database.repository import (
+    ensure_record_id,
+    repo_batch,
+    repo_query,
+)
+from open_notebook.utils.vector_index import VectorIndex
+
+# kind -> query returning id, parent_id and embedding of each vector
+_INDEX_QUERIES = {
+    "source_embedding": """
+        SELECT id, source AS parent_id, embedding
+        FROM source_embedding WHERE {where}
+    """,
+    "source_insight": """
+        SELECT id, source AS parent_id, embedding
+        FROM source_insight WHERE {where}
+    """,
+    "note": """
+        SELECT id, id AS parent_id, embedding
+        FROM note WHERE {where}
+    """,
+}
+
+# kind -> query returning id, title and content of the records in $ids
+_CONTENT_QUERIES = {
+    "source_embedding": "SELECT id, source.title AS title, content FROM $ids",
+    "source_insight": """
+        SELECT id, insight_type + ' - ' + (source.title OR '') AS title, content
+        FROM $ids
+    """,
+    "note": "SELECT id, title, content FROM $ids",
+}
+
+# Source chunks are reported under the id of their source
+_RESULT_ID_FIELD = {
+    "source_embedding": "parent_id",
+    "source_insight": "id",
+    "note": "id",
+}
+
+_Change = Callable[[VectorIndex], Any]
+
+_index: Optional[VectorIndex] = None
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
+_rebuild_task: Optional["asyncio.Task[None]"] = None
+_persist_task: Optional["asyncio.Task[None]"] = None
+# Changes made while an index is being built, replayed onto it when done
+_replays: List[List[_Change]] = []
+# Source id -> id of the queued job writing its chunks, if known
+_stale_sources: Dict[str, Optional[str]] = {}
+
+# Statuses of surreal-commands jobs that will not write anything more
+_FINISHED_STATUSES = ("completed", "failed", "canceled")
+
+
+def local_index_enabled() -> bool:
+    return os.getenv("LOCAL_VECTOR_INDEX", "false").lower() in ("true", "1", "yes")
+
+
+def _max_age() -> float:
+    return float(os.getenv("LOCAL_VECTOR_INDEX_MAX_AGE", "3600"))
+
+
+def _persist_every() -> int:
+    return int(os.getenv("LOCAL_VECTOR_INDEX_PERSIST_EVERY", "256"))
+
+
+def _index_dir() -> str:
+    from open_notebook.config import LOCAL_VECTOR_INDEX_DIR
+
+    return LOCAL_VECTOR_INDEX_DIR
+
+
+def _is_fresh(index: Optional[VectorIndex]) -> bool:
+    return index is not None and time.time() - index.built_at <= _max_age()
+
+
+def _lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _locks.get(loop)
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks[loop] = lock
+    return lock
+
+
+async def get_local_index() -> VectorIndex:
+    """
+    Return the process-wide index, loading or building it when needed.
+
+    An expired index is returned as is while a rebuild runs in the
+    background; only the first search of a process without a saved index
+    waits for the build.
+    """
+    global _index
+    if _index is None:
+        async with _lock():
+            if _index is None:
+                loaded = await asyncio.to_thread(VectorIndex.load, _index_dir())
+                if loaded is not None:
+                    logger.info(
+                        f"Loaded local vector index with {len(loaded)} vectors"
+                    )
+                    _index = loaded
+                else:
+                    await _rebuild()
+    if _stale_sources:
+        await _refresh_stale_sources()
+    if not _is_fresh(_index):
+        _start_rebuild()
+    return _index  # type: ignore[return-value]
+
+
+def mark_source_stale(source_id: Any, command_id: Any = None) -> None:
+    """
+    Re-read the chunks of `source_id` before each search until the job
+    `command_id` that writes them has finished; without a job, once.
+    """
+    if local_index_enabled():
+        _stale_sources[_key(source_id)] = _key(command_id) if command_id else None
+
+
+async def _refresh_stale_sources() -> None:
+    """Replace the chunks of stale sources with the ones stored now."""
+    stale = dict(_stale_sources)
+    commands = [command for command in stale.values() if command]
+    try:
+        # Statuses are read first, so a finished job's chunks are all seen
+        statuses, *chunks = await repo_batch(
+            [
+                (
+                    "SELECT id, status FROM $commands",
+                    {"commands": [ensure_record_id(c) for c in commands]},
+                ),
+                *(
+                    (
+                        _INDEX_QUERIES["source_embedding"].format(
+                            where="source = $source AND embedding != NONE"
+                        ),
+                        {"source": ensure_record_id(source)},
+                    )
+                    for source in stale
+                ),
+            ]
+        )
+    except Exception as e:
+        logger.warning(f"Failed to refresh stale sources in local index: {e}")
+        return
+    finished = {
+        _key(row["id"])
+        for row in statuses
+        if row.get("status") in _FINISHED_STATUSES
+    }
+
+    def refresh(index: VectorIndex) -> None:
+        index.remove_where(
+            lambda meta: meta["kind"] == "source_embedding"
+            and meta["parent_id"] in stale
+        )
+        for rows in chunks:
+            for row in rows:
+                _add_row(index, "source_embedding", row)
+
+    _apply(refresh)
+    for source, command in stale.items():
+        if (command is None or command in finished) and _stale_sources.get(
+            source
+        ) == command:
+            del _stale_sources[source]
+
+
+def _start_rebuild() -> None:
+    global _rebuild_task
+    task = _rebuild_task
+    # A loop closed without finishing its tasks leaves them pending forever
+    if task is not None and not task.done() and not task.get_loop().is_closed():
+        return
+    _rebuild_task = asyncio.ensure_future(_rebuild())
+
+
+async def _rebuild() -> None:
+    """Build a new index from the database and swap it in."""
+    global _index
+    replay: List[_Change] = []
+    _replays.append(replay)
+    try:
+        index = await build_local_index()
+        for change in replay:
+            change(index)
+        _index = index
+    except Exception as e:
+        if _index is None:
+            raise
+        logger.warning(f"Failed to rebuild local vector index: {e}")
+        return
+    finally:
+        _replays.remove(replay)
+    try:
+        await index.asave(_index_dir())
+    except OSError as e:
+        logger.warning(f"Failed to persist local vector index: {e}")
+
+
+async def build_local_index(page_size: int = 1000) -> VectorIndex:
+    """Read every stored embedding into a new index."""
+    started = time.perf_counter()
+    index = VectorIndex()
+    for kind, query in _INDEX_QUERIES.items():
+        cursor: Optional[str] = None
+        while True:
+            conditions = ["embedding != NONE"]
+            params: Dict[str, Any] = {"limit": page_size}
+            if cursor is not None:
+                conditions.append("id > $cursor")
+                params["cursor"] = ensure_record_id(cursor)
+            rows = await repo_query(
+                query.format(where=" AND ".join(conditions))
+                + " ORDER BY id LIMIT $limit",
+                params,
+            )
+            for row in rows:
+                _add_row(index, kind, row)
+            if len(rows) < page_size:
+                break
+            cursor = str(rows[-1]["id"])
+    logger.info(
+        f"Built local vector index with {len(index)} vectors "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return index
+
+
+def _key(record_id: Any) -> str:
+    return str(ensure_record_id(str(record_id)))
+
+
+def _add_row(index: VectorIndex, kind: str, row: Dict[str, Any]) -> bool:
+    record_id = _key(row["id"])
+    return index.add(
+        record_id,
+        row.get("embedding") or [],
+        {
+            "kind": kind,
+            "id": record_id,
+            "parent_id": _key(row.get("parent_id") or record_id),
+        },
+    )
+
+
+async def search_local_index(
+    index: VectorIndex,
+    embedding: Sequence[float],
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    minimum_score: float = 0.2,
+) -> List[Dict[str, Any]]:
+    """
+    Search the index and group hits like `fn::vector_search`.
+
+    Each kind contributes its `results` best matches, whose titles and
+    content are then read from the database in one round trip. Hits are
+    grouped by (id, parent_id, title), keeping the best similarity and every
+    matched content, and the `results` best groups are returned. Records
+    deleted since they were indexed are left out.
+    """
+    kinds: List[str] = []
+    if source:
+        kinds += ["source_embedding", "source_insight"]
+    if note:
+        kinds.append("note")
+
+    hits: List[Tuple[Dict[str, Any], float]] = []
+    for kind in kinds:
+        hits += index.search(
+            embedding,
+            results,
+            minimum_score,
+            where=lambda meta: meta["kind"] == kind,
+        )
+    records = await _fetch_records([meta for meta, _ in hits])
+
+    groups: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+    for meta, similarity in hits:
+        record = records.get(meta["id"])
+        if record is None:
+            continue
+        result_id = meta[_RESULT_ID_FIELD[meta["kind"]]]
+        key = (result_id, meta["parent_id"], record.get("title"))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {
+                "id": result_id,
+                "parent_id": meta["parent_id"],
+                "title": record.get("title"),
+                "similarity": similarity,
+                "matches": [record.get("content")],
+            }
+        else:
+            group["similarity"] = max(group["similarity"], similarity)
+            group["matches"].append(record.get("content"))
+    ranked = sorted(groups.values(), key=lambda g: g["similarity"], reverse=True)
+    return ranked[:results]
+
+
+async def _fetch_records(metas: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Read the title and content of indexed records, keyed by record id."""
+    ids: Dict[str, Dict[str, None]] = {}
+    for meta in metas:
+        ids.setdefault(meta["kind"], {})[meta["id"]] = None
+    if not ids:
+        return {}
+    results = await repo_batch(
+        [
+            (
+                _CONTENT_QUERIES[kind],
+                {"ids": [ensure_record_id(record_id) for record_id in kind_ids]},
+            )
+            for kind, kind_ids in ids.items()
+        ]
+    )
+    return {_key(row["id"]): row for rows in results for row in rows}
+
+
+def _apply(change: _Change) -> None:
+    """
+    Apply a change to the index this process holds, and to any being built.
+
+    Without a loaded index, a persisted index would miss the change, so it
+    is discarded and the next search rebuilds from the database.
+    """
+    if not local_index_enabled():
+        return
+    for replay in _replays:
+        replay.append(change)
+    if _index is None:
+        manifest = os.path.join(_index_dir(), "index.json")
+        if os.path.exists(manifest):
+            try:
+                os.remove(manifest)
+            except OSError as e:
+                logger.warning(f"Failed to discard local vector index: {e}")
+        return
+    change(_index)
+    _maybe_persist(_index)
+
+
+def _maybe_persist(index: VectorIndex) -> None:
+    global _persist_task
+    if index.mutations < _persist_every():
+        return
+    if _persist_task is not None and not _persist_task.done():
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            index.save(_index_dir())
+        except OSError as e:
+            logger.warning(f"Failed to persist local vector index: {e}")
+        return
+    _persist_task = asyncio.ensure_future(_persist(index))
+
+
+async def _persist(index: VectorIndex) -> None:
+    try:
+        await index.asave(_index_dir())
+    except OSError as e:
+        logger.warning(f"Failed to persist local vector index: {e}")
+
+
+def index_record(kind: str, row: Dict[str, Any]) -> None:
+    """Add or replace a stored record in the loaded index."""
+    if not row.get("embedding"):
+        return
+    _apply(lambda index: _add_row(index, kind, row))
+
+
+def unindex_records(record_ids: Iterable[Any]) -> None:
+    """Remove deleted records from the loaded index."""
+    keys = [_key(record_id) for record_id in record_ids]
+
+    def remove(index: VectorIndex) -> None:
+        for key in keys:
+            index.remove(key)
+
+    _apply(remove)
+
+
+def unindex_parent(parent_id: Any, kind: Optional[str] = None) -> None:
+    """Remove every vector, or every vector of `kind`, of a source or note."""
+    parent = _key(parent_id)
+    _apply(
+        lambda index: index.remove_where(
+            lambda meta: meta["parent_id"] == parent
+            and (kind is None or meta["kind"] == kind)
+        )
+    )
+
+
+def reset_local_index() -> None:
+    """Forget the loaded index so the next search loads or rebuilds it."""
+    global _index
+    _index = None
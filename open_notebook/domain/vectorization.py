@@ -0,0 +1,301 @@
+"""
+In-process vectorization of sources.
+
+`vectorize_source_inline` splits a source into chunks, embeds them in
+batches with a bounded number of concurrent requests, and bulk-inserts the
+chunks into `source_embedding`, without going through the command queue.
+
+Each chunk is stored with the sha256 of its content and the embedding model
+that produced its vector. Re-vectorizing diffs the new chunks against the
+stored ones by hash, so only added chunks are embedded, only removed chunks
+are deleted, and the rest are kept (renumbered if they moved). The deletes,
+moves and inserts are applied in one transaction.
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from loguru import logger
+
+from open_notebook.database.repository import (
+    QueryBatch,
+    ensure_record_id,
+    repo_query,
+)
+from open_notebook.domain.models import EmbeddingBatcher, model_manager
+from open_notebook.domain.search_cache import bump_corpus_version
+from open_notebook.domain.search_index import index_record, unindex_records
+from open_notebook.exceptions import ConfigurationError
+from open_notebook.utils import split_text, split_text_stream, token_count_batch
+from open_notebook.utils.embedding_cache import text_hash
+
+if TYPE_CHECKING:
+    from open_notebook.domain.notebook import Source
+
+# Rows per INSERT statement, to keep statements bounded
+_INSERT_PAGE = 256
+
+# Chunks written before hashes were stored are hashed by the database; the
+# hex digest matches text_hash()
+_STORED_CHUNKS_QUERY = """
+    SELECT id, order, embedding_model,
+        content_hash OR crypto::sha256(content) AS content_hash
+    FROM source_embedding WHERE source = $source
+"""
+
+
+@dataclass
+class VectorizationStats:
+    """
+    Outcome of a vectorization run.
+
+    `chunks` counts every chunk of the source; the rates count the
+    `embedded` chunks and their tokens, the work that was actually done.
+    `seconds` covers embedding and storing the chunks only, not splitting,
+    hashing or counting tokens, so the rates measure the embedding pipeline.
+    """
+
+    source_id: str
+    chunks: int
+    embedded: int
+    kept: int
+    removed: int
+    tokens: int
+    requests: int
+    retries: int
+    seconds: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class ChunkDiff:
+    kept: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    added: List[int] = field(default_factory=list)
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def diff_chunks(
+    stored: Sequence[Dict[str, Any]],
+    hashes: Sequence[str],
+    model_key: Optional[str] = None,
+) -> ChunkDiff:
+    """
+    Match new chunk hashes against stored chunk rows.
+
+    `kept` maps the position of each new chunk to the stored row it reuses,
+    `added` lists positions that need embedding and `removed` the stored
+    rows that matched nothing. Repeated chunks are matched in stored order.
+    Rows embedded by another model than `model_key` are never reused; rows
+    without a recorded model are assumed to be current.
+    """
+    pool: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+    diff = ChunkDiff()
+    for row in sorted(stored, key=lambda row: row.get("order") or 0):
+        model = row.get("embedding_model")
+        if model_key is not None and model is not None and model != model_key:
+            diff.removed.append(row)
+        else:
+            pool[row["content_hash"]].append(row)
+    for position, digest in enumerate(hashes):
+        if pool[digest]:
+            diff.kept[position] = pool[digest].popleft()
+        else:
+            diff.added.append(position)
+    for rows in pool.values():
+        diff.removed.extend(rows)
+    return diff
+
+
+def _setting(name: str, default: int) -> int:
+    return max(1, int(os.getenv(name, str(default))))
+
+
+async def embed_with_retry(
+    embedder: EmbeddingBatcher,
+    texts: Sequence[str],
+    max_retries: int = 3,
+    backoff: float = 1.0,
+) -> Tuple[List[List[float]], int]:
+    """
+    Embed `texts` in one request, retrying failures with exponential backoff.
+
+    Returns the vectors and the number of retries it took.
+    """
+    attempt = 0
+    while True:
+        try:
+            vectors = await embedder.embed_many(texts, batch_size=len(texts))
+            return vectors, attempt
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff * 2**attempt
+            delay += random.uniform(0, delay)
+            attempt += 1
+            logger.warning(
+                f"Embedding {len(texts)} chunks failed ({e}), "
+                f"retry {attempt}/{max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+async def vectorize_source_inline(
+    source: "Source",
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    backoff: float = 1.0,
+    full: bool = False,
+    texts: Optional[Iterable[str]] = None,
+) -> VectorizationStats:
+    """
+    Bring the chunks of a source in line with its text.
+
+    Only chunks that are not stored yet are embedded, `batch_size` at a time
+    with at most `concurrency` requests in flight; failed requests are
+    retried up to `max_retries` times. Defaults come from
+    VECTORIZE_BATCH_SIZE, VECTORIZE_CONCURRENCY and VECTORIZE_MAX_RETRIES.
+    Once every new chunk has been embedded, stale chunks are deleted, kept
+    chunks renumbered and new ones inserted in a single transaction, so a
+    failure leaves the stored chunks as they were. With `full` every chunk
+    is embedded again.
+
+    `texts` can supply the text in pieces, such as pages as they are
+    extracted, instead of `source.full_text`; it is chunked as it streams in.
+    """
+    if not source.id:
+        raise ValueError("Source must be saved before it can be vectorized")
+    if texts is None and not source.full_text:
+        raise ValueError(f"Source {source.id} has no text to vectorize")
+    embedder = await model_manager.get_embedding_batcher()
+    if embedder is None:
+        raise ConfigurationError("No embedding model configured")
+
+    batch_size = batch_size or _setting("VECTORIZE_BATCH_SIZE", 64)
+    concurrency = concurrency or _setting("VECTORIZE_CONCURRENCY", 4)
+    if max_retries is None:
+        max_retries = int(os.getenv("VECTORIZE_MAX_RETRIES", "3"))
+
+    source_id = ensure_record_id(source.id)
+    chunks = (
+        list(split_text_stream(texts))
+        if texts is not None
+        else split_text(source.full_text)
+    )
+    if not chunks:
+        raise ValueError(f"Source {source.id} has no text to vectorize")
+    hashes = [text_hash(chunk) for chunk in chunks]
+    stored = await repo_query(_STORED_CHUNKS_QUERY, {"source": source_id})
+    diff = (
+        ChunkDiff(added=list(range(len(chunks))), removed=list(stored))
+        if full
+        else diff_chunks(stored, hashes, embedder.cache_key)
+    )
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    requests_before = embedder.requests
+
+    async def embed_batch(texts: List[str]) -> Tuple[List[List[float]], int]:
+        async with semaphore:
+            return await embed_with_retry(embedder, texts, max_retries, backoff)
+
+    embedded = await asyncio.gather(
+        *(
+            embed_batch([chunks[i] for i in diff.added[start : start + batch_size]])
+            for start in range(0, len(diff.added), batch_size)
+        )
+    )
+    vectors = [vector for batch, _ in embedded for vector in batch]
+    retries = sum(batch_retries for _, batch_retries in embedded)
+
+    batch = QueryBatch(transaction=True)
+    removed_ids = [row["id"] for row in diff.removed]
+    if removed_ids:
+        batch.add(
+            "DELETE $ids",
+            {"ids": [ensure_record_id(record_id) for record_id in removed_ids]},
+        )
+    moves = [
+        {"id": ensure_record_id(row["id"]), "order": position}
+        for position, row in diff.kept.items()
+        if row.get("order") != position
+    ]
+    if moves:
+        batch.add(
+            "FOR $move IN $moves { UPDATE $move.id SET order = $move.order; };",
+            {"moves": moves},
+        )
+
+    rows: List[Dict[str, Any]] = [
+        {
+            "source": source_id,
+            "order": position,
+            "content": chunks[position],
+            "content_hash": hashes[position],
+            "embedding_model": embedder.cache_key,
+            "embedding": vector,
+        }
+        for position, vector in zip(diff.added, vectors)
+    ]
+    inserts = [
+        batch.add(
+            "INSERT INTO source_embedding $rows",
+            {"rows": rows[start : start + _INSERT_PAGE]},
+        )
+        for start in range(0, len(rows), _INSERT_PAGE)
+    ]
+    if len(batch):
+        results = await batch.execute()
+        unindex_records(removed_ids)
+        for index in inserts:
+            for row in results[index]:
+                index_record(
+                    "source_embedding",
+                    {**row, "parent_id": source.id, "title": source.title},
+                )
+    if rows or removed_ids:
+        await bump_corpus_version()
+    seconds = time.perf_counter() - started
+
+    stats = VectorizationStats(
+        source_id=str(source.id),
+        chunks=len(chunks),
+        embedded=len(diff.added),
+        kept=len(diff.kept),
+        removed=len(diff.removed),
+        tokens=sum(token_count_batch([chunks[position] for position in diff.added])),
+        requests=embedder.requests - requests_before,
+        retries=retries,
+        seconds=seconds,
+    )
+    logger.info(
+        f"Vectorized source {source.id}: embedded {stats.embedded} of "
+        f"{stats.chunks} chunks, kept {stats.kept}, removed {stats.removed} in "
+        f"{stats.seconds:.2f}s ({stats.chunks_per_second:.1f} chunks/s, "
+        f"{stats.tokens_per_second:.0f} tokens/s, {stats.requests} requests, "
+        f"{stats.retries} retries)"
+    )
+    return stats
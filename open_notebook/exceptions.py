@@ -28,6 +28,12 @@ class NotFoundError(OpenNotebookError):
     pass
 
 
+class FieldNotLoadedError(OpenNotebookError, AttributeError):
+    """Raised when reading a model field that a projected load left out."""
+
+    pass
+
+
 class AuthenticationError(OpenNotebookError):
     """Raised when there's an authentication problem."""
 
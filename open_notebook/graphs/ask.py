@@ -1,14 +1,16 @@
 import operator
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
 from ai_prompter import Prompter
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
+from loguru import logger
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
+from open_notebook.domain.models import model_manager
 from open_notebook.domain.notebook import vector_search
 from open_notebook.graphs.utils import provision_langchain_model
 from open_notebook.utils import clean_thinking_content
@@ -21,6 +23,7 @@ class SubGraphState(TypedDict):
     results: dict
     answer: str
     ids: list  # Added for provide_answer function
+    embedding: Optional[List[float]]  # Embedding of term, computed up front
 
 
 class Search(BaseModel):
@@ -71,7 +74,23 @@ async def call_model_with_messages(state: ThreadState, config: RunnableConfig) -
     return {"strategy": strategy}
 
 
+async def embed_terms(terms: List[str]) -> List[Optional[List[float]]]:
+    """Embed every search term in one request; None where it isn't possible."""
+    if not terms:
+        return []
+    try:
+        embedder = await model_manager.get_embedding_batcher()
+        if embedder is not None:
+            return list(await embedder.embed_many(terms))
+    except Exception as e:
+        # Each branch embeds its own term instead
+        logger.warning(f"Failed to embed search terms together: {e}")
+    return [None] * len(terms)
+
+
 async def trigger_queries(state: ThreadState, config: RunnableConfig):
+    searches = state["strategy"].searches
+    embeddings = await embed_terms([s.term for s in searches])
     return [
         Send(
             "provide_answer",
@@ -79,19 +98,21 @@ async def trigger_queries(state: ThreadState, config: RunnableConfig):
                 "question": state["question"],
                 "instructions": s.instructions,
                 "term": s.term,
+                "embedding": embedding,
                 # "type": s.type,
             },
         )
-        for s in state["strategy"].searches
+        for s, embedding in zip(searches, embeddings)
     ]
 
 
 async def provide_answer(state: SubGraphState, config: RunnableConfig) -> dict:
     payload = state
+    embedding = payload.pop("embedding", None)
     # if state["type"] == "text":
     #     results = text_search(state["term"], 10, True, True)
     # else:
-    results = await vector_search(state["term"], 10, True, True)
+    results = await vector_search(state["term"], 10, True, True, embedding=embedding)
     if len(results) == 0:
         return {"answers": []}
     payload["results"] = results
@@ -13,6 +13,7 @@ from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict
 
 from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE
+from open_notebook.database.repository import run_and_close_db
 from open_notebook.domain.notebook import Notebook
 from open_notebook.graphs.utils import provision_langchain_model
 
@@ -39,8 +40,10 @@ def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict
         try:
             asyncio.set_event_loop(new_loop)
             return new_loop.run_until_complete(
-                provision_langchain_model(
-                    str(payload), model_id, "chat", max_tokens=8192
+                run_and_close_db(
+                    provision_langchain_model(
+                        str(payload), model_id, "chat", max_tokens=8192
+                    )
                 )
             )
         finally:
@@ -59,11 +62,13 @@ def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict
     except RuntimeError:
         # No event loop running, safe to use asyncio.run()
         model = asyncio.run(
-            provision_langchain_model(
-                str(payload),
-                model_id,
-                "chat",
-                max_tokens=8192,
+            run_and_close_db(
+                provision_langchain_model(
+                    str(payload),
+                    model_id,
+                    "chat",
+                    max_tokens=8192,
+                )
             )
         )
 
@@ -13,6 +13,7 @@ from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict
 
 from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE
+from open_notebook.database.repository import run_and_close_db
 from open_notebook.domain.notebook import Source, SourceInsight
 from open_notebook.graphs.utils import provision_langchain_model
 from open_notebook.utils.context_builder import ContextBuilder
@@ -56,7 +57,9 @@ def call_model_with_source_context(
                 include_notes=False,  # Focus on source-specific content
                 max_tokens=50000,  # Reasonable limit for source context
             )
-            return new_loop.run_until_complete(context_builder.build())
+            return new_loop.run_until_complete(
+                run_and_close_db(context_builder.build())
+            )
         finally:
             new_loop.close()
             asyncio.set_event_loop(None)
@@ -121,12 +124,14 @@ def call_model_with_source_context(
         try:
             asyncio.set_event_loop(new_loop)
             return new_loop.run_until_complete(
-                provision_langchain_model(
-                    str(payload),
-                    config.get("configurable", {}).get("model_id")
-                    or state.get("model_override"),
-                    "chat",
-                    max_tokens=8192,
+                run_and_close_db(
+                    provision_langchain_model(
+                        str(payload),
+                        config.get("configurable", {}).get("model_id")
+                        or state.get("model_override"),
+                        "chat",
+                        max_tokens=8192,
+                    )
                 )
             )
         finally:
@@ -145,12 +150,14 @@ def call_model_with_source_context(
     except RuntimeError:
         # No event loop running, safe to use asyncio.run()
         model = asyncio.run(
-            provision_langchain_model(
-                str(payload),
-                config.get("configurable", {}).get("model_id")
-                or state.get("model_override"),
-                "chat",
-                max_tokens=8192,
+            run_and_close_db(
+                provision_langchain_model(
+                    str(payload),
+                    config.get("configurable", {}).get("model_id")
+                    or state.get("model_override"),
+                    "chat",
+                    max_tokens=8192,
+                )
             )
         )
 
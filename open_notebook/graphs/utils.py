@@ -1,4 +1,3 @@
-from esperanto import LanguageModel
 from langchain_core.language_models.chat_models import BaseChatModel
 from loguru import logger
 
@@ -21,12 +20,12 @@ async def provision_langchain_model(
         logger.debug(
             f"Using large context model because the content has {tokens} tokens"
         )
-        model = await model_manager.get_default_model("large_context", **kwargs)
-    elif model_id:
-        model = await model_manager.get_model(model_id, **kwargs)
-    else:
-        model = await model_manager.get_default_model(default_type, **kwargs)
+        model_id = await model_manager.get_default_model_id("large_context")
+    elif not model_id:
+        model_id = await model_manager.get_default_model_id(default_type)
 
-    logger.debug(f"Using model: {model}")
-    assert isinstance(model, LanguageModel), f"Model is not a LanguageModel: {model}"
-    return model.to_langchain()
+    # The LangChain wrapper is cached along with the model instance
+    model = await model_manager.get_langchain_model(model_id, **kwargs)
+    logger.debug(f"Using model: {model_id}")
+    assert model is not None, f"Model is not a LanguageModel: {model}"
+    return model
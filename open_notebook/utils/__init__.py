@@ -7,13 +7,16 @@ To avoid circular imports, import functions directly:
 """
 
 from .text_utils import (
+    ThinkingStreamParser,
     clean_thinking_content,
     parse_thinking_content,
     remove_non_ascii,
     remove_non_printable,
+    remove_non_printable_many,
     split_text,
+    split_text_stream,
 )
-from .token_utils import token_cost, token_count
+from .token_utils import token_cost, token_count, token_count_batch
 from .version_utils import (
     compare_versions,
     get_installed_version,
@@ -22,11 +25,15 @@ from .version_utils import (
 
 __all__ = [
     "split_text",
+    "split_text_stream",
     "remove_non_ascii",
     "remove_non_printable",
+    "remove_non_printable_many",
     "parse_thinking_content",
     "clean_thinking_content",
+    "ThinkingStreamParser",
     "token_count",
+    "token_count_batch",
     "token_cost",
     "compare_versions",
     "get_installed_version",
@@ -0,0 +1,77 @@
+"""
+In-memory caches shared by the domain and graph layers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe least-recently-used cache with an optional TTL.
+
+    Once `max_size` entries are stored, adding another evicts the entry that
+    was used least recently. With `ttl` set, entries older than `ttl` seconds
+    are treated as missing.
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._data: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key: K, count: bool = True) -> Optional[V]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._data[key]
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else None
+
+    def remove_where(self, predicate: Callable[[K], bool]) -> List[V]:
+        """Remove every entry whose key matches `predicate` and return the values."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            return [self._data.pop(key)[0] for key in keys]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
@@ -6,15 +6,17 @@ and build context from sources, notebooks, insights, and notes.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Literal, Optional
+import asyncio
+from dataclasses import InitVar, dataclass
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 from loguru import logger
 
-from open_notebook.domain.notebook import Note, Notebook, Source
+from open_notebook.database.repository import ensure_record_id
+from open_notebook.domain.notebook import Note, Notebook, Source, SourceInsight
 from open_notebook.exceptions import DatabaseOperationError, NotFoundError
 
-from .text_utils import token_count
+from .token_utils import token_count, token_count_batch
 
 
 @dataclass
@@ -26,14 +28,29 @@ class ContextItem:
     content: Dict[str, Any]
     priority: int = 0
     token_count: Optional[int] = None
+    # Set to False to leave token_count empty for count_item_tokens
+    count_tokens: InitVar[bool] = True
     
-    def __post_init__(self):
+    def __post_init__(self, count_tokens: bool = True):
         """Calculate token count for the content if not provided."""
-        if self.token_count is None:
+        if self.token_count is None and count_tokens:
             content_str = str(self.content)
             self.token_count = token_count(content_str)
 
 
+# (source, insights, inclusion_level) and (note, inclusion_level) to add
+FetchedSource = Tuple[Source, List[SourceInsight], str]
+FetchedNote = Tuple[Note, str]
+
+
+def count_item_tokens(items: List[ContextItem]) -> None:
+    """Fill in missing token counts, tokenizing all items in one batch."""
+    pending = [item for item in items if item.token_count is None]
+    counts = token_count_batch([str(item.content) for item in pending])
+    for item, count in zip(pending, counts):
+        item.token_count = count
+
+
 @dataclass
 class ContextConfig:
     """Configuration for context building."""
@@ -114,18 +131,25 @@ class ContextBuilder:
             # Clear existing items
             self.items = []
             
-            # Build context based on parameters
-            if self.source_id:
-                await self._add_source_context(self.source_id)
-            
-            if self.notebook_id:
-                await self._add_notebook_context(self.notebook_id)
+            # Fetch the source and the notebook concurrently, then add their
+            # items in a fixed order
+            sources, (notebook_sources, notebook_notes) = await asyncio.gather(
+                self._fetch_sources(
+                    {self.source_id: "insights"} if self.source_id else {}
+                ),
+                self._fetch_notebook(self.notebook_id),
+            )
+            for source, insights, inclusion_level in sources + notebook_sources:
+                await self._add_source_items(source, insights, inclusion_level)
+            for note, inclusion_level in notebook_notes:
+                self._add_note_item(note, inclusion_level)
             
             # Process any additional custom parameters
             await self._process_custom_params()
             
             # Apply post-processing
             self.remove_duplicates()
+            count_item_tokens(self.items)
             self.prioritize()
             
             if self.max_tokens:
@@ -138,117 +162,148 @@ class ContextBuilder:
             logger.error(f"Error building context: {str(e)}")
             raise DatabaseOperationError(f"Failed to build context: {str(e)}")
     
-    async def _add_source_context(
-        self, 
-        source_id: str, 
+    async def _fetch_sources(self, sources: Dict[str, str]) -> List[FetchedSource]:
+        """
+        Fetch several sources and their insights in one round trip.
+        
+        Args:
+            sources: {source_id: inclusion_level}
+
+        Returns:
+            (source, insights, inclusion_level) for each source found
+        """
+        included = {
+            (source_id if source_id.startswith("source:") else f"source:{source_id}"): status
+            for source_id, status in sources.items()
+            if status != "not in"
+        }
+        if not included:
+            return []
+
+        # Short context only needs id and title, so skip full_text unless a
+        # source is included with its full content
+        needs_full_text = any("full content" in status for status in included.values())
+        fetched = await Source.get_with_insights(
+            list(included.keys()), omit=None if needs_full_text else ["full_text"]
+        )
+        found: List[FetchedSource] = []
+        for (source_id, status), (source, insights) in zip(included.items(), fetched):
+            if source is None:
+                logger.warning(f"Source {source_id} not found")
+                continue
+            found.append((source, insights, status))
+        return found
+
+    async def _add_source_items(
+        self,
+        source: Source,
+        insights: List[SourceInsight],
         inclusion_level: str = "insights"
     ) -> None:
         """
-        Add source and its insights to context.
+        Add an already fetched source and its insights to context.
         
         Args:
-            source_id: ID of the source
-            inclusion_level: "insights", "full content", or "not in"
+            source: The source
+            insights: Insights belonging to the source
+            inclusion_level: "insights" or "full content"
         """
-        if inclusion_level == "not in":
-            return
+        # Determine context size based on inclusion level
+        context_size: Literal["short", "long"] = "long" if "full content" in inclusion_level else "short"
+        source_context = await source.get_context(
+            context_size=context_size, insights=insights
+        )
+
+        # Add source item
+        priority = (self.context_config.priority_weights or {}).get("source", 100)
+        item = ContextItem(
+            id=source.id or "",
+            type="source",
+            content=source_context,
+            priority=priority,
+            count_tokens=False,
+        )
+        self.add_item(item)
         
-        try:
-            # Ensure source ID has table prefix
-            full_source_id = (
-                source_id if source_id.startswith("source:")
-                else f"source:{source_id}"
-            )
-            
-            source = await Source.get(full_source_id)
-            if not source:
-                logger.warning(f"Source {source_id} not found")
-                return
-            
-            # Determine context size based on inclusion level
-            context_size: Literal["short", "long"] = "long" if "full content" in inclusion_level else "short"
-            source_context = await source.get_context(context_size=context_size)
-
-            # Add source item
-            priority = (self.context_config.priority_weights or {}).get("source", 100)
-            item = ContextItem(
-                id=source.id or "",
-                type="source",
-                content=source_context,
-                priority=priority
-            )
-            self.add_item(item)
-            
-            # Add insights if requested and available
-            if self.include_insights and "insights" in inclusion_level:
-                insights = await source.get_insights()
-                for insight in insights:
-                    insight_priority = (self.context_config.priority_weights or {}).get("insight", 75)
-                    insight_item = ContextItem(
-                        id=insight.id or "",
-                        type="insight",
-                        content={
-                            "id": insight.id,
-                            "source_id": source.id,
-                            "insight_type": insight.insight_type,
-                            "content": insight.content
-                        },
-                        priority=insight_priority
-                    )
-                    self.add_item(insight_item)
-            
-            logger.debug(f"Added source context for {source_id}")
-            
-        except NotFoundError:
-            logger.warning(f"Source {source_id} not found")
-        except Exception as e:
-            logger.error(f"Error adding source context for {source_id}: {str(e)}")
-            raise
-    
-    async def _add_notebook_context(self, notebook_id: str) -> None:
+        # Add insights if requested and available
+        if self.include_insights and "insights" in inclusion_level:
+            insight_priority = (self.context_config.priority_weights or {}).get("insight", 75)
+            for insight in insights:
+                insight_item = ContextItem(
+                    id=insight.id or "",
+                    type="insight",
+                    content={
+                        "id": insight.id,
+                        "source_id": source.id,
+                        "insight_type": insight.insight_type,
+                        "content": insight.content
+                    },
+                    priority=insight_priority,
+                    count_tokens=False,
+                )
+                self.add_item(insight_item)
+
+    async def _fetch_notebook(
+        self, notebook_id: Optional[str]
+    ) -> Tuple[List[FetchedSource], List[FetchedNote]]:
         """
-        Add notebook content based on context configuration.
+        Fetch notebook content based on context configuration.
+
+        Sources with their insights and notes are each fetched in one round
+        trip, concurrently, so the cost does not grow with the notebook.
         
         Args:
-            notebook_id: ID of the notebook
+            notebook_id: ID of the notebook, or None for no notebook
+
+        Returns:
+            The sources and the notes to add
         """
+        if not notebook_id:
+            return [], []
         try:
-            notebook = await Notebook.get(notebook_id)
+            notebook = await Notebook.get(notebook_id, fields=["name"])
             if not notebook:
                 raise NotFoundError(f"Notebook {notebook_id} not found")
-            
-            # Process sources from context config or get all
-            config_sources = self.context_config.sources
-            if config_sources:
-                for source_id, status in config_sources.items():
-                    await self._add_source_context(source_id, status)
-            else:
-                # Default: get all sources with insights
-                sources = await notebook.get_sources()
-                for source in sources:
-                    if source.id:
-                        await self._add_source_context(source.id, "insights")
-
-            # Process notes from context config or get all
-            if self.include_notes:
-                config_notes = self.context_config.notes
-                if config_notes:
-                    for note_id, status in config_notes.items():
-                        if "not in" not in status:
-                            await self._add_note_context(note_id, status)
-                else:
-                    # Default: get all notes with short content
-                    notes = await notebook.get_notes()
-                    for note in notes:
-                        if note.id:
-                            await self._add_note_context(note.id, "full content")
-            
-            logger.debug(f"Added notebook context for {notebook_id}")
-            
+
+            sources, notes = await asyncio.gather(
+                self._fetch_notebook_sources(notebook),
+                self._fetch_notebook_notes(notebook),
+            )
+            logger.debug(f"Fetched notebook context for {notebook_id}")
+            return sources, notes
+
         except Exception as e:
             logger.error(f"Error adding notebook context for {notebook_id}: {str(e)}")
             raise
-    
+
+    async def _fetch_notebook_sources(self, notebook: Notebook) -> List[FetchedSource]:
+        """Fetch the configured sources, or all of the notebook's sources."""
+        config_sources = self.context_config.sources
+        if config_sources:
+            return await self._fetch_sources(config_sources)
+
+        # Default: get all sources with insights
+        fetched = await notebook.get_sources_with_insights()
+        return [(source, insights, "insights") for source, insights in fetched]
+
+    async def _fetch_notebook_notes(self, notebook: Notebook) -> List[FetchedNote]:
+        """Fetch the configured notes, or all of the notebook's notes."""
+        if not self.include_notes:
+            return []
+        config_notes = self.context_config.notes
+        if config_notes:
+            return await self._fetch_notes(
+                {
+                    note_id: status
+                    for note_id, status in config_notes.items()
+                    if "not in" not in status
+                }
+            )
+
+        # Default: get all notes with their content
+        notes = await notebook.get_notes(omit=["embedding"])
+        return [(note, "full content") for note in notes]
+
     async def _add_note_context(
         self, 
         note_id: str, 
@@ -275,20 +330,8 @@ class ContextBuilder:
             if not note:
                 logger.warning(f"Note {note_id} not found")
                 return
-            
-            # Get note context
-            context_size: Literal["short", "long"] = "long" if "full content" in inclusion_level else "short"
-            note_context = note.get_context(context_size=context_size)
-
-            # Add note item
-            priority = (self.context_config.priority_weights or {}).get("note", 50)
-            item = ContextItem(
-                id=note.id or "",
-                type="note",
-                content=note_context,
-                priority=priority
-            )
-            self.add_item(item)
+
+            self._add_note_item(note, inclusion_level)
             
             logger.debug(f"Added note context for {note_id}")
             
@@ -297,6 +340,63 @@ class ContextBuilder:
         except Exception as e:
             logger.error(f"Error adding note context for {note_id}: {str(e)}")
     
+    async def _fetch_notes(self, notes: Dict[str, str]) -> List[FetchedNote]:
+        """
+        Fetch several notes in one round trip.
+        
+        Args:
+            notes: {note_id: inclusion_level}
+
+        Returns:
+            (note, inclusion_level) for each note found
+        """
+        included = {
+            str(ensure_record_id(
+                note_id if note_id.startswith("note:") else f"note:{note_id}"
+            )): status
+            for note_id, status in notes.items()
+            if status != "not in"
+        }
+        if not included:
+            return []
+
+        try:
+            fetched = await Note.get_many(list(included.keys()))
+        except Exception as e:
+            logger.error(f"Error fetching notes for context: {str(e)}")
+            return []
+
+        return [
+            (
+                note,
+                included.get(
+                    str(ensure_record_id(note.id)) if note.id else "", "full content"
+                ),
+            )
+            for note in fetched
+        ]
+
+    def _add_note_item(self, note: Note, inclusion_level: str = "full content") -> None:
+        """
+        Add an already fetched note to context.
+        
+        Args:
+            note: The note
+            inclusion_level: "full content" or "short"
+        """
+        context_size: Literal["short", "long"] = "long" if "full content" in inclusion_level else "short"
+        note_context = note.get_context(context_size=context_size)
+
+        priority = (self.context_config.priority_weights or {}).get("note", 50)
+        item = ContextItem(
+            id=note.id or "",
+            type="note",
+            content=note_context,
+            priority=priority,
+            count_tokens=False,
+        )
+        self.add_item(item)
+
     async def _process_custom_params(self) -> None:
         """Process any additional custom parameters."""
         # Hook for future extensions - can be overridden in subclasses
@@ -0,0 +1,357 @@
+"""
+Content-addressed cache of embedding vectors.
+
+Vectors are keyed by (embedding model, sha256 of the text) and stored in a
+local SQLite file, with an in-memory LRU in front of it. The same text
+embedded by the same model always yields the same vector, so entries never
+go stale; the file is bounded by size and evicts least recently used rows.
+Async callers use `aget_many` and `aput_many`, which keep the file I/O off
+the event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from open_notebook.utils.cache import LRUCache
+
+# SQLite limits the number of parameters per statement
+_SQL_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode(vector: Sequence[float]) -> bytes:
+    return array("d", vector).tobytes()
+
+
+def _decode(blob: bytes) -> List[float]:
+    vector = array("d")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: an in-memory LRU over a SQLite file.
+
+    Errors from the file are logged and treated as misses, so a broken cache
+    never stops content from being embedded. Vectors are returned as copies,
+    so callers may modify them freely. Hits are recorded in memory and
+    written to the file's `last_used` column in batches.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        memory_size: int = 2048,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._memory: LRUCache[Tuple[str, str], List[float]] = LRUCache(memory_size)
+        # Guards the SQLite connection; held during file I/O
+        self._lock = threading.Lock()
+        # Guards the counters and pending hits; never held during I/O
+        self._stats_lock = threading.Lock()
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_key: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model_key, [text])[0]
+
+    def put(self, model_key: str, text: str, vector: Sequence[float]) -> None:
+        self.put_many(model_key, [text], [vector])
+
+    def get_many(
+        self, model_key: str, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """Return the cached vector of each text, or None where there is none."""
+        hashes, results, missing = self._get_from_memory(model_key, texts)
+        found = self._read(model_key, missing) if missing else {}
+        return self._merge_found(model_key, hashes, results, found)
+
+    async def aget_many(
+        self, model_key: str, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """Like `get_many`, reading the file in a worker thread."""
+        hashes, results, missing = self._get_from_memory(model_key, texts)
+        found = (
+            await asyncio.to_thread(self._read, model_key, missing) if missing else {}
+        )
+        return self._merge_found(model_key, hashes, results, found)
+
+    def put_many(
+        self,
+        model_key: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """Store vectors for texts. Empty vectors are not cached."""
+        rows = self._put_in_memory(model_key, texts, vectors)
+        if rows:
+            self._write(model_key, rows)
+
+    async def aput_many(
+        self,
+        model_key: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """Like `put_many`, writing the file in a worker thread."""
+        rows = self._put_in_memory(model_key, texts, vectors)
+        if rows:
+            await asyncio.to_thread(self._write, model_key, rows)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit counters and the size of the cache file."""
+        with self._stats_lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+                ),
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "size_bytes": self._size_bytes,
+            }
+
+    def clear(self) -> None:
+        self._memory.clear()
+        with self._stats_lock:
+            self._touched.clear()
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM embeddings")
+                conn.commit()
+                self._size_bytes = 0
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Failed to clear embedding cache: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_touched(self._conn)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to record embedding cache hits: {e}")
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold self._lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model_key TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model_key, text_hash)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used "
+                "ON embeddings (last_used)"
+            )
+            self._size_bytes = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _read(self, model_key: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            try:
+                conn = self._connection()
+                for start in range(0, len(hashes), _SQL_CHUNK):
+                    chunk = hashes[start : start + _SQL_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings "
+                        f"WHERE model_key = ? AND text_hash IN ({placeholders})",
+                        [model_key, *chunk],
+                    ).fetchall()
+                    for digest, blob in rows:
+                        found[digest] = _decode(blob)
+                if len(self._touched) >= _SQL_CHUNK:
+                    self._flush_touched(conn)
+                    conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+        return found
+
+    def _write(self, model_key: str, rows: Dict[str, bytes]) -> None:
+        with self._lock:
+            try:
+                conn = self._connection()
+                self._flush_touched(conn)
+                now = time.time()
+                replaced = 0
+                hashes = list(rows)
+                for start in range(0, len(hashes), _SQL_CHUNK):
+                    chunk = hashes[start : start + _SQL_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    replaced += conn.execute(
+                        f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                        f"WHERE model_key = ? AND text_hash IN ({placeholders})",
+                        [model_key, *chunk],
+                    ).fetchone()[0]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings "
+                    "(model_key, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                    [(model_key, digest, blob, now) for digest, blob in rows.items()],
+                )
+                self._size_bytes += sum(len(blob) for blob in rows.values()) - replaced
+                if self._size_bytes > self.max_bytes:
+                    self._evict(conn)
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+    def _get_from_memory(
+        self, model_key: str, texts: Sequence[str]
+    ) -> Tuple[List[str], List[Optional[List[float]]], List[str]]:
+        hashes = [text_hash(text) for text in texts]
+        results: List[Optional[List[float]]] = []
+        for digest in hashes:
+            vector = self._memory.get((model_key, digest), count=False)
+            results.append(list(vector) if vector is not None else None)
+        missing = list(
+            {digest for digest, vector in zip(hashes, results) if vector is None}
+        )
+        return hashes, results, missing
+
+    def _merge_found(
+        self,
+        model_key: str,
+        hashes: List[str],
+        results: List[Optional[List[float]]],
+        found: Dict[str, List[float]],
+    ) -> List[Optional[List[float]]]:
+        memory_hits = sum(1 for vector in results if vector is not None)
+        for index, digest in enumerate(hashes):
+            if results[index] is None and digest in found:
+                results[index] = list(found[digest])
+                self._memory.set((model_key, digest), found[digest])
+
+        now = time.time()
+        with self._stats_lock:
+            for digest, vector in zip(hashes, results):
+                if vector is not None:
+                    self._touched[(model_key, digest)] = now
+            self.memory_hits += memory_hits
+            self.disk_hits += sum(
+                1
+                for index, vector in enumerate(results)
+                if vector is not None and hashes[index] in found
+            )
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def _put_in_memory(
+        self,
+        model_key: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> Dict[str, bytes]:
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            if not vector:
+                continue
+            digest = text_hash(text)
+            self._memory.set((model_key, digest), list(vector))
+            rows[digest] = _encode(vector)
+        return rows
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        # Callers hold self._lock and commit
+        with self._stats_lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? "
+                "WHERE model_key = ? AND text_hash = ?",
+                [
+                    (used, model_key, digest)
+                    for (model_key, digest), used in touched.items()
+                ],
+            )
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Free down to 90% of the limit so eviction doesn't run on every write
+        target = int(self.max_bytes * 0.9)
+        while self._size_bytes > target:
+            rows = conn.execute(
+                "SELECT model_key, text_hash, LENGTH(vector) FROM embeddings "
+                "ORDER BY last_used LIMIT ?",
+                (_SQL_CHUNK,),
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                break
+            victims = []
+            for model_key, digest, size in rows:
+                victims.append((model_key, digest))
+                self._size_bytes -= size
+                if self._size_bytes <= target:
+                    break
+            conn.executemany(
+                "DELETE FROM embeddings WHERE model_key = ? AND text_hash = ?",
+                victims,
+            )
+            self.evictions += len(victims)
+            for key in victims:
+                self._memory.pop(key)
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the process-wide embedding cache, or None when it is disabled.
+
+    Configured with EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_MAX_MB and
+    EMBEDDING_CACHE_MEMORY_ITEMS.
+    """
+    global _cache
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("false", "0", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            from open_notebook.config import EMBEDDING_CACHE_FILE
+
+            max_mb = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+            _cache = EmbeddingCache(
+                EMBEDDING_CACHE_FILE,
+                max_bytes=int(max_mb * 1024 * 1024),
+                memory_size=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "2048")),
+            )
+        return _cache
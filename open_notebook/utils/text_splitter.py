@@ -0,0 +1,257 @@
+"""
+Token-aware text splitter that tokenizes each document once.
+
+`TokenOffsetSplitter` follows the algorithm of LangChain's
+RecursiveCharacterTextSplitter with a token-count length function: split on
+the first separator found, merge pieces into chunks of up to `chunk_size`
+tokens with `chunk_overlap` tokens of overlap, and recurse into pieces that
+are too long. Instead of tokenizing every candidate piece, the document is
+tokenized once and the length of a piece is the number of tokens that start
+inside it, looked up in the token offset array.
+
+Pieces are counted as part of the whole document, so a token that spans a
+piece boundary counts towards the piece it starts in. Chunk boundaries can
+therefore differ slightly from tokenizing each piece on its own.
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .token_utils import get_encoding
+
+DEFAULT_SEPARATORS = [
+    "\n\n",
+    "\n",
+    ".",
+    ",",
+    " ",
+    "\u200b",  # Zero-width space
+    "\uff0c",  # Fullwidth comma
+    "\u3001",  # Ideographic comma
+    "\uff0e",  # Fullwidth full stop
+    "\u3002",  # Ideographic full stop
+    "",
+]
+
+# Maps a text to the character offset at which each of its tokens starts
+TokenOffsets = Callable[[str], Sequence[int]]
+
+# Rough stand-in for a tokenizer: words and runs of punctuation
+_APPROXIMATE_TOKEN = re.compile(r"\w+|[^\w\s]+")
+
+# (start, end, token count) of a piece of the document
+_Piece = Tuple[int, int, int]
+
+
+def tiktoken_offsets(text: str) -> List[int]:
+    """
+    Return the start offset of each 'o200k_base' token of `text`.
+
+    Without tiktoken, every word and run of punctuation counts as a token.
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return [match.start() for match in _APPROXIMATE_TOKEN.finditer(text)]
+    _, offsets = encoding.decode_with_offsets(encoding.encode_ordinary(text))
+    return offsets
+
+
+class TokenOffsetSplitter:
+    """
+    Split text into chunks of at most `chunk_size` tokens.
+
+    `chunk_overlap` defaults to 15% of `chunk_size`. Instances hold no
+    per-document state and can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: Optional[int] = None,
+        separators: Optional[Sequence[str]] = None,
+        token_offsets: Optional[TokenOffsets] = None,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.chunk_overlap = (
+            int(chunk_size * 0.15) if chunk_overlap is None else chunk_overlap
+        )
+        self.separators = list(separators or DEFAULT_SEPARATORS)
+        self.token_offsets = token_offsets or tiktoken_offsets
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self._chunk_spans(text)]
+
+    def split_stream(
+        self, texts: Iterable[str], buffer_size: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Split text that arrives in pieces, yielding chunks once they are final.
+
+        Text is buffered until the buffer holds `buffer_size` characters
+        (default: 32 per token of `chunk_size`). The buffer is then split up
+        to its last separator and the chunks that later text cannot change
+        are yielded; the rest stays buffered. Chunks match `split_text` on
+        the whole text except where a token spans a cut, or where a buffer
+        grows to 4 * `buffer_size` without a usable separator and is cut
+        at its end.
+        """
+        buffer_size = buffer_size or self.chunk_size * 32
+        buffer = ""
+        pending: List[str] = []
+        size = 0
+        for text in texts:
+            pending.append(text)
+            size += len(text)
+            if size < buffer_size:
+                continue
+            buffer = "".join(pending)
+            pending.clear()
+            while len(buffer) >= buffer_size:
+                chunks, rest = self._final_chunks(
+                    buffer, force=len(buffer) >= 4 * buffer_size
+                )
+                if not rest:
+                    break
+                yield from chunks
+                buffer = buffer[rest:]
+            pending.append(buffer)
+            size = len(buffer)
+        buffer = "".join(pending)
+        if buffer:
+            yield from self.split_text(buffer)
+
+    def _final_chunks(self, buffer: str, force: bool) -> Tuple[List[str], int]:
+        """
+        Split the buffer up to its last separator, or its end with `force`.
+
+        Returns the chunks that are final and the offset where the text that
+        still has to be split starts, which is 0 when nothing is final yet.
+        """
+        cut, cut_at = (len(buffer), "") if force else self._stream_cut(buffer)
+        head = buffer[:cut]
+        spans = self._chunk_spans(head)
+        if len(spans) < 2:
+            return [], 0
+
+        # The last chunk may still merge with the text that follows
+        keep, rest = len(spans) - 1, spans[-1][0]
+        separator = next(s for s in self.separators if not s or s in head)
+        if separator and separator == cut_at:
+            # Chunks of an oversized piece never merge with what follows, so
+            # when the head ends with a whole one they are all final
+            last_piece = max(head.rfind(separator), 0)
+            if len(self.token_offsets(head[last_piece:])) >= self.chunk_size:
+                keep, rest = len(spans), cut
+        return [head[start:end] for start, end in spans[:keep]], rest
+
+    def _stream_cut(self, buffer: str) -> Tuple[int, str]:
+        """Return the position of the last top-level separator and the separator."""
+        for separator in self.separators:
+            if not separator:
+                break
+            position = buffer.rfind(separator)
+            if position > 0:
+                return position, separator
+        return len(buffer), ""
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int]]:
+        if not text:
+            return []
+        offsets = self.token_offsets(text)
+        return self._split(text, offsets, 0, len(text), self.separators)
+
+    def _split(
+        self,
+        text: str,
+        offsets: Sequence[int],
+        start: int,
+        end: int,
+        separators: List[str],
+    ) -> List[Tuple[int, int]]:
+        separator = separators[-1]
+        remaining: List[str] = []
+        for index, candidate in enumerate(separators):
+            if not candidate:
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[index + 1 :]
+                break
+
+        chunks: List[Tuple[int, int]] = []
+        fitting: List[_Piece] = []
+        for piece_start, piece_end in self._pieces(text, start, end, separator):
+            size = bisect_left(offsets, piece_end) - bisect_left(offsets, piece_start)
+            if size < self.chunk_size:
+                fitting.append((piece_start, piece_end, size))
+                continue
+            if fitting:
+                chunks.extend(self._merge(text, fitting))
+                fitting = []
+            if remaining:
+                chunks.extend(
+                    self._split(text, offsets, piece_start, piece_end, remaining)
+                )
+            else:
+                chunks.append((piece_start, piece_end))
+        if fitting:
+            chunks.extend(self._merge(text, fitting))
+        return chunks
+
+    @staticmethod
+    def _pieces(
+        text: str, start: int, end: int, separator: str
+    ) -> List[Tuple[int, int]]:
+        """Split [start, end) before each separator, dropping empty pieces."""
+        if not separator:
+            return [(index, index + 1) for index in range(start, end)]
+        cuts = [start]
+        position = text.find(separator, start, end)
+        while position != -1:
+            cuts.append(position)
+            position = text.find(separator, position + len(separator), end)
+        cuts.append(end)
+        return [(a, b) for a, b in zip(cuts, cuts[1:]) if a < b]
+
+    def _merge(self, text: str, pieces: List[_Piece]) -> List[Tuple[int, int]]:
+        """Join adjacent pieces into overlapping chunks."""
+        chunks: List[Tuple[int, int]] = []
+        current: List[_Piece] = []
+        first = 0  # current[first:] is the chunk being built
+        total = 0
+        for piece in pieces:
+            size = piece[2]
+            if total + size > self.chunk_size and first < len(current):
+                self._add_stripped(text, current[first][0], current[-1][1], chunks)
+                # Keep the tail of the chunk as overlap for the next one
+                while total > self.chunk_overlap or (
+                    total + size > self.chunk_size and total > 0
+                ):
+                    total -= current[first][2]
+                    first += 1
+            current.append(piece)
+            total += size
+        if first < len(current):
+            self._add_stripped(text, current[first][0], current[-1][1], chunks)
+        return chunks
+
+    @staticmethod
+    def _add_stripped(
+        text: str, start: int, end: int, chunks: List[Tuple[int, int]]
+    ) -> None:
+        """Append [start, end) without surrounding whitespace, unless empty."""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            chunks.append((start, end))
+
+
+@lru_cache(maxsize=16)
+def get_text_splitter(chunk_size: int = 500) -> TokenOffsetSplitter:
+    """Return the shared splitter for `chunk_size`."""
+    return TokenOffsetSplitter(chunk_size)
@@ -3,25 +3,41 @@ Text utilities for Open Notebook.
 Extracted from main utils to avoid circular imports.
 """
 
+import os
 import re
+import sys
 import unicodedata
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .text_splitter import get_text_splitter
 
-from .token_utils import token_count
+# Tags around thinking content in AI responses
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+# Runs of whitespace with three or more newlines. Spaces and newlines cannot
+# overlap, so matching never backtracks more than one run of spaces.
+EXCESS_NEWLINES_PATTERN = re.compile(r"\n(?:[^\S\n]*\n){2,}")
 
-# Patterns for matching thinking content in AI responses
-# Standard pattern: <think>...</think>
-THINK_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL)
-# Pattern for malformed output: content</think> (missing opening tag)
-THINK_PATTERN_NO_OPEN = re.compile(r"^(.*?)</think>", re.DOTALL)
+# remove_non_printable: special Unicode whitespace and non-breaking spaces
+# become spaces, unusual line terminators become newlines
+SPECIAL_SPACES_PATTERN = re.compile("[\u2000-\u200b\u202f\u205f\u3000\xa0]")
+LINE_TERMINATORS_PATTERN = re.compile("[\u2028\u2029\r]")
+DISALLOWED_CHARS_PATTERN = re.compile(r"[^\w\s.,!?\-\n\t]+")
+ASTRAL_CHARS_PATTERN = re.compile("[\U00010000-\U0010ffff]+")
+
+# remove_non_printable_many cleans smaller batches in-process
+_PARALLEL_MIN_CHARS = 1_000_000
 
 
 def split_text(txt: str, chunk_size=500):
     """
     Split the input text into chunks.
 
+    Chunks hold up to `chunk_size` tokens and overlap by 15%. The text is
+    tokenized once; see TokenOffsetSplitter.
+
     Args:
         txt (str): The input text to be split.
         chunk_size (int): The size of each chunk. Default is 500.
@@ -29,26 +45,30 @@ def split_text(txt: str, chunk_size=500):
     Returns:
         list: A list of text chunks.
     """
-    overlap = int(chunk_size * 0.15)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        length_function=token_count,
-        separators=[
-            "\n\n",
-            "\n",
-            ".",
-            ",",
-            " ",
-            "\u200b",  # Zero-width space
-            "\uff0c",  # Fullwidth comma
-            "\u3001",  # Ideographic comma
-            "\uff0e",  # Fullwidth full stop
-            "\u3002",  # Ideographic full stop
-            "",
-        ],
-    )
-    return text_splitter.split_text(txt)
+    return get_text_splitter(chunk_size).split_text(txt)
+
+
+def split_text_stream(
+    texts: Iterable[str], chunk_size=500, buffer_size: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Split text that arrives in pieces, yielding chunks as they are ready.
+
+    Only a bounded window of text is held in memory, so pages or transcript
+    segments can be chunked while they are still being extracted. Chunks
+    match those of `split_text` on the joined text, except that boundaries
+    near the points where the window was cut may differ slightly.
+
+    Args:
+        texts (Iterable[str]): Consecutive pieces of the input text.
+        chunk_size (int): The size of each chunk. Default is 500.
+        buffer_size (int, optional): Characters to buffer before splitting.
+            Defaults to 32 per token of `chunk_size`.
+
+    Yields:
+        str: Text chunks, in order.
+    """
+    yield from get_text_splitter(chunk_size).split_stream(texts, buffer_size)
 
 
 def remove_non_ascii(text: str) -> str:
@@ -56,24 +76,96 @@ def remove_non_ascii(text: str) -> str:
     return re.sub(r"[^\x00-\x7F]+", "", text)
 
 
+def _char_class(codes: Iterable[int]) -> str:
+    """Return a regex character class body matching the given code points."""
+    ranges: List[List[int]] = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return "".join(
+        re.escape(chr(low))
+        if low == high
+        else f"{re.escape(chr(low))}-{re.escape(chr(high))}"
+        for low, high in ranges
+    )
+
+
+@lru_cache(maxsize=1)
+def _control_char_patterns() -> Tuple[Pattern[str], Pattern[str]]:
+    """
+    Compile the control, format, surrogate, private use and unassigned
+    characters (Unicode category C) other than newline and tab.
+
+    Returns one pattern for the Basic Multilingual Plane, which the regex
+    engine matches with a bitmap, and one for the astral planes, which is
+    only run on astral characters.
+    """
+    control = [
+        code
+        for code in range(sys.maxunicode + 1)
+        if unicodedata.category(chr(code))[0] == "C" and code not in (9, 10)
+    ]
+    bmp = _char_class(code for code in control if code <= 0xFFFF)
+    astral = _char_class(code for code in control if code > 0xFFFF)
+    return re.compile(f"[{bmp}]+"), re.compile(f"[{astral}]+")
+
+
 def remove_non_printable(text: str) -> str:
     """Remove non-printable characters from text."""
-    # Replace any special Unicode whitespace characters with a regular space
-    text = re.sub(r"[\u2000-\u200B\u202F\u205F\u3000]", " ", text)
+    bmp_controls, astral_controls = _control_char_patterns()
+
+    # Replace special Unicode whitespace with a regular space
+    text = SPECIAL_SPACES_PATTERN.sub(" ", text)
 
     # Replace unusual line terminators with a single newline
-    text = re.sub(r"[\u2028\u2029\r]", "\n", text)
+    text = LINE_TERMINATORS_PATTERN.sub("\n", text)
 
     # Remove control characters, except newlines and tabs
-    text = "".join(
-        char for char in text if unicodedata.category(char)[0] != "C" or char in "\n\t"
-    )
-
-    # Replace non-breaking spaces with regular spaces
-    text = text.replace("\xa0", " ").strip()
+    text = bmp_controls.sub("", text)
+    text = ASTRAL_CHARS_PATTERN.sub(
+        lambda match: astral_controls.sub("", match.group()), text
+    ).strip()
 
     # Keep letters (including accented ones), numbers, spaces, newlines, tabs, and basic punctuation
-    return re.sub(r"[^\w\s.,!?\-\n\t]", "", text, flags=re.UNICODE)
+    return DISALLOWED_CHARS_PATTERN.sub("", text)
+
+
+def _remove_non_printable_batch(texts: List[str]) -> List[str]:
+    return [remove_non_printable(text) for text in texts]
+
+
+def remove_non_printable_many(
+    texts: Iterable[str], max_workers: Optional[int] = None
+) -> List[str]:
+    """
+    Apply remove_non_printable to many texts, using a process pool for large batches.
+
+    Batches under 1 MB in total, or with a single text, are cleaned in this
+    process, where starting workers would cost more than it saves.
+
+    Args:
+        texts (Iterable[str]): The texts to clean.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+
+    Returns:
+        List[str]: The cleaned texts, in order.
+    """
+    texts = list(texts)
+    workers = min(max_workers or os.cpu_count() or 1, len(texts))
+    if workers < 2 or sum(len(text) for text in texts) < _PARALLEL_MIN_CHARS:
+        return _remove_non_printable_batch(texts)
+
+    # Send a few batches per worker so slow texts even out
+    size = -(-len(texts) // (workers * 4))
+    batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [
+            text
+            for cleaned in executor.map(_remove_non_printable_batch, batches)
+            for text in cleaned
+        ]
 
 
 def parse_thinking_content(content: str) -> Tuple[str, str]:
@@ -81,7 +173,9 @@ def parse_thinking_content(content: str) -> Tuple[str, str]:
     Parse message content to extract thinking content from <think> tags.
 
     Handles both well-formed tags and malformed output where the opening
-    <think> tag is missing but </think> is present.
+    <think> tag is missing but </think> is present. The content is run
+    through a ThinkingStreamParser in one piece, so the result is the same
+    as streaming it in chunks.
 
     Args:
         content (str): The original message content
@@ -103,35 +197,170 @@ def parse_thinking_content(content: str) -> Tuple[str, str]:
     if not isinstance(content, str):
         return "", str(content) if content is not None else ""
 
-    # Limit processing for very large content (100KB limit)
-    if len(content) > 100000:
-        return "", content
-
-    # Find all well-formed thinking blocks
-    thinking_matches = THINK_PATTERN.findall(content)
+    parser = ThinkingStreamParser()
+    thinking, cleaned = parser.feed(content)
+    rest_thinking, rest_cleaned = parser.close()
+    return thinking + rest_thinking, cleaned + rest_cleaned
 
-    if thinking_matches:
-        # Join all thinking content with double newlines
-        thinking_content = "\n\n".join(match.strip() for match in thinking_matches)
 
-        # Remove all <think>...</think> blocks from the original content
-        cleaned_content = THINK_PATTERN.sub("", content)
+class _StrippedOutput:
+    """
+    Writes text as it arrives, without leading or trailing whitespace.
 
-        # Clean up extra whitespace
-        cleaned_content = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned_content).strip()
+    Whitespace is held back until more text follows it, so nothing is
+    written that stripping the finished text would remove.
+    """
 
-        return thinking_content, cleaned_content
+    def __init__(self, collapse_newlines: bool = False) -> None:
+        self.collapse_newlines = collapse_newlines
+        self.started = False
+        self.space = ""
+
+    def write(self, text: str) -> str:
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self.started = True
+        body = text.rstrip()
+        if not body:
+            self.space += text
+            return ""
+        text, self.space = self.space + body, text[len(body) :]
+        if self.collapse_newlines:
+            text = EXCESS_NEWLINES_PATTERN.sub("\n\n", text)
+        return text
+
+
+def _partial_tag(text: str, tags: Tuple[str, ...]) -> int:
+    """Return the length of the longest end of `text` that starts one of `tags`."""
+    for length in range(min(len(text), max(map(len, tags)) - 1), 0, -1):
+        if any(tag.startswith(text[-length:]) for tag in tags):
+            return length
+    return 0
+
+
+class ThinkingStreamParser:
+    """
+    Separate thinking from content in a streamed AI response.
+
+    Feed chunks as they arrive; each call returns the thinking and content
+    that became final, so a response can be shown while it is generated.
+    Every character is looked at a bounded number of times, and tags split
+    across chunks are recognised.
+
+    Joined, the returned pieces are what parse_thinking_content() returns
+    for the whole response, however it is split into chunks. Blocks are
+    stripped and separated by blank lines, and once a tag has been seen,
+    content is stripped and runs of three or more newlines in it are
+    collapsed. Text before a </think> that comes ahead of any <think> is
+    thinking (the missing-open-tag case), a block still open when the
+    stream ends counts as thinking, and a response without tags is returned
+    unchanged. Content is held back until the first tag, unless
+    `max_preamble` is set, in which case more than that many characters
+    without a tag are released as content, stripped as if a tag followed.
 
-    # Handle malformed output: content</think> (missing opening tag)
-    # Some models like Nemotron output thinking without the opening <think> tag
-    malformed_match = THINK_PATTERN_NO_OPEN.match(content)
-    if malformed_match:
-        thinking_content = malformed_match.group(1).strip()
-        # Remove the thinking content and </think> tag
-        cleaned_content = content[malformed_match.end():].strip()
-        return thinking_content, cleaned_content
+    Example:
+        >>> parser = ThinkingStreamParser()
+        >>> parser.feed("<thi")
+        ('', '')
+        >>> parser.feed("nk>Hmm</think>Hello")
+        ('Hmm', '')
+        >>> parser.close()
+        ('', 'Hello')
+    """
 
-    return "", content
+    def __init__(self, max_preamble: Optional[int] = None) -> None:
+        self.max_preamble = max_preamble
+        self._state = "preamble"  # or "thinking", "content"
+        self._buffer = ""
+        # Preamble chunks are kept in a list and only scanned once each
+        self._held: List[str] = []
+        self._held_size = 0
+        self._tail = ""
+        self._blocks = 0
+        self._block = _StrippedOutput()
+        self._content = _StrippedOutput(collapse_newlines=True)
+
+    def feed(self, chunk: str) -> Tuple[str, str]:
+        """Add a chunk and return the (thinking, content) it completes."""
+        if self._state == "preamble" and not self._preamble_ends(chunk):
+            self._held.append(chunk)
+            self._held_size += len(chunk)
+            return "", ""
+        buffer = self._buffer + "".join(self._held) + chunk
+        self._held.clear()
+        thinking: List[str] = []
+        content: List[str] = []
+        position = 0
+        while position < len(buffer):
+            if self._state == "thinking":
+                end = buffer.find(THINK_CLOSE, position)
+                if end == -1:
+                    break
+                thinking.append(self._block.write(buffer[position:end]))
+                position = end + len(THINK_CLOSE)
+                self._state = "content"
+            elif self._state == "content":
+                start = buffer.find(THINK_OPEN, position)
+                if start == -1:
+                    break
+                content.append(self._content.write(buffer[position:start]))
+                position = start + len(THINK_OPEN)
+                self._open_block(thinking)
+            else:
+                start = buffer.find(THINK_OPEN)
+                end = buffer.find(THINK_CLOSE)
+                if end != -1 and (start == -1 or end < start):
+                    # Missing opening tag: everything so far was thinking
+                    self._open_block(thinking)
+                else:
+                    # An opening tag, or a preamble too long to be thinking
+                    self._state = "content"
+        self._buffer = buffer[position:]
+        self._emit(thinking, content, final=False)
+        return "".join(thinking), "".join(content)
+
+    def close(self) -> Tuple[str, str]:
+        """End the stream and return the (thinking, content) still held back."""
+        thinking: List[str] = []
+        content: List[str] = []
+        self._buffer += "".join(self._held)
+        self._held.clear()
+        if self._state == "preamble":
+            # No tag at all: the response is returned as it came
+            content, self._buffer = [self._buffer], ""
+        self._emit(thinking, content, final=True)
+        return "".join(thinking), "".join(content)
+
+    def _preamble_ends(self, chunk: str) -> bool:
+        """Whether `chunk` completes a tag or makes the preamble too long."""
+        if self.max_preamble is not None and (
+            self._held_size + len(chunk) > self.max_preamble
+        ):
+            return True
+        window = self._tail + chunk
+        self._tail = window[-len(THINK_CLOSE) :]
+        return THINK_OPEN in window or THINK_CLOSE in window
+
+    def _open_block(self, thinking: List[str]) -> None:
+        if self._blocks:
+            thinking.append("\n\n")
+        self._blocks += 1
+        self._block = _StrippedOutput()
+        self._state = "thinking"
+
+    def _emit(self, thinking: List[str], content: List[str], final: bool) -> None:
+        """Write out the buffer, keeping a possible partial tag unless `final`."""
+        if self._state == "thinking":
+            tags: Tuple[str, ...] = (THINK_CLOSE,)
+            output, out = self._block, thinking
+        else:
+            tags = (THINK_OPEN,)
+            output, out = self._content, content
+        keep = 0 if final else _partial_tag(self._buffer, tags)
+        out.append(output.write(self._buffer[: len(self._buffer) - keep]))
+        self._buffer = self._buffer[len(self._buffer) - keep :]
 
 
 def clean_thinking_content(content: str) -> str:
@@ -4,6 +4,8 @@ Handles token counting and cost calculations for language models.
 """
 
 import os
+import threading
+from typing import List, Sequence
 
 from open_notebook.config import TIKTOKEN_CACHE_DIR
 
@@ -11,25 +13,89 @@ from open_notebook.config import TIKTOKEN_CACHE_DIR
 # tokenizer encodings are cached persistently in the data folder
 os.environ["TIKTOKEN_CACHE_DIR"] = TIKTOKEN_CACHE_DIR
 
+# Smaller batches are encoded inline; starting threads would cost more
+_MIN_PARALLEL_BATCH = 8
 
-def token_count(input_string: str) -> int:
+_encoding = None
+_encoding_lock = threading.Lock()
+_tiktoken_missing = False
+
+
+def get_encoding():
+    """
+    Return the shared 'o200k_base' encoding, or None if tiktoken is missing.
+
+    The encoding is loaded on first use, once per process, even when several
+    threads ask for it at the same time.
+    """
+    global _encoding, _tiktoken_missing
+    if _encoding is None and not _tiktoken_missing:
+        with _encoding_lock:
+            if _encoding is None and not _tiktoken_missing:
+                try:
+                    import tiktoken
+                except ImportError:
+                    _tiktoken_missing = True
+                    return None
+                try:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except ImportError:
+                    # An optional dependency of the encoding is missing
+                    return None
+    return _encoding
+
+
+def approximate_token_count(input_string: str) -> int:
+    """Estimate the token count from the number of words, without a tokenizer."""
+    return int(len(input_string.split()) * 1.3)
+
+
+def token_count(input_string: str, approximate: bool = False) -> int:
     """
     Count the number of tokens in the input string using the 'o200k_base' encoding.
 
     Args:
         input_string (str): The input string to count tokens for.
+        approximate (bool): Estimate from the word count instead of tokenizing.
 
     Returns:
         int: The number of tokens in the input string.
     """
-    try:
-        import tiktoken
-        encoding = tiktoken.get_encoding("o200k_base")
-        tokens = encoding.encode(input_string)
-        return len(tokens)
-    except ImportError:
+    encoding = None if approximate else get_encoding()
+    if encoding is None:
         # Fallback: simple word count estimation
-        return int(len(input_string.split()) * 1.3)
+        return approximate_token_count(input_string)
+    return len(encoding.encode_ordinary(input_string))
+
+
+def token_count_batch(
+    texts: Sequence[str], approximate: bool = False, num_threads: int = 8
+) -> List[int]:
+    """
+    Count the tokens of several strings at once.
+
+    Texts are tokenized in parallel on `num_threads` threads; tiktoken
+    releases the GIL while encoding.
+
+    Args:
+        texts (Sequence[str]): The strings to count tokens for.
+        approximate (bool): Estimate from word counts instead of tokenizing.
+        num_threads (int): Threads used to tokenize larger batches.
+
+    Returns:
+        List[int]: The token count of each string, in order.
+    """
+    encoding = None if approximate else get_encoding()
+    if encoding is None:
+        return [approximate_token_count(text) for text in texts]
+    if len(texts) < _MIN_PARALLEL_BATCH:
+        return [len(encoding.encode_ordinary(text)) for text in texts]
+    return [
+        len(tokens)
+        for tokens in encoding.encode_ordinary_batch(
+            list(texts), num_threads=num_threads
+        )
+    ]
 
 
 def token_cost(token_count: int, cost_per_million: float = 0.150) -> float:
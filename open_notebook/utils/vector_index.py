@@ -0,0 +1,361 @@
+"""
+In-process vector index over normalized float32 embeddings.
+
+Requires numpy, which is installed with the `local-index` extra:
+    pip install "open-notebook[local-index]"
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from open_notebook.exceptions import ConfigurationError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+# Rows are assigned to IVF lists in chunks to bound memory use
+_ASSIGN_CHUNK = 65536
+
+# Bumped whenever the layout of the saved files changes
+_FORMAT_VERSION = 2
+
+# Serializes writers of the index files
+_save_lock = threading.Lock()
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ConfigurationError(
+            "The local vector index requires numpy. "
+            'Install it with: pip install "open-notebook[local-index]"'
+        )
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a float32 matrix of normalized vectors.
+
+    Every vector is stored under a unique key along with a metadata dict,
+    which is written to the JSON manifest by `save` and should stay small:
+    ids rather than content. Small indexes are scanned exactly. Once
+    `ivf_threshold` vectors are stored, an inverted file (IVF) index is
+    trained: vectors are grouped around k-means centroids and a query only
+    scans the `n_probe` lists whose centroids are closest to it.
+    """
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        ivf_threshold: int = 4096,
+        n_probe: int = 8,
+    ) -> None:
+        _require_numpy()
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.n_probe = n_probe
+        self.built_at = time.time()
+        self.saved_at: Optional[float] = None
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._lists = np.zeros(0, dtype=np.int32)  # IVF list per row, -1 if none
+        self._alive = np.zeros(0, dtype=bool)
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional["np.ndarray"] = None
+        self._trained_size = 0
+        self.mutations = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, key: str, vector: Sequence[float], meta: Dict[str, Any]) -> bool:
+        """
+        Store or replace the vector for `key`.
+
+        Returns False when the vector is empty, has another dimension than
+        the index, or has zero length.
+        """
+        if not vector:
+            return False
+        array = np.asarray(vector, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(array.shape[0])
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        if array.shape != (self.dim,):
+            logger.debug(
+                f"Skipping {key}: {array.shape[0]} dimensions, index has {self.dim}"
+            )
+            return False
+        norm = float(np.linalg.norm(array))
+        if norm == 0.0:
+            return False
+
+        self.remove(key)
+        row = len(self._meta)
+        self._ensure_capacity(row + 1)
+        self._vectors[row] = array / norm
+        self._alive[row] = True
+        self._lists[row] = (
+            int(np.argmax(self._centroids @ self._vectors[row]))
+            if self._centroids is not None
+            else -1
+        )
+        self._meta.append(dict(meta))
+        self._rows[key] = row
+        self.mutations += 1
+
+        if len(self._rows) >= self.ivf_threshold and (
+            not self.is_trained or len(self._rows) > 2 * self._trained_size
+        ):
+            self.train()
+        return True
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._meta[row] = None
+        self.mutations += 1
+        return True
+
+    def remove_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Remove every vector whose metadata matches `predicate`."""
+        keys = [
+            key
+            for key, row in self._rows.items()
+            if predicate(self._meta[row])  # type: ignore[arg-type]
+        ]
+        for key in keys:
+            self.remove(key)
+        return len(keys)
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        min_score: float = 0.0,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Return up to `k` (metadata, similarity) pairs, best first."""
+        if not self._rows or self.dim is None:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (self.dim,):
+            return []
+        norm = float(np.linalg.norm(q))
+        if norm == 0.0:
+            return []
+        q = q / norm
+
+        size = len(self._meta)
+        candidates = self._alive[:size]
+        if self._centroids is not None:
+            probe = min(self.n_probe, len(self._centroids))
+            closest = np.argpartition(-(self._centroids @ q), probe - 1)[:probe]
+            lists = self._lists[:size]
+            candidates = candidates & (np.isin(lists, closest) | (lists < 0))
+        rows = np.flatnonzero(candidates)
+        if rows.size == 0:
+            return []
+
+        scores = self._vectors[rows] @ q
+        keep = scores >= min_score
+        rows, scores = rows[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+
+        results: List[Tuple[Dict[str, Any], float]] = []
+        for position in order:
+            meta = self._meta[int(rows[position])]
+            if meta is None or (where is not None and not where(meta)):
+                continue
+            results.append((meta, float(scores[position])))
+            if len(results) >= k:
+                break
+        return results
+
+    def train(self, n_lists: Optional[int] = None, iterations: int = 10) -> None:
+        """Cluster the stored vectors with spherical k-means and build the IVF."""
+        self._compact()
+        count = len(self._meta)
+        if count == 0:
+            return
+        n_lists = n_lists or max(1, min(1024, int(np.sqrt(count))))
+        n_lists = min(n_lists, count)
+        rng = np.random.default_rng(0)
+        centroids = self._vectors[rng.choice(count, n_lists, replace=False)].copy()
+        assignments = np.zeros(count, dtype=np.int32)
+        for _ in range(iterations):
+            assignments = self._assign(centroids, count)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self._vectors[:count])
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Clusters that lost every vector keep their previous centroid
+            centroids = np.where(
+                norms > 0, sums / np.maximum(norms, 1e-12), centroids
+            )
+        self._centroids = centroids.astype(np.float32)
+        self._lists[:count] = self._assign(self._centroids, count)
+        self._trained_size = count
+        logger.debug(f"Trained vector index with {n_lists} lists over {count} vectors")
+
+    def save(self, directory: str) -> None:
+        """Write the index to `directory`; vectors are stored as .npy files."""
+        _write_snapshot(directory, self._snapshot())
+
+    async def asave(self, directory: str) -> None:
+        """
+        Like `save`, writing the files in a worker thread.
+
+        The index is captured when the call starts and can keep changing
+        while the files are written.
+        """
+        snapshot = self._snapshot()
+        await asyncio.to_thread(_write_snapshot, directory, snapshot)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Capture what `save` writes, without copying the vectors."""
+        self._compact()
+        count = len(self._meta)
+        self.saved_at = time.time()
+        self.mutations = 0
+        keys = [None] * count
+        for key, row in self._rows.items():
+            keys[row] = key
+        return {
+            # Rows below `count` are never written again, later changes
+            # append rows or replace the array
+            "vectors": self._vectors[:count],
+            "lists": self._lists[:count].copy(),
+            "centroids": self._centroids,
+            "manifest": {
+                "version": _FORMAT_VERSION,
+                "dim": self.dim,
+                "ivf_threshold": self.ivf_threshold,
+                "n_probe": self.n_probe,
+                "trained_size": self._trained_size,
+                "built_at": self.built_at,
+                "saved_at": self.saved_at,
+                "keys": keys,
+                "meta": list(self._meta),
+            },
+        }
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional["VectorIndex"]:
+        """
+        Load an index written by `save`, or return None if there is none.
+
+        With `mmap` the vectors are memory-mapped read-only and copied into
+        memory on the first change.
+        """
+        _require_numpy()
+        manifest_path = os.path.join(directory, "index.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != _FORMAT_VERSION:
+            logger.info(f"Vector index in {directory} has an old format, ignoring it")
+            return None
+        mmap_mode = "r" if mmap else None
+        index = cls(
+            dim=manifest["dim"],
+            ivf_threshold=manifest["ivf_threshold"],
+            n_probe=manifest["n_probe"],
+        )
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        if vectors.shape[0] != len(manifest["keys"]):
+            logger.warning(f"Vector index in {directory} is inconsistent, ignoring it")
+            return None
+        index._vectors = vectors
+        index._lists = np.array(np.load(os.path.join(directory, "lists.npy")))
+        index._alive = np.ones(vectors.shape[0], dtype=bool)
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index._centroids = np.load(centroids_path)
+        index._meta = manifest["meta"]
+        index._rows = {key: row for row, key in enumerate(manifest["keys"])}
+        index._trained_size = manifest["trained_size"]
+        index.built_at = manifest["built_at"]
+        index.saved_at = manifest["saved_at"]
+        return index
+
+    def _assign(self, centroids: "np.ndarray", count: int) -> "np.ndarray":
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, _ASSIGN_CHUNK):
+            block = self._vectors[start : start + _ASSIGN_CHUNK]
+            assignments[start : start + len(block)] = np.argmax(
+                block @ centroids.T, axis=1
+            )
+        return assignments
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = self._vectors.shape[0]
+        # Memory-mapped arrays are read-only; copy them on the first change
+        if rows <= capacity and self._vectors.flags.writeable:
+            return
+        if rows > capacity:
+            capacity = max(64, rows, capacity * 2)
+        used = len(self._meta)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:used] = self._vectors[:used]
+        lists = np.full(capacity, -1, dtype=np.int32)
+        lists[:used] = self._lists[:used]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:used] = self._alive[:used]
+        self._vectors, self._lists, self._alive = vectors, lists, alive
+
+    def _compact(self) -> None:
+        """Drop removed rows so the arrays only hold live vectors."""
+        used = len(self._meta)
+        if len(self._rows) == used and self._vectors.shape[0] == used:
+            return
+        keep = np.flatnonzero(self._alive[:used])
+        key_by_row = {row: key for key, row in self._rows.items()}
+        self._vectors = np.ascontiguousarray(self._vectors[keep])
+        self._lists = self._lists[keep].copy()
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._meta = [self._meta[int(row)] for row in keep]
+        self._rows = {key_by_row[int(row)]: new for new, row in enumerate(keep)}
+
+
+def _write_snapshot(directory: str, snapshot: Dict[str, Any]) -> None:
+    with _save_lock:
+        os.makedirs(directory, exist_ok=True)
+        _save_array(directory, "vectors.npy", snapshot["vectors"])
+        _save_array(directory, "lists.npy", snapshot["lists"])
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if snapshot["centroids"] is not None:
+            _save_array(directory, "centroids.npy", snapshot["centroids"])
+        elif os.path.exists(centroids_path):
+            os.remove(centroids_path)
+        tmp_path = os.path.join(directory, "index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot["manifest"], f)
+        os.replace(tmp_path, os.path.join(directory, "index.json"))
+
+
+def _save_array(directory: str, name: str, array: "np.ndarray") -> None:
+    tmp_path = os.path.join(directory, f"{name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, os.path.join(directory, name))
@@ -14,6 +14,11 @@ from pathlib import Path
 # Set to empty string instead of deleting to prevent it from being reloaded
 os.environ["OPEN_NOTEBOOK_PASSWORD"] = ""
 
+# Keep tests from reading or writing the embedding cache under ./data
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+# Search results are cached across calls; tests that cover it enable it
+os.environ["SEARCH_CACHE_ENABLED"] = "false"
+
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -0,0 +1,272 @@
+"""
+Unit tests for the open_notebook.database module.
+
+These tests exercise the repository plumbing with in-memory fake connections,
+so they run without a SurrealDB server.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from open_notebook.database import repository
+from open_notebook.database.pool import ConnectionPool, PoolConfig
+from open_notebook.database.repository import QueryBatch, repo_batch
+
+
+class FakeConnection:
+    """Minimal stand-in for an AsyncSurreal connection."""
+
+    def __init__(self, healthy: bool = True):
+        self.healthy = healthy
+        self.closed = False
+        self.queries = []
+        self.raw_results = []
+
+    async def query(self, query_str, vars=None):
+        self.queries.append(query_str)
+        if not self.healthy:
+            raise ConnectionError("connection lost")
+        return []
+
+    async def query_raw(self, query_str, params=None):
+        self.queries.append((query_str, params))
+        return {"result": self.raw_results}
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(**config):
+    created = []
+
+    async def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(connect, PoolConfig(**config)), created
+
+
+# ============================================================================
+# TEST SUITE 1: Connection Pool
+# ============================================================================
+
+
+class TestConnectionPool:
+    """Test suite for the SurrealDB connection pool."""
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self):
+        """Test sequential checkouts share one connection."""
+        pool, created = make_pool()
+
+        async with pool.connection() as first:
+            pass
+        async with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert len(created) == 1
+        assert pool.stats()["reused"] == 1
+
+    @pytest.mark.asyncio
+    async def test_max_size_bounds_concurrency(self):
+        """Test no more than max_size connections are checked out at once."""
+        pool, created = make_pool(max_size=2)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with pool.connection():
+                peak = max(peak, pool.stats()["in_use"])
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(6)))
+
+        assert peak == 2
+        assert len(created) == 2
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self):
+        """Test waiting on an exhausted pool times out."""
+        pool, _ = make_pool(max_size=1, acquire_timeout=0.01)
+        await pool.acquire()
+
+        with pytest.raises(RuntimeError, match="Timed out"):
+            await pool.acquire()
+
+    @pytest.mark.asyncio
+    async def test_failed_connection_is_discarded(self):
+        """Test connections are dropped after non-query errors."""
+        pool, created = make_pool()
+
+        with pytest.raises(ConnectionError):
+            async with pool.connection():
+                raise ConnectionError("socket closed")
+        async with pool.connection():
+            pass
+
+        assert len(created) == 2
+        assert created[0].closed
+
+    @pytest.mark.asyncio
+    async def test_query_errors_keep_connection(self):
+        """Test RuntimeError (query failure) leaves the connection pooled."""
+        pool, created = make_pool()
+
+        with pytest.raises(RuntimeError):
+            async with pool.connection():
+                raise RuntimeError("transaction conflict")
+        async with pool.connection():
+            pass
+
+        assert len(created) == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_connections_are_evicted(self):
+        """Test connections idle past idle_timeout are closed, not reused."""
+        pool, created = make_pool(idle_timeout=0)
+
+        async with pool.connection():
+            pass
+        await asyncio.sleep(0.01)
+        async with pool.connection():
+            pass
+
+        assert len(created) == 2
+        assert created[0].closed
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_connections_are_replaced(self):
+        """Test idle connections failing the ping are replaced."""
+        pool, created = make_pool(health_check_interval=0)
+
+        async with pool.connection() as conn:
+            conn.healthy = False
+        await asyncio.sleep(0.01)
+        async with pool.connection() as replacement:
+            pass
+
+        assert replacement is not conn
+        assert conn.closed
+
+    def test_pool_per_event_loop(self):
+        """Test each event loop gets its own pool."""
+        from open_notebook.database.pool import get_pool
+
+        async def connect():
+            return FakeConnection()
+
+        async def current_pool():
+            return get_pool(connect)
+
+        first = asyncio.run(current_pool())
+        second = asyncio.run(current_pool())
+
+        assert first is not second
+
+    def test_run_and_close_db_closes_loop_pool(self, monkeypatch):
+        """Test connections opened on a short-lived loop are closed with it."""
+        from open_notebook.database.pool import _pools
+
+        conn = FakeConnection()
+
+        async def connect():
+            return conn
+
+        monkeypatch.setattr(repository, "_open_connection", connect)
+
+        loops = []
+
+        async def query():
+            loops.append(asyncio.get_running_loop())
+            return await repository.repo_query("SELECT * FROM note")
+
+        assert asyncio.run(repository.run_and_close_db(query())) == []
+        assert conn.closed
+        assert loops[0] not in _pools
+
+
+# ============================================================================
+# TEST SUITE 2: Batched Queries
+# ============================================================================
+
+
+@pytest.fixture
+def fake_connection(monkeypatch):
+    conn = FakeConnection()
+
+    @asynccontextmanager
+    async def fake_db_connection():
+        yield conn
+
+    monkeypatch.setattr(repository, "db_connection", fake_db_connection)
+    return conn
+
+
+class TestRepoBatch:
+    """Test suite for multi-statement batches."""
+
+    @pytest.mark.asyncio
+    async def test_batch_single_round_trip(self, fake_connection):
+        """Test statements are joined and parameters namespaced per statement."""
+        fake_connection.raw_results = [
+            {"status": "OK", "result": [{"id": "source:1"}]},
+            {"status": "OK", "result": [{"id": "source:2"}]},
+        ]
+
+        results = await repo_batch(
+            [
+                ("SELECT * FROM $id;", {"id": "source:1"}),
+                ("SELECT * FROM $id WHERE $id != $other", {"id": "source:2"}),
+            ]
+        )
+
+        assert results == [[{"id": "source:1"}], [{"id": "source:2"}]]
+        assert len(fake_connection.queries) == 1
+        query_str, params = fake_connection.queries[0]
+        assert query_str == (
+            "SELECT * FROM $b0_id;\nSELECT * FROM $b1_id WHERE $b1_id != $other;"
+        )
+        assert params == {"b0_id": "source:1", "b1_id": "source:2"}
+
+    @pytest.mark.asyncio
+    async def test_batch_transaction(self, fake_connection):
+        """Test transactions wrap the statements and keep results aligned."""
+        fake_connection.raw_results = [
+            {"status": "OK", "result": None},
+            {"status": "OK", "result": {"id": "note:1"}},
+            {"status": "OK", "result": None},
+        ]
+
+        batch = QueryBatch(transaction=True)
+        index = batch.add("UPDATE $id MERGE $data", {"id": "note:1", "data": {}})
+        results = await batch.execute()
+
+        assert results[index] == [{"id": "note:1"}]
+        query_str, _ = fake_connection.queries[0]
+        assert query_str.startswith("BEGIN TRANSACTION;")
+        assert query_str.endswith("COMMIT TRANSACTION;")
+
+    @pytest.mark.asyncio
+    async def test_batch_statement_error(self, fake_connection):
+        """Test a failed statement raises RuntimeError."""
+        fake_connection.raw_results = [
+            {"status": "OK", "result": []},
+            {"status": "ERR", "result": "Parse error"},
+        ]
+
+        with pytest.raises(RuntimeError, match="Parse error"):
+            await repo_batch(["SELECT * FROM note", "SELEC oops"])
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self, fake_connection):
+        """Test an empty batch makes no request."""
+        assert await repo_batch([]) == []
+        assert fake_connection.queries == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -5,16 +5,30 @@ This test suite focuses on validation logic, business rules, and data structures
 that can be tested without database mocking.
 """
 
+import asyncio
+import hashlib
+from typing import ClassVar
+
 import pytest
 from pydantic import ValidationError
 
-from open_notebook.domain.base import RecordModel
+from open_notebook.domain.base import ObjectModel, RecordModel
 from open_notebook.domain.content_settings import ContentSettings
-from open_notebook.domain.models import ModelManager
+from open_notebook.domain.models import (
+    DefaultModels,
+    EmbeddingBatcher,
+    Model,
+    ModelManager,
+)
 from open_notebook.domain.notebook import Note, Notebook, Source
 from open_notebook.domain.podcast import EpisodeProfile, SpeakerProfile
 from open_notebook.domain.transformation import Transformation
-from open_notebook.exceptions import InvalidInputError
+from open_notebook.exceptions import (
+    ConfigurationError,
+    FieldNotLoadedError,
+    InvalidInputError,
+    NotFoundError,
+)
 
 # ============================================================================
 # TEST SUITE 1: RecordModel Singleton Pattern
@@ -304,5 +318,1412 @@ class TestEpisodeProfile:
         assert profile.num_segments == 5
 
 
+# ============================================================================
+# TEST SUITE 10: ObjectModel Bulk Loading
+# ============================================================================
+
+
+class TestObjectModelGetMany:
+    """Test suite for fetching several records in one query."""
+
+    @pytest.mark.asyncio
+    async def test_get_many_keeps_order_and_dispatches(self, monkeypatch):
+        """Test rows come back in input order as their own classes."""
+        from open_notebook.domain import base
+
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append((query_str, vars))
+            return [
+                {"id": "note:2", "title": "Second", "content": "b"},
+                {"id": "source:1", "title": "Source"},
+                {"id": "note:1", "title": "First", "content": "a"},
+            ]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        objects = await ObjectModel.get_many(["note:1", "source:1", "note:2"])
+
+        assert len(queries) == 1
+        assert [obj.id for obj in objects] == ["note:1", "source:1", "note:2"]
+        assert isinstance(objects[0], Note)
+        assert isinstance(objects[1], Source)
+
+    @pytest.mark.asyncio
+    async def test_get_many_missing_ids(self, monkeypatch):
+        """Test missing ids are skipped or reported."""
+        from open_notebook.domain import base
+
+        async def fake_repo_query(query_str, vars=None):
+            return [{"id": "note:1", "content": "a"}]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        notes = await Note.get_many(["1", "note:missing"])
+        assert [note.id for note in notes] == ["note:1"]
+
+        with pytest.raises(NotFoundError, match="note:missing"):
+            await Note.get_many(["note:1", "note:missing"], raise_on_missing=True)
+
+    @pytest.mark.asyncio
+    async def test_get_many_empty(self):
+        """Test an empty id list makes no query."""
+        assert await Note.get_many([]) == []
+
+
+# ============================================================================
+# TEST SUITE 11: Paginated Loading
+# ============================================================================
+
+
+class TestObjectModelIteration:
+    """Test suite for streaming and counting records."""
+
+    @pytest.mark.asyncio
+    async def test_iter_all_keyset_pages(self, monkeypatch):
+        """Test iter_all pages with an id cursor until a short page."""
+        from open_notebook.domain import base
+
+        rows = [
+            {"id": f"notebook:{key}", "name": key, "description": ""}
+            for key in ["a", "b", "c", "d", "e"]
+        ]
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append((query_str, dict(vars or {})))
+            cursor = vars.get("cursor")
+            remaining = [
+                row for row in rows if cursor is None or row["id"] > str(cursor)
+            ]
+            return remaining[: vars["limit"]]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        names = [nb.name async for nb in Notebook.iter_all(batch_size=2)]
+
+        assert names == ["a", "b", "c", "d", "e"]
+        assert len(queries) == 3
+        assert "id > $cursor" not in queries[0][0]
+        assert "id > $cursor" in queries[1][0]
+        assert all("ORDER BY id LIMIT $limit" in q for q, _ in queries)
+
+    @pytest.mark.asyncio
+    async def test_iter_all_order_by_uses_offsets(self, monkeypatch):
+        """Test a custom order pages with START/LIMIT and keeps the filter."""
+        from open_notebook.domain import base
+
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append((query_str, dict(vars or {})))
+            return []
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        result = [
+            nb
+            async for nb in Notebook.iter_all(
+                order_by="updated desc", where="archived != true"
+            )
+        ]
+
+        assert result == []
+        query_str, params = queries[0]
+        assert query_str == (
+            "SELECT * FROM notebook WHERE (archived != true)"
+            " ORDER BY updated desc LIMIT $limit START $start"
+        )
+        assert params["start"] == 0
+
+    @pytest.mark.asyncio
+    async def test_count(self, monkeypatch):
+        """Test count uses an aggregate query."""
+        from open_notebook.domain import base
+
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append(query_str)
+            return [{"total": 42}]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        assert await Notebook.count(where="archived != true") == 42
+        assert queries == [
+            "SELECT count() AS total FROM notebook WHERE archived != true GROUP ALL"
+        ]
+
+
+# ============================================================================
+# TEST SUITE 12: Projected Loads
+# ============================================================================
+
+
+class TestObjectModelProjection:
+    """Test suite for fields= / omit= projections and partial models."""
+
+    @pytest.mark.asyncio
+    async def test_get_with_fields_returns_partial(self, monkeypatch):
+        """Test a projected get selects only the fields and marks the model partial."""
+        from open_notebook.domain import base
+
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append(query_str)
+            return [{"id": "notebook:1", "name": "Research"}]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        notebook = await Notebook.get("notebook:1", fields=["name"])
+
+        assert queries == ["SELECT id, name FROM $id"]
+        assert notebook.name == "Research"
+        assert notebook.is_partial
+        assert "description" in notebook.missing_fields
+        # Fields left out are never written back
+        assert notebook._prepare_save_data() == {"id": "notebook:1", "name": "Research"}
+
+    @pytest.mark.asyncio
+    async def test_load_fields_fetches_missing(self, monkeypatch):
+        """Test missing fields are fetched on demand."""
+        from open_notebook.domain import base
+
+        queries = []
+
+        async def fake_repo_query(query_str, vars=None):
+            queries.append(query_str)
+            return [{"full_text": "The whole document"}]
+
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+
+        source = Source._from_row(
+            {"id": "source:1", "title": "Doc"},
+            Source._loaded_field_names(omit=["full_text"]),
+        )
+        assert source.is_partial
+        with pytest.raises(FieldNotLoadedError, match="fetch_field"):
+            source.full_text
+        assert not hasattr(source, "full_text")
+        assert "full_text" not in source.model_dump()
+
+        assert await source.fetch_field("full_text") == "The whole document"
+        assert queries == ["SELECT full_text FROM $id"]
+        assert not source.is_partial
+
+        # Already loaded fields are not fetched again
+        await source.load_fields("full_text")
+        assert len(queries) == 1
+
+    def test_projection_validation(self):
+        """Test invalid projections are rejected."""
+        with pytest.raises(InvalidInputError, match="either fields or omit"):
+            Source._projection(fields=["title"], omit=["full_text"])
+
+        with pytest.raises(InvalidInputError, match="Invalid field name"):
+            Source._projection(fields=["title; DELETE source"])
+
+        assert Source._projection(omit=["full_text"], alias="source") == (
+            "* OMIT source.full_text"
+        )
+
+
+# ============================================================================
+# TEST SUITE 13: Change Tracking
+# ============================================================================
+
+
+class TestObjectModelChangeTracking:
+    """Test suite for dirty-field tracking in save()."""
+
+    @pytest.fixture
+    def fake_repo(self, monkeypatch):
+        from open_notebook.domain import base
+
+        calls = []
+
+        async def fake_repo_update(table, id, data):
+            calls.append(("update", table, id, dict(data)))
+            return [{"id": id, **data}]
+
+        async def fake_repo_create(table, data):
+            calls.append(("create", table, None, dict(data)))
+            return [{"id": f"{table}:new", **data}]
+
+        monkeypatch.setattr(base, "repo_update", fake_repo_update)
+        monkeypatch.setattr(base, "repo_create", fake_repo_create)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_unchanged_object_skips_save(self, fake_repo):
+        """Test saving an unmodified loaded object makes no request."""
+        source = Source._from_row(
+            {"id": "source:1", "title": "Doc", "full_text": "x" * 1000}
+        )
+
+        await source.save()
+
+        assert fake_repo == []
+
+    @pytest.mark.asyncio
+    async def test_update_sends_only_changed_fields(self, fake_repo):
+        """Test only assigned fields are sent, then tracking resets."""
+        source = Source._from_row(
+            {"id": "source:1", "title": "Doc", "full_text": "x" * 1000}
+        )
+
+        source.title = "Renamed"
+        assert source.dirty_fields == {"title"}
+        await source.save()
+
+        assert len(fake_repo) == 1
+        _, _, _, data = fake_repo[0]
+        assert data["title"] == "Renamed"
+        assert "full_text" not in data
+        assert source.dirty_fields == set()
+
+        # A second save with no new changes is skipped
+        await source.save()
+        assert len(fake_repo) == 1
+
+    @pytest.mark.asyncio
+    async def test_in_place_mutation_needs_mark_dirty(self, fake_repo):
+        """Test mark_dirty flags fields mutated in place."""
+        source = Source._from_row({"id": "source:1", "topics": ["a"]})
+
+        source.topics.append("b")
+        source.mark_dirty("topics")
+        await source.save()
+
+        assert fake_repo[0][3]["topics"] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_objects_built_in_memory_save_in_full(self, fake_repo):
+        """Test objects not loaded from the database write every field."""
+        notebook = Notebook(id="notebook:1", name="Research", description="All")
+
+        await notebook.save()
+
+        _, _, _, data = fake_repo[0]
+        assert data["name"] == "Research"
+        assert data["description"] == "All"
+
+
+# ============================================================================
+# TEST SUITE 14: Embedding Freshness
+# ============================================================================
+
+
+class TestNoteEmbeddingFreshness:
+    """Test suite for skipping re-embedding when content is unchanged."""
+
+    @pytest.fixture
+    def embed_calls(self, monkeypatch):
+        from open_notebook.domain import base
+        from open_notebook.domain.models import model_manager
+
+        calls = []
+
+        class FakeEmbeddingModel:
+            async def aembed(self, texts):
+                calls.append(list(texts))
+                return [[0.1, 0.2] for _ in texts]
+
+        async def fake_get_embedding_model(**kwargs):
+            return FakeEmbeddingModel()
+
+        async def fake_repo_update(table, id, data):
+            return [{"id": id, **data}]
+
+        monkeypatch.setattr(
+            model_manager, "get_embedding_model", fake_get_embedding_model
+        )
+        monkeypatch.setattr(base, "repo_update", fake_repo_update)
+        return calls
+
+    @staticmethod
+    def stored_note(**fields):
+        """A note row whose embedding was computed from its content."""
+        content = fields.get("content", "Body")
+        return {
+            "id": "note:1",
+            "title": "Old",
+            "content": content,
+            "embedding": [0.3],
+            "embedding_hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            **fields,
+        }
+
+    @pytest.mark.asyncio
+    async def test_title_change_does_not_reembed(self, embed_calls):
+        """Test editing metadata keeps the stored embedding."""
+        note = Note._from_row(self.stored_note())
+        assert note.embedding_is_current()
+        assert not note.needs_embedding()
+
+        note.title = "New"
+        await note.save()
+
+        assert embed_calls == []
+
+    @pytest.mark.asyncio
+    async def test_content_change_reembeds_once(self, embed_calls):
+        """Test changed content is embedded, and only once."""
+        note = Note._from_row(self.stored_note())
+
+        note.content = "New body"
+        assert note.needs_embedding()
+        await note.save()
+        assert embed_calls == [["New body"]]
+
+        note.title = "Renamed"
+        await note.save()
+        assert len(embed_calls) == 1
+
+    def test_missing_embedding_needs_embedding(self):
+        """Test notes stored without an embedding are embedded on save."""
+        note = Note._from_row({"id": "note:1", "content": "Body", "embedding": []})
+        assert note.needs_embedding()
+
+    @pytest.mark.asyncio
+    async def test_stale_stored_embedding_recomputed(self, embed_calls, monkeypatch):
+        """Test content edited elsewhere, or never hashed, is embedded again."""
+        from open_notebook.domain import base
+
+        written = []
+
+        async def fake_repo_update(table, id, data):
+            written.append(data)
+            return [{"id": id, **data}]
+
+        monkeypatch.setattr(base, "repo_update", fake_repo_update)
+        # Content changed by a process that didn't update the embedding
+        edited = Note._from_row({**self.stored_note(), "content": "Edited"})
+        # Embedded before the hash was stored
+        unhashed = Note._from_row({"id": "note:2", "content": "Body", "embedding": [0]})
+
+        assert edited.needs_embedding()
+        assert unhashed.needs_embedding()
+
+        unhashed.title = "Renamed"
+        await unhashed.save()
+
+        assert embed_calls == [["Body"]]
+        assert written[0]["embedding_hash"] == self.stored_note()["embedding_hash"]
+        assert unhashed.embedding_is_current()
+
+
+# ============================================================================
+# TEST SUITE 15: Table Registry
+# ============================================================================
+
+
+class TestTableRegistry:
+    """Test suite for the table_name -> model class registry."""
+
+    def test_subclasses_register_their_table(self):
+        """Test domain classes are registered when defined."""
+        registry = ObjectModel.registered_models()
+
+        assert registry["note"] is Note
+        assert registry["source"] is Source
+        assert ObjectModel.model_for_table("notebook") is Notebook
+        assert ObjectModel.model_for_table("does_not_exist") is None
+
+    def test_inherited_table_name_not_reregistered(self):
+        """Test subclasses without their own table_name keep the parent entry."""
+
+        class SpecialNote(Note):
+            pass
+
+        assert ObjectModel.model_for_table("note") is Note
+
+    def test_duplicate_table_name_rejected(self):
+        """Test a second class can't claim an existing table."""
+        with pytest.raises(ConfigurationError, match="already registered"):
+
+            class OtherNote(ObjectModel):
+                table_name: ClassVar[str] = "note"
+
+        assert ObjectModel.model_for_table("note") is Note
+
+
+# ============================================================================
+# TEST SUITE 16: Bulk Save
+# ============================================================================
+
+
+class TestObjectModelSaveMany:
+    """Test suite for ObjectModel.save_many()."""
+
+    @pytest.fixture
+    def fake_repo(self, monkeypatch):
+        from open_notebook.domain import base
+        from open_notebook.domain.models import model_manager
+
+        calls = []
+
+        class FakeEmbeddingModel:
+            async def aembed(self, texts):
+                calls.append(("embed", list(texts)))
+                return [[float(len(text))] for text in texts]
+
+        async def fake_get_embedding_model(**kwargs):
+            return FakeEmbeddingModel()
+
+        async def fake_repo_insert(table, rows):
+            calls.append(("insert", table, [dict(row) for row in rows]))
+            return [{"id": f"{table}:{i}", **row} for i, row in enumerate(rows)]
+
+        async def fake_repo_update_many(updates):
+            calls.append(("update", [(id, dict(data)) for id, data in updates]))
+            return [[{"id": id, **data}] for id, data in updates]
+
+        monkeypatch.setattr(
+            model_manager, "get_embedding_model", fake_get_embedding_model
+        )
+        monkeypatch.setattr(base, "repo_insert", fake_repo_insert)
+        monkeypatch.setattr(base, "repo_update_many", fake_repo_update_many)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_creates_batched_and_ids_written_back(self, fake_repo):
+        """Test new objects are embedded in chunks and inserted together."""
+        notes = [Note(title=f"N{i}", content=f"Body {i}") for i in range(3)]
+
+        await ObjectModel.save_many(notes, embedding_batch_size=2)
+
+        assert fake_repo[0] == ("embed", ["Body 0", "Body 1"])
+        assert fake_repo[1] == ("embed", ["Body 2"])
+        kind, table, rows = fake_repo[2]
+        assert (kind, table, len(rows)) == ("insert", "note", 3)
+        assert len(fake_repo) == 3
+        assert [note.id for note in notes] == ["note:0", "note:1", "note:2"]
+        assert all(note.embedding_is_current() for note in notes)
+
+    @pytest.mark.asyncio
+    async def test_updates_run_in_one_call_and_unchanged_skipped(self, fake_repo):
+        """Test changed objects share one update call; unchanged ones are skipped."""
+        changed = Source._from_row({"id": "source:1", "title": "Old"})
+        unchanged = Source._from_row({"id": "source:2", "title": "Same"})
+        changed.title = "New"
+        notebook = Notebook(name="Research", description="All")
+
+        await ObjectModel.save_many([changed, unchanged, notebook])
+
+        kinds = [call[0] for call in fake_repo]
+        assert kinds == ["insert", "update"]
+        updates = fake_repo[1][1]
+        assert len(updates) == 1
+        assert updates[0][0] == "source:1"
+        assert updates[0][1]["title"] == "New"
+        assert changed.dirty_fields == set()
+        assert notebook.id == "notebook:0"
+
+    @pytest.mark.asyncio
+    async def test_saved_models_invalidate_manager(self, fake_repo, monkeypatch):
+        """Test bulk-saved Model rows drop their provisioned instances."""
+        from open_notebook.domain.models import model_manager
+
+        invalidated = []
+        monkeypatch.setattr(model_manager, "invalidate", invalidated.append)
+        existing = Model._from_row(
+            {"id": "model:9", "name": "old", "provider": "openai", "type": "language"}
+        )
+        existing.name = "new"
+        created = Model(name="embed", provider="openai", type="embedding")
+
+        await ObjectModel.save_many([existing, created])
+
+        assert sorted(invalidated) == ["model:0", "model:9"]
+
+
+# ============================================================================
+# TEST SUITE 17: Default Models Cache
+# ============================================================================
+
+
+class TestDefaultModelsCache:
+    """Test suite for the process-wide DefaultModels cache."""
+
+    @pytest.fixture
+    def fake_db(self, monkeypatch):
+        from open_notebook.domain import base, models
+
+        record = {"default_chat_model": "model:chat"}
+        reads = []
+
+        async def fake_repo_query(query_str, vars=None):
+            reads.append(query_str)
+            return [dict(record)]
+
+        async def fake_repo_upsert(table, id, data, add_timestamp=False):
+            record.update(data)
+            return [dict(record)]
+
+        monkeypatch.setattr(models, "repo_query", fake_repo_query)
+        monkeypatch.setattr(base, "repo_query", fake_repo_query)
+        monkeypatch.setattr(base, "repo_upsert", fake_repo_upsert)
+        monkeypatch.setattr(DefaultModels, "_cache_ttl", 60.0)
+        DefaultModels.invalidate_cache()
+        yield reads
+        DefaultModels.invalidate_cache()
+        DefaultModels.clear_instance()
+
+    @pytest.mark.asyncio
+    async def test_repeated_reads_hit_cache(self, fake_db):
+        """Test only the first read queries the database."""
+        first = await DefaultModels.get_instance()
+        second = await DefaultModels.get_instance()
+
+        assert first.default_chat_model == second.default_chat_model == "model:chat"
+        assert first is not second
+        assert len(fake_db) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_cache_is_refreshed(self, fake_db, monkeypatch):
+        """Test reads go to the database once the TTL has passed."""
+        await DefaultModels.get_instance()
+        monkeypatch.setattr(DefaultModels, "_cached_at", 0.0)
+        monkeypatch.setattr(DefaultModels, "_cache_ttl", 1e-9)
+
+        await DefaultModels.get_instance()
+
+        assert len(fake_db) == 2
+
+    @pytest.mark.asyncio
+    async def test_patch_invalidates_cache(self, fake_db):
+        """Test saving new defaults is visible on the next read."""
+        defaults = await DefaultModels.get_instance()
+
+        await defaults.patch({"default_chat_model": "model:other"})
+        fresh = await DefaultModels.get_instance()
+
+        assert fresh.default_chat_model == "model:other"
+
+
+# ============================================================================
+# TEST SUITE 18: Provisioned Model Cache
+# ============================================================================
+
+
+class TestModelManagerCache:
+    """Test suite for caching provisioned models in ModelManager."""
+
+    @pytest.fixture
+    def manager(self, monkeypatch):
+        manager = ModelManager()
+        created = []
+
+        async def fake_create_model(model_id, **kwargs):
+            created.append((model_id, kwargs))
+            return object()
+
+        monkeypatch.setattr(manager, "_create_model", fake_create_model)
+        return manager, created
+
+    @pytest.mark.asyncio
+    async def test_same_id_and_config_reused(self, manager):
+        """Test instances are cached per (model_id, kwargs)."""
+        manager, created = manager
+
+        first = await manager.get_model("model:1", temperature=0.5)
+        second = await manager.get_model("model:1", temperature=0.5)
+        other = await manager.get_model("model:1", temperature=0.9)
+
+        assert first is second
+        assert other is not first
+        assert len(created) == 2
+
+    @pytest.mark.asyncio
+    async def test_unhashable_kwargs_supported(self, manager):
+        """Test dict and list kwargs still form a cache key."""
+        manager, created = manager
+
+        await manager.get_model("model:1", stop=["a"], extra={"b": [1]})
+        await manager.get_model("model:1", extra={"b": [1]}, stop=["a"])
+
+        assert len(created) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_model(self, manager):
+        """Test invalidation rebuilds only the affected model."""
+        manager, created = manager
+        await manager.get_model("model:1")
+        await manager.get_model("model:2")
+
+        manager.invalidate("model:1")
+        await manager.get_model("model:1")
+        await manager.get_model("model:2")
+
+        assert [model_id for model_id, _ in created] == [
+            "model:1",
+            "model:2",
+            "model:1",
+        ]
+
+    def test_rows_shared_across_event_loops(self, monkeypatch):
+        """Test a fresh loop rebuilds the client but not the Model lookup."""
+        from open_notebook.domain import models
+
+        reads = []
+
+        async def fake_get(cls, model_id):
+            reads.append(model_id)
+            return Model(id=model_id, name="gpt", provider="openai", type="language")
+
+        class FakeClient:
+            def __init__(self):
+                # Like an HTTP client bound to the loop that created it
+                self.loop = asyncio.get_running_loop()
+
+        class FakeFactory:
+            @staticmethod
+            def create_language(model_name, provider, config):
+                return FakeClient()
+
+        monkeypatch.setattr(Model, "get", classmethod(fake_get))
+        monkeypatch.setattr(models, "AIFactory", FakeFactory)
+        manager = ModelManager()
+
+        first = asyncio.run(manager.get_model("model:1"))
+        second = asyncio.run(manager.get_model("model:1"))
+
+        assert first is not second
+        assert reads == ["model:1"]
+        # The first loop is closed, so its clients were dropped
+        assert list(manager._caches) == [second.loop]
+
+        manager.invalidate("model:1")
+        asyncio.run(manager.get_model("model:1"))
+
+        assert reads == ["model:1", "model:1"]
+
+
+    def test_cached_models_expire(self, monkeypatch):
+        """Test a model edited by another process is picked up after the TTL."""
+        from open_notebook.domain import models
+        from open_notebook.utils import cache
+
+        names = ["gpt-4o"]
+        clock = {"now": 1000.0}
+
+        async def fake_get(cls, model_id):
+            return Model(
+                id=model_id, name=names[-1], provider="openai", type="language"
+            )
+
+        class FakeFactory:
+            @staticmethod
+            def create_language(model_name, provider, config):
+                return model_name
+
+        monkeypatch.setattr(Model, "get", classmethod(fake_get))
+        monkeypatch.setattr(models, "AIFactory", FakeFactory)
+        monkeypatch.setattr(
+            cache, "time", type("Clock", (), {"monotonic": lambda: clock["now"]})
+        )
+        manager = ModelManager(cache_ttl=60)
+
+        async def run():
+            first = await manager.get_model("model:1")
+            names.append("gpt-4.1")
+            clock["now"] += 30
+            cached = await manager.get_model("model:1")
+            clock["now"] += 31
+            return first, cached, await manager.get_model("model:1")
+
+        assert asyncio.run(run()) == ("gpt-4o", "gpt-4o", "gpt-4.1")
+
+
+# ============================================================================
+# TEST SUITE 19: Embedding Batcher
+# ============================================================================
+
+
+class TestEmbeddingBatcher:
+    """Test suite for coalescing concurrent embedding requests."""
+
+    class FakeEmbeddingModel:
+        def __init__(self, fail=False):
+            self.calls = []
+            self.fail = fail
+
+        async def aembed(self, texts):
+            self.calls.append(list(texts))
+            if self.fail:
+                raise ConnectionError("rate limited")
+            return [[float(len(text))] for text in texts]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self):
+        """Test parallel callers are embedded together and get their own vector."""
+        model = self.FakeEmbeddingModel()
+        batcher = EmbeddingBatcher(model, max_wait=0.01)
+
+        vectors = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("bb"), batcher.embed("a")
+        )
+
+        assert vectors == [[1.0], [2.0], [1.0]]
+        assert model.calls == [["a", "bb"]]
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_immediately(self):
+        """Test batches are capped at max_batch_size."""
+        model = self.FakeEmbeddingModel()
+        batcher = EmbeddingBatcher(model, max_batch_size=2, max_wait=10)
+
+        vectors = await batcher.embed_many(["a", "bb", "ccc", "dddd"])
+
+        assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+        assert model.calls == [["a", "bb"], ["ccc", "dddd"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test a failed request raises in each waiting caller."""
+        batcher = EmbeddingBatcher(self.FakeEmbeddingModel(fail=True), max_wait=0)
+
+        results = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+
+    @pytest.mark.asyncio
+    async def test_cached_texts_are_not_sent(self, tmp_path):
+        """Test texts embedded before are served from the cache."""
+        from open_notebook.utils.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+        model = self.FakeEmbeddingModel()
+        batcher = EmbeddingBatcher(model, max_wait=0, cache=cache)
+
+        assert await batcher.embed("a") == [1.0]
+        vectors = await batcher.embed_many(["a", "bb", "bb"])
+
+        assert vectors == [[1.0], [2.0], [2.0]]
+        assert model.calls == [["a"], ["bb"]]
+
+    def test_cache_key_includes_config(self):
+        """Test models differing only in dimensions don't share cached vectors."""
+        from esperanto import AIFactory
+
+        from open_notebook.domain.models import _embedding_model_key
+
+        def make(**config):
+            return AIFactory.create_embedding(
+                provider="openai",
+                model_name="text-embedding-3-small",
+                config={"api_key": "test", **config},
+            )
+
+        plain = _embedding_model_key(make())
+        small = _embedding_model_key(make(dimensions=256))
+
+        assert plain.startswith("openai/text-embedding-3-small")
+        assert small != plain
+        assert _embedding_model_key(make(dimensions=256)) == small
+        assert "test" not in small
+
+
+# ============================================================================
+# TEST SUITE 20: Local Vector Search
+# ============================================================================
+
+
+class TestLocalVectorSearch:
+    """Test suite for answering vector_search from the local index."""
+
+    @pytest.fixture
+    def records(self, monkeypatch):
+        from open_notebook.domain import search_index
+
+        records = {
+            "source_embedding:c1": {"title": "Paper", "content": "chunk one"},
+            "source_embedding:c2": {"title": "Paper", "content": "chunk two"},
+            "note:n1": {"title": "Idea", "content": "my note"},
+        }
+        batches = []
+
+        async def fake_repo_batch(statements, transaction=False):
+            batches.append(statements)
+            return [
+                [
+                    {"id": record_id, **records[str(record_id)]}
+                    for record_id in vars["ids"]
+                    if str(record_id) in records
+                ]
+                for _, vars in statements
+            ]
+
+        monkeypatch.setattr(search_index, "repo_batch", fake_repo_batch)
+        return records, batches
+
+    @pytest.fixture
+    def index(self, records):
+        pytest.importorskip("numpy")
+        from open_notebook.domain.search_index import _add_row
+        from open_notebook.utils.vector_index import VectorIndex
+
+        index = VectorIndex()
+        rows = [
+            ("source_embedding:c1", "source:s1", [1.0, 0.0]),
+            ("source_embedding:c2", "source:s1", [0.9, 0.1]),
+        ]
+        for record_id, parent_id, embedding in rows:
+            _add_row(
+                index,
+                "source_embedding",
+                {"id": record_id, "parent_id": parent_id, "embedding": embedding},
+            )
+        _add_row(index, "note", {"id": "note:n1", "embedding": [0.0, 1.0]})
+        return index
+
+    @pytest.mark.asyncio
+    async def test_results_grouped_like_database_function(self, index, records):
+        """Test chunks of one source are grouped under the source id."""
+        from open_notebook.domain.search_index import search_local_index
+
+        results = await search_local_index(index, [1.0, 0.0], 10, minimum_score=0.5)
+
+        assert results == [
+            {
+                "id": "source:s1",
+                "parent_id": "source:s1",
+                "title": "Paper",
+                "similarity": pytest.approx(1.0),
+                "matches": ["chunk one", "chunk two"],
+            }
+        ]
+        # Content of every hit is read in one round trip
+        assert len(records[1]) == 1
+
+    @pytest.mark.asyncio
+    async def test_note_filter(self, index):
+        """Test source and note results can be switched off."""
+        from open_notebook.domain.search_index import search_local_index
+
+        results = await search_local_index(
+            index, [1.0, 1.0], 10, source=False, minimum_score=0
+        )
+
+        assert [r["id"] for r in results] == ["note:n1"]
+
+    @pytest.mark.asyncio
+    async def test_deleted_records_skipped(self, index, records):
+        """Test hits whose record is gone from the database are left out."""
+        from open_notebook.domain.search_index import search_local_index
+
+        del records[0]["source_embedding:c2"]
+
+        results = await search_local_index(index, [1.0, 0.0], 10, minimum_score=0.5)
+
+        assert results[0]["matches"] == ["chunk one"]
+
+    def test_saved_index_holds_no_content(self, index, tmp_path):
+        """Test only ids reach the persisted manifest."""
+        index.save(str(tmp_path))
+
+        manifest = (tmp_path / "index.json").read_text()
+
+        assert "source_embedding:c1" in manifest
+        assert "chunk one" not in manifest and "Paper" not in manifest
+
+    @pytest.mark.asyncio
+    async def test_chunks_written_by_worker_found_next_search(
+        self, index, records, monkeypatch
+    ):
+        """Test a queued source's chunks are searchable before the index expires."""
+        import time
+
+        from open_notebook.domain import search_index
+
+        content_batch = search_index.repo_batch
+        job = {"status": "running"}
+        # Written by the worker process, not through this process's saves
+        records[0]["source_embedding:w1"] = {"title": "New", "content": "fresh"}
+        worker_row = {
+            "id": "source_embedding:w1",
+            "parent_id": "source:s2",
+            "embedding": [0.0, -1.0],
+        }
+
+        async def fake_repo_batch(statements, transaction=False):
+            if "status" not in statements[0][0]:
+                return await content_batch(statements, transaction)
+            return [[{"id": "command:job", "status": job["status"]}], [worker_row]]
+
+        monkeypatch.setenv("LOCAL_VECTOR_INDEX", "true")
+        monkeypatch.setattr(search_index, "repo_batch", fake_repo_batch)
+        monkeypatch.setattr(search_index, "_index", index)
+        monkeypatch.setattr(search_index, "_stale_sources", {})
+        index.built_at = time.time()
+
+        search_index.mark_source_stale("source:s2", "command:job")
+        current = await search_index.get_local_index()
+        results = await search_index.search_local_index(
+            current, [0.0, -1.0], 10, minimum_score=0.5
+        )
+
+        assert [(r["id"], r["matches"]) for r in results] == [
+            ("source:s2", ["fresh"])
+        ]
+        # Re-read on every search until the job is done
+        assert "source:s2" in search_index._stale_sources
+        job["status"] = "completed"
+        await search_index.get_local_index()
+        assert search_index._stale_sources == {}
+
+    @pytest.mark.asyncio
+    async def test_expired_index_rebuilt_in_background(
+        self, index, monkeypatch, tmp_path
+    ):
+        """Test searches keep the old index while a rebuild runs."""
+        from open_notebook.domain import search_index
+        from open_notebook.utils.vector_index import VectorIndex
+
+        release = asyncio.Event()
+
+        async def slow_build():
+            await release.wait()
+            return VectorIndex()
+
+        monkeypatch.setenv("LOCAL_VECTOR_INDEX", "true")
+        monkeypatch.setattr(search_index, "_index_dir", lambda: str(tmp_path))
+        monkeypatch.setattr(search_index, "build_local_index", slow_build)
+        monkeypatch.setattr(search_index, "_index", index)
+        index.built_at = 0.0
+
+        assert await search_index.get_local_index() is index
+        await asyncio.sleep(0)
+        # A change made during the rebuild is carried over to the new index
+        search_index.index_record("note", {"id": "note:n2", "embedding": [1.0, 1.0]})
+        release.set()
+        await search_index._rebuild_task
+
+        rebuilt = await search_index.get_local_index()
+        assert rebuilt is not index
+        assert "note:n2" in rebuilt
+        assert (tmp_path / "index.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_vector_search_uses_local_index(self, index, monkeypatch):
+        """Test vector_search skips the database when the index is enabled."""
+        from open_notebook.domain import notebook
+        from open_notebook.domain.models import model_manager
+
+        class FakeBatcher:
+            async def embed(self, text):
+                return [0.0, 1.0]
+
+        async def fake_get_embedding_batcher(**kwargs):
+            return FakeBatcher()
+
+        async def fake_get_local_index():
+            return index
+
+        async def fail_repo_query(*args, **kwargs):
+            raise AssertionError("database should not be queried")
+
+        monkeypatch.setenv("LOCAL_VECTOR_INDEX", "true")
+        monkeypatch.setattr(
+            model_manager, "get_embedding_batcher", fake_get_embedding_batcher
+        )
+        monkeypatch.setattr(notebook, "get_local_index", fake_get_local_index)
+        monkeypatch.setattr(notebook, "repo_query", fail_repo_query)
+
+        results = await notebook.vector_search("idea", 5, minimum_score=0.9)
+
+        assert [r["title"] for r in results] == ["Idea"]
+
+
+# ============================================================================
+# TEST SUITE 21: Hybrid Search
+# ============================================================================
+
+
+class TestHybridSearch:
+    """Test suite for rank fusion of text and vector search."""
+
+    @pytest.fixture
+    def searches(self, monkeypatch):
+        from open_notebook.domain import notebook
+
+        calls = {}
+
+        def hit(id, parent_id, title, matches, **scores):
+            return {
+                "id": id,
+                "parent_id": parent_id,
+                "title": title,
+                "matches": matches,
+                **scores,
+            }
+
+        async def fake_text_search(keyword, results, source=True, note=True):
+            calls["text"] = (keyword, results, source, note)
+            if calls.get("text_error"):
+                raise RuntimeError("text search unavailable")
+            return [
+                hit("source:a", "source:a", "A", ["exact term"], relevance=3.0),
+                hit("note:b", "note:b", "B", ["term"], relevance=1.0),
+            ]
+
+        async def fake_vector_search(
+            keyword, results, source=True, note=True, minimum_score=0.2, embedding=None
+        ):
+            calls["vector"] = (keyword, results, source, note, minimum_score)
+            calls["embedding"] = embedding
+            return [
+                hit("note:b", "note:b", "B", ["term", "related"], similarity=0.9),
+                hit(
+                    "source_insight:c",
+                    "source:a",
+                    "Summary - A",
+                    ["about it"],
+                    similarity=0.5,
+                ),
+            ]
+
+        monkeypatch.setattr(notebook, "text_search", fake_text_search)
+        monkeypatch.setattr(notebook, "vector_search", fake_vector_search)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_results_fused_and_deduplicated(self, searches):
+        """Test items found by both searches merge by parent and rank first."""
+        from open_notebook.domain.notebook import hybrid_search
+
+        results = await hybrid_search("term", 5, note=False, minimum_score=0.4)
+
+        assert searches["text"] == ("term", 5, True, False)
+        assert searches["vector"] == ("term", 5, True, False, 0.4)
+        assert [r["parent_id"] for r in results] == ["source:a", "note:b"]
+        assert results[0]["matches"] == ["exact term", "about it"]
+        assert results[0]["relevance"] == 3.0
+        assert results[0]["similarity"] == 0.5
+        assert results[1]["matches"] == ["term", "related"]
+
+    @pytest.mark.asyncio
+    async def test_failed_search_falls_back(self, searches):
+        """Test a failing search still returns the other's results."""
+        from open_notebook.domain.notebook import hybrid_search
+
+        searches["text_error"] = True
+        results = await hybrid_search("term", 1)
+
+        assert [r["id"] for r in results] == ["note:b"]
+
+
+# ============================================================================
+# TEST SUITE 22: Search Result Cache
+# ============================================================================
+
+
+class TestSearchResultCache:
+    """Test suite for caching search results by corpus version."""
+
+    @pytest.fixture
+    def search_db(self, monkeypatch):
+        from open_notebook.database.repository import ensure_record_id
+        from open_notebook.domain import base, notebook, search_cache
+        from open_notebook.domain.models import model_manager
+        from open_notebook.domain.search_cache import clear_search_cache
+
+        calls = {"embed": 0, "query": 0}
+
+        class FakeBatcher:
+            async def embed(self, text):
+                calls["embed"] += 1
+                return [0.1, 0.2]
+
+        async def fake_get_embedding_batcher(**kwargs):
+            return FakeBatcher()
+
+        async def fake_repo_query(query_str, vars=None):
+            calls["query"] += 1
+            return [{"id": "note:1", "title": f"v{calls['query']}"}]
+
+        async def fake_repo_update(table, id, data):
+            return [{"id": id, **data}]
+
+        # The corpus version record and the status of each job it lists
+        shared = {"version": 0, "jobs": {}}
+        corpus_queries = []
+
+        async def fake_corpus_query(query_str, vars=None):
+            corpus_queries.append(query_str)
+            jobs = list(shared["jobs"])
+            if query_str.startswith("SELECT"):
+                statuses = [shared["jobs"][job] for job in jobs]
+                return [
+                    {"version": shared["version"], "jobs": jobs, "statuses": statuses}
+                ]
+            shared["version"] += 1
+            if "$job" in query_str:
+                shared["jobs"][str(vars["job"])] = "new"
+            if "$done" in query_str:
+                for job in jobs:
+                    if ensure_record_id(job) in vars["done"]:
+                        del shared["jobs"][job]
+            return []
+
+        monkeypatch.setenv("SEARCH_CACHE_ENABLED", "true")
+        monkeypatch.setattr(
+            model_manager, "get_embedding_batcher", fake_get_embedding_batcher
+        )
+        monkeypatch.setattr(notebook, "repo_query", fake_repo_query)
+        monkeypatch.setattr(base, "repo_update", fake_repo_update)
+        monkeypatch.setattr(search_cache, "repo_query", fake_corpus_query)
+        calls["shared"] = shared
+        calls["corpus_queries"] = corpus_queries
+        clear_search_cache()
+        yield calls
+        clear_search_cache()
+
+    @pytest.mark.asyncio
+    async def test_repeated_search_served_from_cache(self, search_db):
+        """Test a repeated term skips embedding and the database."""
+        from open_notebook.domain.notebook import text_search, vector_search
+
+        first = await vector_search("Quantum  Computing", 10)
+        second = await vector_search("quantum computing", 10)
+        await vector_search("quantum computing", 5)
+        await text_search("quantum computing", 10)
+
+        assert first == second
+        assert (search_db["embed"], search_db["query"]) == (2, 3)
+
+    @pytest.mark.asyncio
+    async def test_note_write_invalidates_results(self, search_db):
+        """Test saving a note retires cached results."""
+        from open_notebook.domain.notebook import vector_search
+
+        before = await vector_search("term", 10)
+        note = Note._from_row({"id": "note:1", "title": "Old", "content": "x"})
+        note.title = "New"
+        await note.save()
+        after = await vector_search("term", 10)
+
+        assert before[0]["title"] == "v1"
+        assert after[0]["title"] == "v2"
+
+    @pytest.mark.asyncio
+    async def test_write_in_another_process_invalidates_results(self, search_db):
+        """Test a version bumped through the database retires cached results."""
+        from open_notebook.domain.notebook import vector_search
+
+        await vector_search("term", 10)
+        # Neither this process's cache nor its code saw the write
+        search_db["shared"]["version"] += 1
+        after = await vector_search("term", 10)
+
+        assert after[0]["title"] == "v2"
+
+    @pytest.mark.asyncio
+    async def test_nothing_cached_while_jobs_pending(self, search_db):
+        """Test results aren't cached while the worker may write embeddings."""
+        from open_notebook.domain.notebook import vector_search
+
+        from open_notebook.domain.search_cache import bump_corpus_version
+
+        await bump_corpus_version(job="command:1")
+        job = next(iter(search_db["shared"]["jobs"]))
+        await vector_search("term", 10)
+        search_db["shared"]["jobs"][job] = "running"
+        await vector_search("term", 10)
+        # The first search to see the job done bumps the version for it
+        search_db["shared"]["jobs"][job] = "completed"
+        await vector_search("term", 10)
+        version = search_db["shared"]["version"]
+        await vector_search("term", 10)
+        after = await vector_search("term", 10)
+
+        assert search_db["shared"] == {"version": version, "jobs": {}}
+        assert version == 2
+        assert after[0]["title"] == "v4"
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_does_not_scan_command_table(self, search_db):
+        """Test the version read only touches the corpus record."""
+        from open_notebook.domain.notebook import vector_search
+
+        await vector_search("term", 10)
+        await vector_search("term", 10)
+
+        assert search_db["query"] == 1
+        assert all("FROM command" not in q for q in search_db["corpus_queries"])
+
+
+# ============================================================================
+# TEST SUITE 23: Inline Vectorization
+# ============================================================================
+
+
+class TestInlineVectorization:
+    """Test suite for embedding source chunks in-process."""
+
+    class FlakyEmbeddingModel:
+        def __init__(self, failures=0):
+            self.failures = failures
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+        async def aembed(self, texts):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                if self.failures:
+                    self.failures -= 1
+                    raise ConnectionError("rate limited")
+                return [[float(len(text))] for text in texts]
+            finally:
+                self.in_flight -= 1
+
+    @pytest.fixture
+    def pipeline(self, monkeypatch):
+        from open_notebook.database import repository
+        from open_notebook.domain import vectorization
+        from open_notebook.domain.models import model_manager
+
+        state = {
+            "model": self.FlakyEmbeddingModel(),
+            "stored": [],
+            "writes": [],
+            "batches": [],
+        }
+
+        async def fake_get_embedding_batcher(**kwargs):
+            return EmbeddingBatcher(state["model"], max_wait=0)
+
+        async def fake_repo_query(query_str, vars=None):
+            if query_str.strip().startswith("SELECT"):
+                return state["stored"]
+            state["writes"].append((query_str, vars))
+            return []
+
+        async def fake_repo_batch(statements, transaction=False):
+            state["batches"].append((statements, transaction))
+            return [
+                [
+                    {"id": f"source_embedding:{row['order']}", **row}
+                    for row in vars["rows"]
+                ]
+                if query_str.startswith("INSERT")
+                else []
+                for query_str, vars in statements
+            ]
+
+        monkeypatch.setattr(
+            model_manager, "get_embedding_batcher", fake_get_embedding_batcher
+        )
+        monkeypatch.setattr(vectorization, "split_text", lambda text: text.split("|"))
+        monkeypatch.setattr(
+            vectorization, "token_count_batch", lambda texts: [len(t) for t in texts]
+        )
+        monkeypatch.setattr(vectorization, "repo_query", fake_repo_query)
+        monkeypatch.setattr(repository, "repo_batch", fake_repo_batch)
+        return state
+
+    @staticmethod
+    def statements(pipeline, keyword):
+        [(statements, transaction)] = pipeline["batches"]
+        assert transaction
+        return [vars for query_str, vars in statements if keyword in query_str]
+
+    @pytest.mark.asyncio
+    async def test_chunks_embedded_with_bounded_concurrency(self, pipeline):
+        """Test every chunk is stored in order, with requests capped."""
+        from open_notebook.domain.vectorization import vectorize_source_inline
+
+        pipeline["model"] = self.FlakyEmbeddingModel(failures=1)
+        source = Source(id="source:s1", title="Doc", full_text="a|bb|ccc|dddd|eeeee")
+
+        stats = await vectorize_source_inline(
+            source, batch_size=2, concurrency=2, backoff=0
+        )
+
+        assert pipeline["model"].max_in_flight <= 2
+        assert pipeline["writes"] == []
+        [insert] = self.statements(pipeline, "INSERT INTO source_embedding")
+        rows = insert["rows"]
+        assert [row["order"] for row in rows] == [0, 1, 2, 3, 4]
+        assert [row["embedding"] for row in rows] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert (stats.chunks, stats.tokens, stats.retries) == (5, 15, 1)
+        assert stats.tokens_per_second > 0
+
+    @pytest.mark.asyncio
+    async def test_failed_embedding_keeps_existing_chunks(self, pipeline):
+        """Test old chunks are not deleted when embedding gives up."""
+        from open_notebook.domain.vectorization import vectorize_source_inline
+
+        pipeline["model"] = self.FlakyEmbeddingModel(failures=10)
+        source = Source(id="source:s1", title="Doc", full_text="a|bb")
+
+        with pytest.raises(ConnectionError):
+            await vectorize_source_inline(source, max_retries=1, backoff=0)
+
+        assert pipeline["writes"] == []
+        assert pipeline["batches"] == []
+
+    @pytest.mark.asyncio
+    async def test_only_changed_chunks_reembedded(self, pipeline):
+        """Test an edit embeds new chunks, deletes old ones and keeps the rest."""
+        from open_notebook.domain.vectorization import (
+            text_hash,
+            vectorize_source_inline,
+        )
+
+        pipeline["stored"] = [
+            {"id": f"source_embedding:c{i}", "order": i, "content_hash": text_hash(t)}
+            for i, t in enumerate(["intro", "old", "outro"])
+        ]
+        model = pipeline["model"]
+        source = Source(id="source:s1", title="Doc", full_text="new|intro|outro")
+
+        stats = await vectorize_source_inline(source)
+
+        [insert] = self.statements(pipeline, "INSERT")
+        assert [(row["order"], row["content"]) for row in insert["rows"]] == [
+            (0, "new")
+        ]
+        [delete_vars] = self.statements(pipeline, "DELETE")
+        [move_vars] = self.statements(pipeline, "UPDATE")
+        assert pipeline["writes"] == []
+        assert [str(i) for i in delete_vars["ids"]] == ["source_embedding:c1"]
+        assert [m["order"] for m in move_vars["moves"]] == [1]
+        assert (stats.embedded, stats.kept, stats.removed) == (1, 2, 1)
+        assert model.max_in_flight == 1
+
+    def test_diff_skips_rows_from_other_models(self):
+        """Test vectors from another embedding model are replaced."""
+        from open_notebook.domain.vectorization import diff_chunks
+
+        stored = [
+            {"id": "e:1", "order": 0, "content_hash": "a", "embedding_model": "x/1"},
+            {"id": "e:2", "order": 1, "content_hash": "b", "embedding_model": "y/2"},
+            {"id": "e:3", "order": 2, "content_hash": "a"},
+        ]
+
+        diff = diff_chunks(stored, ["a", "a", "b"], model_key="x/1")
+
+        assert [row["id"] for row in diff.kept.values()] == ["e:1", "e:3"]
+        assert diff.added == [2]
+        assert [row["id"] for row in diff.removed] == ["e:2"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_mode_rejected(self):
+        """Test vectorize only accepts the queued and inline modes."""
+        source = Source(id="source:s1", title="Doc", full_text="text")
+
+        with pytest.raises(InvalidInputError):
+            await source.vectorize(mode="later")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -154,5 +154,70 @@ class TestTransformationGraph:
         assert hasattr(transformation_graph, "ainvoke")
 
 
+# ============================================================================
+# TEST SUITE 4: Ask Graph Fan-out
+# ============================================================================
+
+
+class TestAskGraphFanOut:
+    """Test suite for embedding search terms before the ask fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_terms_embedded_together(self, monkeypatch):
+        """Test every branch gets its term's vector from one batched call."""
+        from open_notebook.domain.models import model_manager
+        from open_notebook.graphs.ask import Search, Strategy, trigger_queries
+
+        calls = []
+
+        class FakeBatcher:
+            async def embed_many(self, texts):
+                calls.append(list(texts))
+                return [[float(len(text))] for text in texts]
+
+        async def fake_get_embedding_batcher(**kwargs):
+            return FakeBatcher()
+
+        monkeypatch.setattr(
+            model_manager, "get_embedding_batcher", fake_get_embedding_batcher
+        )
+        strategy = Strategy(
+            reasoning="",
+            searches=[
+                Search(term="a", instructions="x"),
+                Search(term="bbb", instructions="y"),
+            ],
+        )
+
+        sends = await trigger_queries({"question": "q", "strategy": strategy}, {})
+
+        assert calls == [["a", "bbb"]]
+        assert [send.arg["embedding"] for send in sends] == [[1.0], [3.0]]
+
+    @pytest.mark.asyncio
+    async def test_vector_search_uses_given_embedding(self, monkeypatch):
+        """Test a precomputed embedding skips the embedding model."""
+        from open_notebook.domain import notebook
+        from open_notebook.domain.models import model_manager
+
+        captured = {}
+
+        async def fail_get_embedding_batcher(**kwargs):
+            raise AssertionError("embedding model should not be used")
+
+        async def fake_repo_query(query_str, vars=None):
+            captured.update(vars)
+            return []
+
+        monkeypatch.setattr(
+            model_manager, "get_embedding_batcher", fail_get_embedding_batcher
+        )
+        monkeypatch.setattr(notebook, "repo_query", fake_repo_query)
+
+        await notebook.vector_search("term", 5, embedding=[0.5, 0.5])
+
+        assert captured["embed"] == [0.5, 0.5]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
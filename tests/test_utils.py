@@ -5,6 +5,8 @@ This test suite focuses on testing utility functions that perform actual logic
 without heavy mocking - string processing, validation, and algorithms.
 """
 
+import asyncio
+
 import pytest
 
 from open_notebook.utils import (
@@ -17,7 +19,9 @@ from open_notebook.utils import (
     split_text,
     token_count,
 )
+from open_notebook.utils.cache import LRUCache
 from open_notebook.utils.context_builder import ContextBuilder, ContextConfig
+from open_notebook.utils.embedding_cache import EmbeddingCache
 
 # ============================================================================
 # TEST SUITE 1: Text Utilities
@@ -67,6 +71,54 @@ class TestTextUtilities:
         assert "\n" in result
         assert "\t" in result
 
+    @staticmethod
+    def reference_remove_non_printable(text):
+        """The original character-by-character implementation."""
+        import re
+        import unicodedata
+
+        text = re.sub(r"[\u2000-\u200B\u202F\u205F\u3000]", " ", text)
+        text = re.sub(r"[\u2028\u2029\r]", "\n", text)
+        text = "".join(
+            char
+            for char in text
+            if unicodedata.category(char)[0] != "C" or char in "\n\t"
+        )
+        text = text.replace("\xa0", " ").strip()
+        return re.sub(r"[^\w\s.,!?\-\n\t]", "", text, flags=re.UNICODE)
+
+    def test_remove_non_printable_matches_reference(self):
+        """Test random text is cleaned exactly as before."""
+        import random
+
+        rng = random.Random(42)
+        interesting = (
+            "aZ9_\xe9\u4e2d .,!?-$@\n\t\r\x00\x0b\x1c\x7f\x85\xa0"
+            "\u2000\u200b\u200c\u200e\u2028\u2029\u202f\u205f\u3000\ufeff"
+            "\ud800\uffff\U0001f600\U000e0001\U000e0100\U000f0000\U0010ffff"
+        )
+        for _ in range(2000):
+            text = "".join(
+                rng.choice(interesting)
+                if rng.random() < 0.8
+                else chr(rng.randrange(0x110000))
+                for _ in range(rng.randrange(40))
+            )
+            expected = self.reference_remove_non_printable(text)
+            assert remove_non_printable(text) == expected, repr(text)
+
+    def test_remove_non_printable_many(self, monkeypatch):
+        """Test batches give the same results in order, also across processes."""
+        from open_notebook.utils import remove_non_printable_many, text_utils
+
+        texts = [f"Text {i}\u200b\x00 with\r\nlines!" for i in range(50)]
+        expected = [remove_non_printable(text) for text in texts]
+
+        assert remove_non_printable_many(texts) == expected
+        monkeypatch.setattr(text_utils, "_PARALLEL_MIN_CHARS", 0)
+        assert remove_non_printable_many(iter(texts), max_workers=2) == expected
+        assert remove_non_printable_many([]) == []
+
     def test_parse_thinking_content_basic(self):
         """Test parsing single thinking block."""
         content = "<think>This is my thinking</think>Here is my answer"
@@ -115,13 +167,111 @@ class TestTextUtilities:
         assert cleaned == "123"
 
     def test_parse_thinking_content_large_content(self):
-        """Test that very large content is not processed."""
-        large_content = "x" * 200000  # > 100KB limit
-        thinking, cleaned = parse_thinking_content(large_content)
+        """Test that very large content is parsed without a size limit."""
+        large_thinking = "step " * 100000
+        content = f"<think>{large_thinking}</think>\n\n\n{'x' * 200000}"
+        thinking, cleaned = parse_thinking_content(content)
 
-        # Should return unchanged due to size limit
-        assert thinking == ""
-        assert cleaned == large_content
+        assert thinking == large_thinking.strip()
+        assert cleaned == "x" * 200000
+
+        # Content without tags is returned unchanged
+        large_content = "x" * 200000
+        assert parse_thinking_content(large_content) == ("", large_content)
+
+    def test_thinking_stream_matches_whole_content(self):
+        """Test streamed chunks give the same result as parsing the whole."""
+        import random
+
+        from open_notebook.utils import ThinkingStreamParser
+
+        rng = random.Random(7)
+        content = (
+            "  <think> First thought\n</think>Answer  \n\n\n\n part"
+            "<think>Second</think>\n More <b>text</b> </think>\n"
+        )
+        expected = parse_thinking_content(content)
+        for _ in range(200):
+            parser = ThinkingStreamParser()
+            thinking, cleaned = [], []
+            position = 0
+            while position < len(content):
+                size = rng.randint(1, 10)
+                chunk_thinking, chunk_content = parser.feed(
+                    content[position : position + size]
+                )
+                thinking.append(chunk_thinking)
+                cleaned.append(chunk_content)
+                position += size
+            chunk_thinking, chunk_content = parser.close()
+            thinking.append(chunk_thinking)
+            cleaned.append(chunk_content)
+
+            assert ("".join(thinking), "".join(cleaned)) == expected
+
+    def test_thinking_stream_fuzzed_chunks_match_whole_content(self):
+        """Test random tag soup parses the same whole and in random chunks."""
+        import random
+
+        from open_notebook.utils import ThinkingStreamParser
+
+        rng = random.Random(11)
+        pieces = ["<think>", "</think>", "<th", "ink>", "</", "a", " ", "\n\n\n"]
+        for _ in range(2000):
+            content = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            parser = ThinkingStreamParser()
+            thinking, cleaned = [], []
+            position = 0
+            while position < len(content):
+                size = rng.randint(1, 6)
+                chunk_thinking, chunk_content = parser.feed(
+                    content[position : position + size]
+                )
+                thinking.append(chunk_thinking)
+                cleaned.append(chunk_content)
+                position += size
+            chunk_thinking, chunk_content = parser.close()
+            thinking.append(chunk_thinking)
+            cleaned.append(chunk_content)
+
+            assert ("".join(thinking), "".join(cleaned)) == parse_thinking_content(
+                content
+            ), content
+
+    def test_parse_thinking_content_edge_cases(self):
+        """Test unclosed and stray tags are handled like a stream would."""
+        # A block cut off at the end is thinking
+        assert parse_thinking_content("<think>a</think>B<think>c") == (
+            "a\n\nc",
+            "B",
+        )
+        # A stray </think> before any <think> ends a missing-open-tag block
+        assert parse_thinking_content("x</think>y<think>z</think>w") == (
+            "x\n\nz",
+            "yw",
+        )
+
+    def test_thinking_stream_missing_open_tag(self):
+        """Test text before a leading </think> is treated as thinking."""
+        from open_notebook.utils import ThinkingStreamParser
+
+        parser = ThinkingStreamParser()
+        assert parser.feed("Some thinking") == ("", "")
+        assert parser.feed(" content</th") == ("", "")
+        assert parser.feed("ink>Here is") == ("Some thinking content", "Here is")
+        assert parser.feed(" my answer") == ("", " my answer")
+        assert parser.close() == ("", "")
+
+    def test_thinking_stream_releases_long_preamble(self):
+        """Test content without tags streams once max_preamble is exceeded."""
+        from open_notebook.utils import ThinkingStreamParser
+
+        parser = ThinkingStreamParser(max_preamble=10)
+        assert parser.feed("Plain") == ("", "")
+        assert parser.feed(" answer text") == ("", "Plain answer text")
+        assert parser.feed(" <thi") == ("", "")
+        assert parser.feed("nk>Late</think>!") == ("Late", " !")
+        assert parser.close() == ("", "")
 
     def test_clean_thinking_content(self):
         """Test convenience function for cleaning thinking content."""
@@ -155,6 +305,73 @@ class TestTokenUtilities:
             assert isinstance(count, int)
             assert count > 0
 
+    class FakeEncoding:
+        def __init__(self):
+            self.batches = []
+
+        def encode_ordinary(self, text):
+            return text.split()
+
+        def encode_ordinary_batch(self, texts, num_threads=8):
+            self.batches.append(len(texts))
+            return [text.split() for text in texts]
+
+    @pytest.fixture
+    def fresh_encoder(self, monkeypatch):
+        from open_notebook.utils import token_utils
+
+        monkeypatch.setattr(token_utils, "_encoding", None)
+        monkeypatch.setattr(token_utils, "_tiktoken_missing", False)
+        return token_utils
+
+    def test_encoding_loaded_once_across_threads(self, fresh_encoder, monkeypatch):
+        """Test concurrent callers share one lazily loaded encoding."""
+        import sys
+        import threading
+        import time
+        import types
+
+        loads = []
+
+        def get_encoding(name):
+            loads.append(name)
+            time.sleep(0.01)
+            return self.FakeEncoding()
+
+        monkeypatch.setitem(
+            sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding)
+        )
+        threads = [
+            threading.Thread(target=fresh_encoder.token_count, args=("a b",))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loads == ["o200k_base"]
+
+    def test_batch_matches_single_counts(self, fresh_encoder, monkeypatch):
+        """Test batches are tokenized together and give per-text counts."""
+        encoding = self.FakeEncoding()
+        monkeypatch.setattr(fresh_encoder, "_encoding", encoding)
+        texts = [f"word {'x ' * i}" for i in range(10)]
+
+        counts = fresh_encoder.token_count_batch(texts)
+
+        assert counts == [fresh_encoder.token_count(text) for text in texts]
+        assert encoding.batches == [10]
+
+    def test_approximate_mode_skips_tokenizer(self, fresh_encoder, monkeypatch):
+        """Test approximate counts never load the encoding."""
+        monkeypatch.setattr(
+            fresh_encoder, "get_encoding", lambda: pytest.fail("encoding loaded")
+        )
+
+        assert fresh_encoder.token_count("one two three", approximate=True) == 3
+        assert fresh_encoder.token_count_batch(["a b", ""], approximate=True) == [2, 0]
+
 
 # ============================================================================
 # TEST SUITE 3: Version Utilities
@@ -261,6 +478,412 @@ class TestContextBuilder:
         assert builder.max_tokens == 1000
         assert builder.include_insights is False
 
+    def test_item_tokens_counted_in_one_batch(self, monkeypatch):
+        """Test deferred items are counted together and counted items kept."""
+        from open_notebook.utils import context_builder
+        from open_notebook.utils.context_builder import ContextItem, count_item_tokens
+
+        batches = []
+
+        def fake_token_count_batch(texts):
+            batches.append(list(texts))
+            return [7] * len(texts)
+
+        monkeypatch.setattr(
+            context_builder, "token_count_batch", fake_token_count_batch
+        )
+        items = [
+            ContextItem(id="note:1", type="note", content={}, count_tokens=False),
+            ContextItem(id="note:2", type="note", content={}, token_count=3),
+            ContextItem(id="note:3", type="note", content={}, count_tokens=False),
+        ]
+
+        count_item_tokens(items)
+
+        assert [item.token_count for item in items] == [7, 3, 7]
+        assert len(batches) == 1 and len(batches[0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_notebook_context_fetched_in_bulk(self, monkeypatch):
+        """Test a notebook costs the same fetches however many sources it has."""
+        import asyncio
+
+        from open_notebook.domain.notebook import Note, Notebook, Source, SourceInsight
+        from open_notebook.utils import context_builder
+
+        calls = []
+        in_flight = []
+
+        async def fake_get(cls, id, fields=None, omit=None):
+            calls.append("notebook")
+            return Notebook(id=id, name="Research", description="")
+
+        async def fake_sources(self, fields=None, omit=None):
+            calls.append("sources")
+            in_flight.append("sources")
+            await asyncio.sleep(0.01)
+            assert "notes" in in_flight
+            return [
+                (
+                    Source(id=f"source:s{i}", title=f"Source {i}"),
+                    [
+                        SourceInsight(
+                            id=f"source_insight:i{i}",
+                            insight_type="summary",
+                            content="...",
+                        )
+                    ],
+                )
+                for i in range(50)
+            ]
+
+        async def fake_notes(self, fields=None, omit=None):
+            calls.append("notes")
+            in_flight.append("notes")
+            await asyncio.sleep(0.01)
+            return [Note(id="note:n1", title="Note", content="Text")]
+
+        async def per_source_fetch(*args, **kwargs):
+            raise AssertionError("sources should not be fetched one by one")
+
+        monkeypatch.setattr(Notebook, "get", classmethod(fake_get))
+        monkeypatch.setattr(Notebook, "get_sources_with_insights", fake_sources)
+        monkeypatch.setattr(Notebook, "get_notes", fake_notes)
+        monkeypatch.setattr(Source, "get_insights", per_source_fetch)
+        monkeypatch.setattr(
+            context_builder, "token_count_batch", lambda texts: [1] * len(texts)
+        )
+
+        context = await ContextBuilder(notebook_id="notebook:nb").build()
+
+        assert sorted(calls) == ["notebook", "notes", "sources"]
+        assert context["metadata"]["source_count"] == 50
+        assert context["metadata"]["insight_count"] == 50
+        assert context["metadata"]["note_count"] == 1
+        assert context["sources"][0]["id"] == "source:s0"
+
+
+# ============================================================================
+# TEST SUITE 5: LRU Cache
+# ============================================================================
+
+
+class TestLRUCache:
+    """Test suite for the in-memory LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted first."""
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_ttl_expiry(self):
+        """Test entries older than the TTL are treated as missing."""
+        cache = LRUCache(ttl=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_remove_where(self):
+        """Test entries can be removed by key predicate."""
+        cache = LRUCache()
+        cache.set(("model:1", ()), "x")
+        cache.set(("model:2", ()), "y")
+
+        removed = cache.remove_where(lambda key: key[0] == "model:1")
+
+        assert removed == ["x"]
+        assert ("model:1", ()) not in cache
+        assert ("model:2", ()) in cache
+
+
+# ============================================================================
+# TEST SUITE 6: Embedding Cache
+# ============================================================================
+
+
+class TestEmbeddingCache:
+    """Test suite for the persistent embedding cache."""
+
+    def test_vectors_persist_across_instances(self, tmp_path):
+        """Test stored vectors are read back from the file by a new cache."""
+        path = str(tmp_path / "cache.sqlite")
+        cache = EmbeddingCache(path)
+        cache.put("openai/small", "hello", [0.25, -1.5])
+        cache.close()
+
+        reopened = EmbeddingCache(path)
+
+        assert reopened.get("openai/small", "hello") == [0.25, -1.5]
+        assert reopened.get("openai/large", "hello") is None
+        stats = reopened.stats()
+        assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+        # The second read is served from memory
+        assert reopened.get("openai/small", "hello") == [0.25, -1.5]
+        assert reopened.stats()["memory_hits"] == 1
+        assert reopened.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_size_based_eviction(self, tmp_path):
+        """Test least recently used rows are evicted past max_bytes."""
+        # Each vector of 4 doubles takes 32 bytes
+        cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_bytes=100)
+        for text in ["a", "b", "c"]:
+            cache.put("m", text, [1.0, 2.0, 3.0, 4.0])
+        cache.get_many("m", ["a"])
+
+        cache.put("m", "d", [1.0, 2.0, 3.0, 4.0])
+
+        assert cache.stats()["size_bytes"] <= 100
+        assert cache.stats()["evictions"] >= 1
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "d") is not None
+
+    def test_returns_copies(self, tmp_path):
+        """Test changing a returned vector does not change the cache."""
+        cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+        vector = [1.0, 2.0]
+        cache.put("m", "a", vector)
+        vector.append(3.0)
+
+        cache.get("m", "a").append(4.0)
+
+        assert cache.get("m", "a") == [1.0, 2.0]
+
+    @pytest.mark.asyncio
+    async def test_async_access_batches_last_used(self, tmp_path):
+        """Test the async API round-trips and hits reach the file on close."""
+        import sqlite3
+
+        path = str(tmp_path / "cache.sqlite")
+        cache = EmbeddingCache(path)
+        await cache.aput_many("m", ["a", "b"], [[1.0], [2.0]])
+        cache.close()
+        cache = EmbeddingCache(path)
+
+        assert await cache.aget_many("m", ["b", "c", "a"]) == [[2.0], None, [1.0]]
+        assert cache.stats()["disk_hits"] == 2
+        before = dict(
+            sqlite3.connect(path).execute("SELECT text_hash, last_used FROM embeddings")
+        )
+        cache.close()
+        after = dict(
+            sqlite3.connect(path).execute("SELECT text_hash, last_used FROM embeddings")
+        )
+
+        assert all(after[digest] > before[digest] for digest in before)
+
+
+# ============================================================================
+# TEST SUITE 7: Local Vector Index
+# ============================================================================
+
+
+class TestVectorIndex:
+    """Test suite for the in-process vector index."""
+
+    @pytest.fixture
+    def np(self):
+        return pytest.importorskip("numpy")
+
+    def test_exact_search(self, np):
+        """Test results are ordered by cosine similarity and filtered."""
+        from open_notebook.utils.vector_index import VectorIndex
+
+        index = VectorIndex()
+        index.add("a", [1.0, 0.0], {"kind": "note"})
+        index.add("b", [1.0, 1.0], {"kind": "note"})
+        index.add("c", [0.0, 1.0], {"kind": "source"})
+
+        hits = index.search([2.0, 0.0], k=3, min_score=0.5)
+
+        assert [(meta["kind"], round(score, 3)) for meta, score in hits] == [
+            ("note", 1.0),
+            ("note", 0.707),
+        ]
+        notes_only = index.search([0.0, 1.0], 5, where=lambda m: m["kind"] == "note")
+        assert notes_only[0][1] == pytest.approx(0.7071, abs=1e-4)
+        assert not index.add("bad", [1.0, 2.0, 3.0], {})
+
+    def test_remove_and_replace(self, np):
+        """Test removed keys disappear and re-adding replaces the vector."""
+        from open_notebook.utils.vector_index import VectorIndex
+
+        index = VectorIndex()
+        index.add("a", [1.0, 0.0], {"v": 1})
+        index.add("a", [0.0, 1.0], {"v": 2})
+        index.add("b", [1.0, 0.0], {"v": 3})
+        index.remove("b")
+
+        hits = index.search([0.0, 1.0], k=5, min_score=-1)
+
+        assert len(index) == 1
+        assert [meta["v"] for meta, _ in hits] == [2]
+
+    def test_ivf_finds_nearest_neighbours(self, np):
+        """Test the trained IVF index returns the same top hit as a full scan."""
+        from open_notebook.utils.vector_index import VectorIndex
+
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(600, 16)).astype("float32")
+        index = VectorIndex(ivf_threshold=500, n_probe=4)
+        for i, vector in enumerate(vectors):
+            index.add(f"v{i}", vector.tolist(), {"i": i})
+        assert index.is_trained
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        found = 0
+        for i in range(50):
+            query = vectors[i] + rng.normal(scale=0.05, size=16)
+            expected = int(np.argmax(normalized @ query))
+            found += index.search(query.tolist(), k=1)[0][0]["i"] == expected
+        assert found >= 45
+
+    def test_save_and_load_memory_mapped(self, np, tmp_path):
+        """Test a saved index loads memory-mapped and accepts new vectors."""
+        from open_notebook.utils.vector_index import VectorIndex
+
+        index = VectorIndex()
+        index.add("a", [1.0, 0.0], {"title": "A"})
+        index.add("b", [0.0, 1.0], {"title": "B"})
+        index.remove("b")
+        index.save(str(tmp_path))
+
+        loaded = VectorIndex.load(str(tmp_path))
+
+        assert len(loaded) == 1
+        assert loaded.search([1.0, 0.0], k=1)[0][0]["title"] == "A"
+        loaded.add("c", [0.0, 1.0], {"title": "C"})
+        assert loaded.search([0.0, 1.0], k=1)[0][0]["title"] == "C"
+        assert VectorIndex.load(str(tmp_path / "missing")) is None
+
+    @pytest.mark.asyncio
+    async def test_async_save_captures_index(self, np, tmp_path):
+        """Test changes made during an async save are not written by it."""
+        from open_notebook.utils.vector_index import VectorIndex
+
+        index = VectorIndex()
+        index.add("a", [1.0, 0.0], {"id": "a"})
+        saving = asyncio.ensure_future(index.asave(str(tmp_path)))
+        await asyncio.sleep(0)
+        index.add("b", [0.0, 1.0], {"id": "b"})
+        await saving
+
+        loaded = VectorIndex.load(str(tmp_path))
+
+        assert len(loaded) == 1
+        assert index.mutations == 1
+
+
+# ============================================================================
+# TEST SUITE 8: Token Offset Splitter
+# ============================================================================
+
+
+class TestTokenOffsetSplitter:
+    """Test suite for the splitter that tokenizes each document once."""
+
+    @staticmethod
+    def char_offsets(text):
+        # One token per character, so piece lengths are exactly additive
+        return range(len(text))
+
+    @pytest.mark.parametrize("chunk_size", [8, 20, 60])
+    def test_matches_recursive_character_splitter(self, chunk_size):
+        """Test chunk boundaries equal LangChain's with the same lengths."""
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        from open_notebook.utils.text_splitter import (
+            DEFAULT_SEPARATORS,
+            TokenOffsetSplitter,
+        )
+
+        text = (
+            "First paragraph, with a clause. Another sentence here.\n\n"
+            "Second paragraph\nwith lines and averyveryverylongunbrokenword "
+            "that must be cut.\n\n\n中文句子，还有更多。结束"
+        )
+        expected = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=int(chunk_size * 0.15),
+            length_function=len,
+            separators=DEFAULT_SEPARATORS,
+        ).split_text(text)
+
+        splitter = TokenOffsetSplitter(chunk_size, token_offsets=self.char_offsets)
+
+        assert splitter.split_text(text) == expected
+
+    def test_document_tokenized_once(self):
+        """Test the tokenizer runs once per document, not per piece."""
+        import re
+
+        from open_notebook.utils.text_splitter import TokenOffsetSplitter
+
+        calls = []
+
+        def offsets(text):
+            calls.append(text)
+            return [match.start() for match in re.finditer(r"\S+", text)]
+
+        text = "\n\n".join(" ".join(["word"] * 30) for _ in range(20))
+        chunks = TokenOffsetSplitter(50, token_offsets=offsets).split_text(text)
+
+        assert len(calls) == 1
+        assert all(len(chunk.split()) <= 50 for chunk in chunks)
+        assert TokenOffsetSplitter(50, token_offsets=offsets).split_text("") == []
+
+    def test_splitters_cached_by_chunk_size(self):
+        """Test split_text reuses one splitter per chunk size."""
+        from open_notebook.utils.text_splitter import get_text_splitter
+
+        assert get_text_splitter(500) is get_text_splitter(500)
+        assert get_text_splitter(500) is not get_text_splitter(200)
+        assert get_text_splitter(200).chunk_overlap == 30
+
+    def test_stream_matches_whole_text(self):
+        """Test streamed pieces give the chunks of the joined text."""
+        from open_notebook.utils.text_splitter import TokenOffsetSplitter
+
+        paragraphs = [
+            f"Paragraph {i} has a few words. It ends here, mostly." for i in range(40)
+        ]
+        text = "\n\n".join(paragraphs)
+        pieces = [text[i : i + 37] for i in range(0, len(text), 37)]
+        splitter = TokenOffsetSplitter(30, token_offsets=self.char_offsets)
+
+        streamed = list(splitter.split_stream(pieces, buffer_size=300))
+
+        assert streamed == splitter.split_text(text)
+
+    def test_stream_yields_before_input_ends(self, monkeypatch):
+        """Test chunks are produced while text is still arriving."""
+        from open_notebook.utils import split_text_stream
+        from open_notebook.utils.text_splitter import get_text_splitter
+
+        consumed = []
+
+        def pages():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"Page {i} talks about one topic at some length.\n\n"
+
+        monkeypatch.setattr(get_text_splitter(50), "token_offsets", self.char_offsets)
+
+        first = next(split_text_stream(pages(), chunk_size=50))
+
+        assert first.startswith("Page 0")
+        assert len(consumed) < 100
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])